@@ -0,0 +1,233 @@
+"""Throughput benchmarks on synthetic landscapes.
+
+    python -m benchmarks.run [--quick] [--out results.json] [--baseline benchmarks/baseline.json]
+                             [--save-baseline] [--threshold 0.2]
+
+Each case reports a rate (agent-steps/s, calls/s, points/s or rows/s; best of ``--repeat``) and the
+peak traced memory of one extra run. With ``--baseline``, cases whose rate drops by more than
+``--threshold`` relative to the baseline are flagged and the exit status is 1.
+"""
+from __future__ import annotations
+import argparse
+import json
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+from src.black_harrier_abm_v2.build import build_env, build_samplers, build_simulation
+from src.black_harrier_abm_v2.calibration import CalibrationSimulation
+from src.black_harrier_abm_v2.config import load_config
+from src.black_harrier_abm_v2.exposure import ExposureAccumulator
+from src.black_harrier_abm_v2.sinks import CSVSink, ParquetSink, chunk_batches
+
+from .synthetic import write_config
+
+# (agents, turbines, steps, raster cells per side)
+QUICK_SCALES = [(10, 20, 60, 128), (100, 20, 60, 128), (100, 200, 60, 512)]
+FULL_SCALES = QUICK_SCALES + [(1000, 200, 120, 512), (1000, 2000, 120, 2048), (10000, 200, 60, 1024)]
+
+
+def measure(fn: Callable[[], int], repeat: int) -> Tuple[float, float, float]:
+    """Best wall time over ``repeat`` runs, units/s for that run, and peak traced MiB of one more run."""
+    best, units = float("inf"), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        units = fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, units / best if best > 0 else float("inf"), peak / 2**20
+
+
+def bench_run(cfg_path: str, engine: str, static_utility: bool = False, adaptive: bool = False) -> Callable[[], int]:
+    sim_cfg, model_cfg = load_config(cfg_path)
+    model_cfg.inputs.static_utility = static_utility
+    sim_cfg.adaptive_stepping = adaptive
+    env = build_env(model_cfg)
+
+    def fn() -> int:
+        sim = build_simulation(sim_cfg, model_cfg, env, engine=engine, seed=0)
+        return len(sim.run())
+
+    return fn
+
+
+def bench_choose_heading(cfg_path: str, n_calls: int = 2000) -> Callable[[], int]:
+    sim_cfg, model_cfg = load_config(cfg_path)
+    env = build_env(model_cfg)
+    sim = build_simulation(sim_cfg, model_cfg, env, seed=0)
+    ag, t = sim.agents[0], sim_cfg.start_time
+
+    def fn() -> int:
+        rng = random.Random(0)
+        for _ in range(n_calls):
+            sim.policy.choose_heading(lat=ag.lat, lon=ag.lon, speed_mps=8.0, t=t, env=env, state=ag.state,
+                                      target=ag.nest, rng=rng)
+        return n_calls
+
+    return fn
+
+
+def bench_samplers(cfg_path: str, batched: bool, n_points: int = 20000, tile_size: Optional[int] = None) -> Callable[[], int]:
+    _, model_cfg = load_config(cfg_path)
+    model_cfg.inputs.tile_size = tile_size
+    samplers = build_samplers(model_cfg)
+    rng = np.random.default_rng(0)
+    lats = -33.2 + rng.uniform(-0.2, 0.2, n_points)
+    lons = 18.1 + rng.uniform(-0.2, 0.2, n_points)
+
+    def fn() -> int:
+        if batched:
+            samplers.habitat_many(lats, lons, None)
+            samplers.slope_many(lats, lons)
+            samplers.wind_many(lats, lons, None)
+        else:
+            for a, b in zip(lats[:2000].tolist(), lons[:2000].tolist()):
+                samplers.habitat(a, b, None)
+                samplers.slope(a, b)
+                samplers.wind(a, b, None)
+        return n_points if batched else 2000
+
+    return fn
+
+
+def bench_sink(cfg_path: str, fmt: str, out_dir: str) -> Callable[[], int]:
+    sim_cfg, model_cfg = load_config(cfg_path)
+    env = build_env(model_cfg)
+    batches = list(build_simulation(sim_cfg, model_cfg, env, engine="population", seed=0).iter_steps(1))
+    chunks = list(chunk_batches(iter(batches), 30))
+    path = str(Path(out_dir) / f"tracks.{fmt}")
+
+    def fn() -> int:
+        with (ParquetSink(path) if fmt == "parquet" else CSVSink(path)) as sink:
+            for chunk in chunks:
+                sink.write(chunk)
+        return sink.rows_written
+
+    return fn
+
+
+def bench_exposure(cfg_path: str, mode: str) -> Callable[[], int]:
+    sim_cfg, model_cfg = load_config(cfg_path)
+    env = build_env(model_cfg)
+    chunks = list(build_simulation(sim_cfg, model_cfg, env, engine="population", seed=0).iter_steps(30))
+
+    def fn() -> int:
+        acc = ExposureAccumulator(index=env.turbine_index, step_seconds=sim_cfg.step_seconds,
+                                  influence_m=sim_cfg.turbine_influence_m, mode=mode)
+        for chunk in chunks:
+            acc.write(chunk)
+        return acc.rows_written
+
+    return fn
+
+
+def bench_calibration(cfg_path: str, n_sets: int) -> Callable[[], int]:
+    sim_cfg, model_cfg = load_config(cfg_path)
+    env = build_env(model_cfg)
+    calib = CalibrationSimulation.from_config(sim_cfg, model_cfg, env, seed=0)
+    simulate = calib.simulator(["weights.w_habitat", "speed.foraging_mean"])
+    values = np.column_stack([np.linspace(0.0, 2.0, n_sets), np.linspace(3.0, 12.0, n_sets)])
+
+    def fn() -> int:
+        simulate(values)
+        return n_sets
+
+    return fn
+
+
+def run_suite(scales: List[Tuple[int, int, int, int]], repeat: int, work_dir: str) -> Dict[str, Dict]:
+    results: Dict[str, Dict] = {}
+
+    def record(name: str, unit: str, params: Dict, fn: Callable[[], int]) -> None:
+        seconds, rate, peak_mb = measure(fn, repeat)
+        results[name] = {"unit": unit, "rate": rate, "seconds": seconds, "peak_mb": peak_mb, **params}
+        print(f"{name:<48} {rate:>14,.0f} {unit:<14} {seconds:8.3f}s {peak_mb:9.1f} MiB", flush=True)
+
+    for n_agents, n_turbines, n_steps, size in scales:
+        params = {"agents": n_agents, "turbines": n_turbines, "steps": n_steps, "raster": size}
+        cfg = write_config(work_dir, n_agents, n_turbines, n_steps, size)
+        tag = f"a{n_agents}_t{n_turbines}_s{n_steps}_r{size}"
+        for engine in ("agent", "population"):
+            if engine == "agent" and n_agents * n_steps > 200_000:
+                continue  # per-agent loop is too slow to be worth timing at this scale
+            record(f"run/{engine}/{tag}", "agent-steps/s", params, bench_run(cfg, engine))
+        record(f"run/population_static_utility/{tag}", "agent-steps/s", params,
+               bench_run(cfg, "population", static_utility=True))
+        record(f"run/population_adaptive/{tag}", "agent-steps/s", params,
+               bench_run(cfg, "population", adaptive=True))
+
+    small = write_config(work_dir, 10, 20, 60, 512)
+    record("calibration/sets200_a10", "sets/s", {"agents": 10, "sets": 200}, bench_calibration(small, 200))
+    record("choose_heading/r512", "calls/s", {"raster": 512}, bench_choose_heading(small))
+    record("samplers/scalar/r512", "points/s", {"raster": 512}, bench_samplers(small, batched=False))
+    record("samplers/batched/r512", "points/s", {"raster": 512}, bench_samplers(small, batched=True))
+    record("samplers/tiled/r512", "points/s", {"raster": 512, "tile": 128},
+           bench_samplers(small, batched=True, tile_size=128))
+    sink_cfg = write_config(work_dir, 500, 20, 120, None)
+    for fmt in ("csv", "parquet"):
+        record(f"sink/{fmt}", "rows/s", {"rows": 500 * 120}, bench_sink(sink_cfg, fmt, work_dir))
+    for mode in ("point", "segment"):
+        record(f"exposure/{mode}", "rows/s", {"rows": 500 * 120, "turbines": 20}, bench_exposure(sink_cfg, mode))
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float) -> List[str]:
+    """Names of cases whose rate fell by more than ``threshold`` (fraction) below the baseline."""
+    regressions = []
+    for name, res in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        change = res["rate"] / base["rate"] - 1.0
+        flag = change < -threshold
+        if flag:
+            regressions.append(name)
+        print(f"{'REGRESSION' if flag else 'ok':<10} {name:<48} {change:+7.1%}")
+    return regressions
+
+
+def main() -> int:
+    p = argparse.ArgumentParser(description="Black Harrier ABM benchmarks (synthetic, offline)")
+    p.add_argument("--quick", action="store_true", help="Small scales only (CI)")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--out", default=None, help="Write results JSON here")
+    p.add_argument("--baseline", default="benchmarks/baseline.json", help="Baseline JSON to compare against")
+    p.add_argument("--save-baseline", action="store_true", help="Overwrite --baseline with these results")
+    p.add_argument("--threshold", type=float, default=0.2, help="Allowed fractional slowdown before flagging")
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = run_suite(QUICK_SCALES if args.quick else FULL_SCALES, args.repeat, work_dir)
+    doc = {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "results": results,
+    }
+    if args.out:
+        Path(args.out).write_text(json.dumps(doc, indent=2))
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(doc, indent=2))
+        print(f"Saved baseline: {baseline_path}")
+        return 0
+    if baseline_path.exists():
+        regressions = compare(results, json.loads(baseline_path.read_text())["results"], args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than baseline by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
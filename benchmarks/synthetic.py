@@ -0,0 +1,98 @@
+"""Synthetic landscapes for benchmarks: GeoTIFF covariates, turbine layouts and agent sets (no external data)."""
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+import rasterio
+import yaml
+from rasterio.transform import from_origin
+from scipy.ndimage import gaussian_filter
+
+CENTER = (-33.2, 18.1)  # lat, lon (Western Cape)
+EXTENT_DEG = 0.4
+
+
+def _smooth_noise(rng: np.random.Generator, size: int, sigma_frac: float = 0.05) -> np.ndarray:
+    field = gaussian_filter(rng.standard_normal((size, size)), sigma=max(1.0, size * sigma_frac))
+    return (field - field.min()) / max(np.ptp(field), 1e-12)
+
+
+def _write(path: Path, data: np.ndarray) -> str:
+    size = data.shape[0]
+    res = EXTENT_DEG / size
+    west, north = CENTER[1] - EXTENT_DEG / 2, CENTER[0] + EXTENT_DEG / 2
+    with rasterio.open(
+        path, "w", driver="GTiff", height=size, width=size, count=1, dtype="float32",
+        crs="EPSG:4326", transform=from_origin(west, north, res, res),
+    ) as ds:
+        ds.write(data.astype("float32"), 1)
+    return str(path)
+
+
+def write_landscape(out_dir: str, size: int = 512, seed: int = 0) -> Dict[str, str]:
+    """Habitat (0..1), DEM (m) and wind u/v (m/s) rasters of ``size`` x ``size`` cells over the same extent."""
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    return {
+        "habitat_raster": _write(out / f"habitat_{size}.tif", _smooth_noise(rng, size)),
+        "dem_raster": _write(out / f"dem_{size}.tif", 50.0 + 600.0 * _smooth_noise(rng, size, 0.1)),
+        "wind_u_raster": _write(out / f"wind_u_{size}.tif", 4.0 + 4.0 * _smooth_noise(rng, size, 0.2)),
+        "wind_v_raster": _write(out / f"wind_v_{size}.tif", -2.0 + 4.0 * _smooth_noise(rng, size, 0.2)),
+    }
+
+
+def turbine_layout(n: int, seed: int = 0, spread_deg: float = EXTENT_DEG / 3) -> List[dict]:
+    rng = np.random.default_rng(seed)
+    lats = CENTER[0] + rng.uniform(-spread_deg, spread_deg, n)
+    lons = CENTER[1] + rng.uniform(-spread_deg, spread_deg, n)
+    return [
+        {"lat": float(a), "lon": float(b), "rotor_radius_m": 60.0, "rotor_min_m": 30.0, "rotor_max_m": 130.0}
+        for a, b in zip(lats, lons)
+    ]
+
+
+def agent_set(n: int, seed: int = 0, spread_deg: float = EXTENT_DEG / 4) -> List[dict]:
+    rng = np.random.default_rng(seed + 1)
+    agents = []
+    for i in range(n):
+        lat = CENTER[0] + float(rng.uniform(-spread_deg, spread_deg))
+        lon = CENTER[1] + float(rng.uniform(-spread_deg, spread_deg))
+        agents.append({
+            "id": i + 1, "start_lat": lat, "start_lon": lon, "state": "foraging",
+            "nest_lat": lat + 0.01, "nest_lon": lon, "roost_lat": lat, "roost_lon": lon - 0.01,
+        })
+    return agents
+
+
+def write_config(
+    out_dir: str,
+    n_agents: int,
+    n_turbines: int,
+    n_steps: int,
+    raster_size: Optional[int] = 256,
+    seed: int = 0,
+    step_seconds: int = 60,
+) -> str:
+    """Config YAML for a synthetic scenario; ``raster_size=None`` leaves all covariates constant."""
+    inputs = {"habitat_raster": None, "dem_raster": None, "wind_u_raster": None, "wind_v_raster": None}
+    if raster_size:
+        inputs.update(write_landscape(str(Path(out_dir) / "rasters"), raster_size, seed))
+    start = np.datetime64("2020-09-01T06:00:00")
+    cfg = {
+        "simulation": {
+            "start_time": str(start),
+            "end_time": str(start + np.timedelta64(step_seconds * (n_steps - 1), "s")),
+            "step_seconds": step_seconds,
+        },
+        "model": {
+            "inputs": {**inputs, "crs_epsg": 4326},
+            "turbines": turbine_layout(n_turbines, seed),
+            "agents": agent_set(n_agents, seed),
+        },
+    }
+    path = Path(out_dir) / f"bench_a{n_agents}_t{n_turbines}_s{n_steps}_r{raster_size or 0}.yaml"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        yaml.safe_dump(cfg, f, sort_keys=False)
+    return str(path)
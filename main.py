@@ -1,141 +1,267 @@
 from __future__ import annotations
 import argparse
+import csv
+import sys
+import time
 from pathlib import Path
-from typing import Optional
-import pandas as pd
-
-from src.black_harrier_abm_v2.config import SimulationConfig, ModelConfig, WeightsConfig, load_config
-from src.black_harrier_abm_v2.environment import Environment, Turbine
-from src.black_harrier_abm_v2.samplers.raster import RasterSamplers
-from src.black_harrier_abm_v2.agents import HarrierAgent
-from src.black_harrier_abm_v2.movement import (
-    StepSelectionPolicy,
-    AltitudeModel,
-    AltitudePriors as MovAltitudePriors,
-    State,
-    Weights as MovWeights,
-)
-from src.black_harrier_abm_v2.risk import ABMSimulation
+
+# Package modules (pandas, rasterio, scipy) are imported inside each mode so that start-up and
+# --help stay fast and runs without rasters never load rasterio.
+ENGINES = ("agent", "population")  # same as build.ENGINES
 
 
 def parse_args() -> argparse.Namespace:
     p = argparse.ArgumentParser(description="Black Harrier ABM runner")
-    p.add_argument("--config", required=True, help="YAML config path")
-    p.add_argument("--out", required=True, help="Output CSV path")
-    return p.parse_args()
-
-
-def build_env(cfg: ModelConfig) -> Environment:
-    if cfg.inputs.crs_epsg is None:
-        raise ValueError("crs_epsg must not be None")
-    samplers = RasterSamplers(
-        habitat_raster=cfg.inputs.habitat_raster,
-        dem_raster=cfg.inputs.dem_raster,
-        wind_u_raster=cfg.inputs.wind_u_raster,
-        wind_v_raster=cfg.inputs.wind_v_raster,
-        crs_epsg=cfg.inputs.crs_epsg,
+    p.add_argument("--config", default=None, help="YAML config path (required except with --batch)")
+    p.add_argument(
+        "--out",
+        required=True,
+        help="Output path (.csv, or .parquet for chunked Parquet); with --replicates, the per-replicate summary CSV",
     )
-
-    env = Environment(
-        habitat_sampler=samplers.habitat,
-        wind_sampler=samplers.wind,
-        slope_sampler=samplers.slope,  # simple slope from DEM
-        turbines=[Turbine(**t) for t in cfg.turbines],
+    p.add_argument(
+        "--engine",
+        choices=ENGINES,
+        default="agent",
+        help="agent: per-agent loop (ABMSimulation); population: array engine (PopulationSimulation)",
     )
-    return env
-
-
-def to_movement_weights(w: WeightsConfig) -> MovWeights:
-    """Adapter: config.WeightsConfig -> movement.Weights"""
-    return MovWeights(
-        w_habitat=w.w_habitat,
-        w_wind=w.w_wind,
-        w_target=w.w_target,
-        w_slope_penalty=w.w_slope_penalty,
-        w_turbine_avoid=w.w_turbine_avoid,
-        softmax_beta=w.softmax_beta,
+    p.add_argument("--chunk-steps", type=int, default=60, help="Timesteps buffered per output write")
+    p.add_argument("--seed", type=int, default=None,
+                   help="Run seed; overrides simulation.seed (replicates and shards default to 0, single runs to fresh)")
+    p.add_argument("--replicates", type=int, default=None, help="Run N Monte Carlo replicates and summarise BSA time")
+    p.add_argument("--workers", type=int, default=1, help="Worker processes for --replicates")
+    p.add_argument(
+        "--batch",
+        nargs="+",
+        default=None,
+        help="Run many configs (paths, globs or manifests) in one process; --out is then the output directory",
     )
+    p.add_argument("--format", choices=("csv", "parquet"), default="csv", help="Track format for --batch outputs")
+    p.add_argument("--load-workers", type=int, default=4, help="Rasters read concurrently by --batch")
+    p.add_argument("--shards", type=int, default=None,
+                   help="Split one run across N worker processes (output identical to the serial run)")
+    p.add_argument("--sweep", default=None, help="Scenario sweep YAML (scenarios/grid over the base --config)")
+    p.add_argument("--calibrate", default=None,
+                   help="GPS telemetry (CSV/Parquet: t, agent_id, lat, lon, alt_m[, state]) to fit by ABC; needs --priors")
+    p.add_argument("--priors", default=None, help="With --calibrate: YAML of parameter bounds and ABC settings")
+    p.add_argument("--rescore", nargs="+", default=None, help="Recorded tracks file(s) to score instead of simulating")
+    p.add_argument("--layouts", default=None, help="With --rescore: YAML of {layout name: [turbines]} to score against")
+    p.add_argument("--tracks-dir", default=None, help="With --replicates, also write each replicate's tracks here")
+    p.add_argument(
+        "--summary",
+        action="store_true",
+        help="Write only the collision-exposure table (per turbine, state, agent, hour) to --out instead of tracks",
+    )
+    p.add_argument("--checkpoint", default=None, help="Checkpoint file for long single runs (simulation and sink state)")
+    p.add_argument("--checkpoint-every", type=float, default=300.0, help="Seconds of wall time between checkpoints")
+    p.add_argument("--resume", action="store_true", help="Continue from --checkpoint instead of starting over")
+    p.add_argument("--profile", default=None, help="Write per-phase timings, sampler counts and cache stats (JSON) here")
+    p.add_argument("--progress", action="store_true", help="Report progress every 10%% of timesteps on stderr")
+    args = p.parse_args()
+    if args.config is None and not args.batch:
+        p.error("--config is required unless --batch is given")
+    return args
 
 
-def build_agents(cfg: ModelConfig) -> list[HarrierAgent]:
-    def _pair(lat: Optional[float], lon: Optional[float]) -> Optional[tuple[float, float]]:
-        if lat is None or lon is None:
-            return None
-        return float(lat), float(lon)
-
-    agents: list[HarrierAgent] = []
-    for a in cfg.agents:
-        # Required keys via TypedDict
-        start_lat: float = float(a["start_lat"])  # ensure float type
-        start_lon: float = float(a["start_lon"])
-        state_str: str = a.get("state", State.BREEDING)
-        sex_str: str = a.get("sex", "unknown")
-
-        nest = _pair(a.get("nest_lat"), a.get("nest_lon"))
-        roost = _pair(a.get("roost_lat"), a.get("roost_lon"))
-
-        agents.append(
-            HarrierAgent(
-                agent_id=int(a["id"]),
-                lat=start_lat,
-                lon=start_lon,
-                state=state_str,
-                sex=sex_str,
-                nest=nest,
-                roost=roost,
-            )
-        )
-    return agents
-
-
-def build_altitude_priors(model_cfg: ModelConfig) -> MovAltitudePriors:
-    ap = model_cfg.altitude_priors
-    return MovAltitudePriors(
-        means={
-            "breeding": ap.breeding_mean,
-            "foraging": ap.foraging_mean,
-            "commuting": ap.commuting_mean,
-            "displaying": ap.displaying_mean,
-            "migrating": ap.migrating_mean,
-            "roosting": ap.roosting_mean,
-        },
-        sds={
-            "breeding": ap.breeding_sd,
-            "foraging": ap.foraging_sd,
-            "commuting": ap.commuting_sd,
-            "displaying": ap.displaying_sd,
-            "migrating": ap.migrating_sd,
-            "roosting": ap.roosting_sd,
-        },
-    )
+def _print_progress(done: int, total: int) -> None:
+    if done == total or done * 10 // total != (done - 1) * 10 // total:
+        print(f"step {done}/{total} ({done / total:.0%})", file=sys.stderr, flush=True)
+
+
+def _report(sink, out_path: Path, summary: bool) -> None:
+    if summary:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        sink.table().to_csv(out_path, index=False)
+        print(f"Saved exposure summary: {out_path} ({sink.rows_written} track points reduced)")
+    else:
+        print(f"Saved tracks: {out_path} ({sink.rows_written} rows)")
+
+
+def _run_seed(args: argparse.Namespace) -> int:
+    """--seed, else ``simulation.seed`` of --config, else 0."""
+    if args.seed is not None:
+        return args.seed
+    from src.black_harrier_abm_v2.config import load_config
+
+    seed = load_config(args.config)[0].seed
+    return 0 if seed is None else seed
 
 
 def main() -> None:
     args = parse_args()
-    sim_cfg, model_cfg = load_config(args.config)
+    out_path = Path(args.out)
 
-    env = build_env(model_cfg)
+    if args.batch:
+        from src.black_harrier_abm_v2.batch import BatchRunner, expand_jobs, run_batch
 
-    policy = StepSelectionPolicy(weights=to_movement_weights(model_cfg.weights))
-    alt_priors = build_altitude_priors(model_cfg)
-    alt_model = AltitudeModel(priors=alt_priors)
+        suffix = "_exposure.csv" if args.summary else f".{args.format}"
+        jobs = expand_jobs(args.batch, args.out, suffix=suffix)
+        runner = BatchRunner(engine=args.engine, seed=args.seed, chunk_steps=args.chunk_steps, summary=args.summary,
+                             load_workers=args.load_workers)
+        t0 = time.perf_counter()
+        records = run_batch(jobs, runner)
+        out_path.mkdir(parents=True, exist_ok=True)
+        log_path = out_path / "batch_log.csv"
+        with open(log_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["config", "out", "rows", "seconds"])
+            writer.writeheader()
+            writer.writerows(records)
+        print(f"Ran {len(records)} configs in {time.perf_counter() - t0:.2f}s; outputs in {out_path}, log {log_path}")
+        return
 
-    agents = build_agents(model_cfg)
+    if args.calibrate:
+        if not args.priors:
+            raise SystemExit("--calibrate needs --priors")
+        import pandas as pd
+        from src.black_harrier_abm_v2.build import build_env
+        from src.black_harrier_abm_v2.calibration import CalibrationSimulation, telemetry_stats
+        from src.black_harrier_abm_v2.config import load_config
+        from src.black_harrier_abm_v2.inference import CalibrationSpec, abc_smc, posterior_summary
 
-    sim = ABMSimulation(
-        env=env,
-        agents=agents,
-        policy=policy,
-        alt_model=alt_model,
-        sim_cfg=sim_cfg,
-    )
+        spec = CalibrationSpec.from_file(args.priors)
+        if args.seed is not None:
+            spec.seed = args.seed
+        sim_cfg, model_cfg = load_config(args.config)
+        suffix = Path(args.calibrate).suffix.lower()
+        telemetry = pd.read_parquet(args.calibrate) if suffix in (".parquet", ".pq") else pd.read_csv(args.calibrate)
+        observed = telemetry_stats(telemetry, sim_cfg.step_seconds, spec.bins)
+        calib = CalibrationSimulation.from_config(sim_cfg, model_cfg, build_env(model_cfg), seed=spec.seed,
+                                                  bins=spec.bins)
+        t0 = time.perf_counter()
+        particles = abc_smc(calib.simulator(spec.prior.names), observed, spec)
+        posterior = posterior_summary(particles, spec.prior.names)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        particles.to_csv(out_path, index=False)
+        posterior_path = out_path.with_name(f"{out_path.stem}_posterior{out_path.suffix}")
+        posterior.to_csv(posterior_path, index=False)
+        print(posterior.to_string(index=False))
+        print(f"Calibrated in {time.perf_counter() - t0:.1f}s; saved particles: {out_path}, posterior: {posterior_path}")
+        return
 
-    df: pd.DataFrame = sim.run()
-    out_path = Path(args.out)
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_csv(out_path, index=False)
-    print(f"Saved tracks: {out_path}")
+    if args.rescore:
+        import pandas as pd
+        from src.black_harrier_abm_v2.config import load_config
+        from src.black_harrier_abm_v2.environment import Turbine
+        from src.black_harrier_abm_v2.rescore import load_layouts, rescore_tracks
+
+        sim_cfg, model_cfg = load_config(args.config)
+        layouts = {"config": [Turbine(**t) for t in model_cfg.turbines]}
+        if args.layouts:
+            layouts.update(load_layouts(args.layouts))
+        tables = []
+        for path in args.rescore:
+            table = rescore_tracks(path, layouts, sim_cfg, tracks_dir=args.tracks_dir)
+            table.insert(0, "tracks", path)
+            tables.append(table)
+        scores = pd.concat(tables, ignore_index=True)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        scores.to_csv(out_path, index=False)
+        print(scores[scores["group"] == "total"].to_string(index=False))
+        print(f"Saved layout scores: {out_path}")
+        return
+
+    if args.sweep:
+        from src.black_harrier_abm_v2.sweep import SweepSpec, compare_scenarios, run_sweep
+
+        spec = SweepSpec.from_file(args.sweep)
+        if args.replicates:
+            spec.replicates = args.replicates
+        if args.seed is not None:
+            spec.seed = args.seed
+        per_run = run_sweep(args.config, spec, workers=args.workers, engine=args.engine, chunk_steps=args.chunk_steps)
+        compare = compare_scenarios(per_run, reference=spec.reference)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        per_run.to_csv(out_path, index=False)
+        compare_path = out_path.with_name(f"{out_path.stem}_compare{out_path.suffix}")
+        compare.to_csv(compare_path, index=False)
+        print(compare[compare["group"] == "total"].to_string(index=False))
+        print(f"Saved sweep results: {out_path}, {compare_path}")
+        return
+
+    if args.replicates:
+        from src.black_harrier_abm_v2.replicates import aggregate_replicates, run_replicates
+
+        per_rep = run_replicates(
+            args.config,
+            args.replicates,
+            workers=args.workers,
+            seed=_run_seed(args),
+            engine=args.engine,
+            tracks_dir=args.tracks_dir,
+            chunk_steps=args.chunk_steps,
+        )
+        stats = aggregate_replicates(per_rep)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        per_rep.to_csv(out_path, index=False)
+        stats_path = out_path.with_name(f"{out_path.stem}_stats{out_path.suffix}")
+        stats.to_csv(stats_path, index=False)
+        print(stats[stats["group"] != "turbine"].to_string(index=False))
+        print(f"Saved replicate summaries: {out_path}, {stats_path}")
+        return
+
+    if args.shards:
+        if args.checkpoint or args.profile:
+            raise SystemExit("--shards runs without --checkpoint or --profile")
+        from src.black_harrier_abm_v2.build import build_env
+        from src.black_harrier_abm_v2.config import load_config
+        from src.black_harrier_abm_v2.exposure import ExposureAccumulator
+        from src.black_harrier_abm_v2.shards import run_sharded
+        from src.black_harrier_abm_v2.sinks import open_sink
+
+        sim_cfg, model_cfg = load_config(args.config)
+        seed = _run_seed(args)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        if args.summary:
+            sink = ExposureAccumulator.for_simulation(build_env(model_cfg), sim_cfg)
+        else:
+            sink = open_sink(args.out)
+        with sink:
+            run_sharded(args.config, sink, args.shards, seed=seed, chunk_steps=args.chunk_steps, engine=args.engine)
+        _report(sink, out_path, args.summary)
+        return
+
+    from src.black_harrier_abm_v2.build import build_env, build_samplers, build_simulation
+    from src.black_harrier_abm_v2.checkpoint import Checkpointer, resume, run_with_checkpoints
+    from src.black_harrier_abm_v2.config import load_config
+    from src.black_harrier_abm_v2.exposure import ExposureAccumulator
+    from src.black_harrier_abm_v2.profiling import Profiler
+    from src.black_harrier_abm_v2.sinks import open_sink
+
+    sim_cfg, model_cfg = load_config(args.config)
+    samplers = build_samplers(model_cfg)
+    env = build_env(model_cfg, samplers)
+    profiler = Profiler(enabled=args.profile is not None, progress=_print_progress if args.progress else None)
+    profiler.watch_cache("raster", samplers.cache)
+    if samplers.tiles is not None:
+        profiler.watch_cache("tiles", samplers.tiles)
+    env.profiler = profiler
+    sim = build_simulation(sim_cfg, model_cfg, env, engine=args.engine, seed=args.seed, profiler=profiler)
+
+    checkpointer = None
+    if args.checkpoint:
+        meta = {"config": str(Path(args.config).resolve()), "out": str(out_path.resolve()), "engine": args.engine,
+                "seed": args.seed, "summary": args.summary, "chunk_steps": args.chunk_steps}
+        checkpointer = Checkpointer(args.checkpoint, every_seconds=args.checkpoint_every, meta=meta)
+    if args.resume:
+        if checkpointer is None or not checkpointer.exists():
+            raise SystemExit("--resume needs an existing --checkpoint file")
+        sink = resume(checkpointer, sim)
+        print(f"Resuming from {args.checkpoint}", file=sys.stderr)
+    elif args.summary:
+        sink = ExposureAccumulator.for_simulation(env, sim_cfg)
+    else:
+        sink = open_sink(args.out)
+
+    with sink:
+        run_with_checkpoints(sim, sink, checkpointer, chunk_steps=args.chunk_steps)
+    _report(sink, out_path, args.summary)
+    if checkpointer is not None:
+        checkpointer.clear()
+    if args.profile:
+        for name, cube in samplers.cubes.items():
+            profiler.watch_cache(f"cube.{name}", cube)
+        profiler.to_json(args.profile)
+        print(f"Saved profile: {args.profile}")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
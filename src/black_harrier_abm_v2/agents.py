@@ -1,11 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Dict, Optional, Tuple
+from typing import Dict, Optional, Tuple, Union
 import random
 import math
 import pandas as pd
 
-from .movement import State
+from .movement import STATES, STATE_CODES, State
+from .transitions import CompiledTransitions
 
 
 @dataclass
@@ -74,6 +75,9 @@ TRANSITIONS = {
 }
 
 
+DEFAULT_TRANSITIONS = CompiledTransitions.from_dict(TRANSITIONS)
+
+
 @dataclass
 class HarrierAgent:
     agent_id: int
@@ -86,14 +90,17 @@ class HarrierAgent:
     state_params: Dict[str, StateParams] = field(default_factory=lambda: DEFAULT_STATE_PARAMS)
     step_seconds: int = 60
     rng: random.Random = field(default_factory=random.Random)
+    transitions: CompiledTransitions = field(default_factory=lambda: DEFAULT_TRANSITIONS, repr=False)
 
-    def sample_speed(self) -> float:
+    def sample_speed(self, z: Optional[float] = None) -> float:
+        # ``z``: a standard normal drawn by the caller (see streams.py) instead of from ``self.rng``
         p = self.state_params[self.state]
+        if z is not None:
+            return max(0.0, p.speed_mean + p.speed_sd * z)
         return max(0.0, self.rng.gauss(p.speed_mean, p.speed_sd))
 
-    def next_state(self, season: Season) -> str:
-        row = TRANSITIONS.get(season, {}).get(self.state)
-        if not row:
-            row = {State.FORAGING: 0.5, State.COMMUTING: 0.3, State.ROOSTING: 0.2}
-        states, probs = zip(*row.items())
-        return self.rng.choices(states, weights=probs, k=1)[0]
\ No newline at end of file
+    def next_state(self, season: Union[Season, int], u: Optional[float] = None) -> str:
+        # ``season`` is a name or a code into transitions.SEASONS (as precomputed by TimeGrid)
+        tr = self.transitions
+        code = season if isinstance(season, int) else tr.season_codes[season]
+        return STATES[tr.draw(code, STATE_CODES[self.state], self.rng.random() if u is None else u)]
\ No newline at end of file
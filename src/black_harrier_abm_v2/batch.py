@@ -0,0 +1,179 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from glob import glob
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+import time
+import yaml
+
+from .build import build_env, build_samplers, build_simulation
+from .config import ModelConfig, load_config
+from .environment import Environment
+from .exposure import ExposureAccumulator
+from .sinks import open_sink
+
+if TYPE_CHECKING:
+    from .samplers.raster import RasterCache, RasterSamplers
+
+MANIFEST_SUFFIXES = (".txt", ".lst")
+
+
+@dataclass
+class BatchJob:
+    config: str
+    out: str
+
+
+def _expand(item: str, base: Path) -> List[str]:
+    path = item if Path(item).is_absolute() else str(base / item)
+    if any(ch in item for ch in "*?["):
+        return sorted(glob(path, recursive=True))
+    return [path]
+
+
+def _manifest_entries(path: Path) -> Optional[List]:
+    """Entries of a manifest file, or None when ``path`` is a model config."""
+    if path.suffix.lower() in MANIFEST_SUFFIXES:
+        lines = (line.split("#", 1)[0].strip() for line in path.read_text().splitlines())
+        return [line for line in lines if line]
+    with open(path, "r") as f:
+        doc = yaml.safe_load(f)
+    if isinstance(doc, dict) and "configs" in doc:
+        return list(doc["configs"])
+    return None
+
+
+def expand_jobs(items: Iterable[str], out_dir: str, suffix: str = ".csv") -> List[BatchJob]:
+    """Configs from paths, globs and manifests, each with its output path.
+
+    A manifest is a ``.txt``/``.lst`` file with one path or glob per line, or a YAML file with a
+    ``configs`` list whose entries are paths/globs or ``{config, out}`` mappings; relative entries are
+    resolved against the manifest's directory. Outputs default to ``<out_dir>/<config stem><suffix>``.
+    """
+    jobs: List[BatchJob] = []
+    for item in items:
+        for path in _expand(item, Path.cwd()):
+            entries = _manifest_entries(Path(path))
+            if entries is None:
+                jobs.append(BatchJob(config=path, out=str(Path(out_dir) / f"{Path(path).stem}{suffix}")))
+                continue
+            base = Path(path).parent
+            for entry in entries:
+                if isinstance(entry, dict):
+                    cfg = _expand(str(entry["config"]), base)[0]
+                    out = entry.get("out") or f"{Path(cfg).stem}{suffix}"
+                    jobs.append(BatchJob(config=cfg, out=str(Path(out_dir) / out)))
+                else:
+                    jobs.extend(BatchJob(config=c, out=str(Path(out_dir) / f"{Path(c).stem}{suffix}"))
+                                for c in _expand(str(entry), base))
+    outs = [j.out for j in jobs]
+    dupes = sorted({o for o in outs if outs.count(o) > 1})
+    if dupes:
+        raise ValueError(f"several configs would write the same output: {dupes}; give them explicit outs")
+    return jobs
+
+
+def _inputs_key(cfg: ModelConfig) -> Tuple:
+    i = cfg.inputs
+    return (i.habitat_raster, i.dem_raster, i.wind_u_raster, i.wind_v_raster, i.crs_epsg, i.terrain_cache_dir,
+            i.time_interp, i.prefetch_slices, repr(i.cube_options), i.tile_size, i.tile_prefetch_steps,
+            i.raster_cache_mb)
+
+
+@dataclass
+class BatchRunner:
+    """Runs many configs in one process, sharing rasters, samplers and environments between them.
+
+    Whole-band rasters live in one ``RasterCache`` per CRS, so a raster referenced by several configs is
+    read once; ``preload`` reads the distinct rasters of a batch concurrently. A shared cache is bounded by
+    ``raster_cache_mb`` or, when that is None, by the largest ``inputs.raster_cache_mb`` of the configs
+    using it (unbounded if any of them sets none). Configs with identical ``inputs`` share a
+    ``RasterSamplers`` and, with the same turbines too, an ``Environment``.
+    """
+
+    engine: str = "agent"
+    seed: Optional[int] = None
+    chunk_steps: int = 60
+    summary: bool = False
+    load_workers: int = 4
+    raster_cache_mb: Optional[float] = None
+    samplers_built: int = field(default=0, init=False)
+    envs_built: int = field(default=0, init=False)
+    _caches: Dict[int, "RasterCache"] = field(default_factory=dict, init=False, repr=False)
+    _samplers: Dict[Tuple, "RasterSamplers"] = field(default_factory=dict, init=False, repr=False)
+    _envs: Dict[Tuple, Environment] = field(default_factory=dict, init=False, repr=False)
+
+    def _cache(self, cfg: ModelConfig) -> "RasterCache":
+        from .samplers.raster import RasterCache
+
+        mb = self.raster_cache_mb if self.raster_cache_mb is not None else cfg.inputs.raster_cache_mb
+        budget = None if mb is None else int(mb * 1024 * 1024)
+        cache = self._caches.get(cfg.inputs.crs_epsg)
+        if cache is None:
+            cache = self._caches[cfg.inputs.crs_epsg] = RasterCache(default_crs_epsg=cfg.inputs.crs_epsg,
+                                                                    max_resident_bytes=budget)
+        elif cache.max_resident_bytes is not None:
+            cache.max_resident_bytes = None if budget is None else max(cache.max_resident_bytes, budget)
+        return cache
+
+    def preload(self, model_cfgs: Iterable[ModelConfig]) -> None:
+        """Read every distinct whole-band raster of the batch up front, ``load_workers`` at a time."""
+        from .samplers.temporal import is_cube_path
+
+        by_crs: Dict[int, List[str]] = {}
+        for cfg in model_cfgs:
+            if cfg.inputs.tile_size:
+                continue
+            paths = (cfg.inputs.habitat_raster, cfg.inputs.dem_raster, cfg.inputs.wind_u_raster,
+                     cfg.inputs.wind_v_raster)
+            by_crs.setdefault(cfg.inputs.crs_epsg, []).extend(p for p in paths if p)
+            self._cache(cfg)  # sizes the shared budget from every config before anything is read
+        for crs_epsg, paths in by_crs.items():
+            static = [p for p in dict.fromkeys(paths) if not is_cube_path(p)]
+            self._caches[crs_epsg].load_many(static, workers=self.load_workers)
+
+    def environment(self, cfg: ModelConfig) -> Environment:
+        key = _inputs_key(cfg)
+        samplers = self._samplers.get(key)
+        if samplers is None:
+            cache = None if cfg.inputs.tile_size else self._cache(cfg)
+            samplers = self._samplers[key] = build_samplers(cfg, cache=cache)
+            self.samplers_built += 1
+        env_key = key + (repr(cfg.turbines), cfg.inputs.static_utility, cfg.inputs.utility_cache_dir)
+        env = self._envs.get(env_key)
+        if env is None:
+            env = self._envs[env_key] = build_env(cfg, samplers)
+            self.envs_built += 1
+        return env
+
+    def run(self, job: BatchJob) -> Dict:
+        t0 = time.perf_counter()
+        sim_cfg, model_cfg = load_config(job.config)
+        env = self.environment(model_cfg)
+        sim = build_simulation(sim_cfg, model_cfg, env, engine=self.engine, seed=self.seed)
+        Path(job.out).parent.mkdir(parents=True, exist_ok=True)
+        sink = ExposureAccumulator.for_simulation(env, sim_cfg) if self.summary else open_sink(job.out)
+        with sink:
+            sim.run_to(sink, chunk_steps=self.chunk_steps)
+        if self.summary:
+            sink.table().to_csv(job.out, index=False)
+        return {"config": job.config, "out": job.out, "rows": sink.rows_written,
+                "seconds": time.perf_counter() - t0}
+
+    def close(self) -> None:
+        self._envs.clear()
+        for samplers in self._samplers.values():
+            samplers.close()
+        self._samplers.clear()
+        for cache in self._caches.values():
+            cache.close()
+
+
+def run_batch(jobs: List[BatchJob], runner: Optional[BatchRunner] = None) -> List[Dict]:
+    """Run every job in order; one record (config, out, rows, seconds) per job."""
+    runner = runner or BatchRunner()
+    try:
+        runner.preload(load_config(job.config)[1] for job in jobs)
+        return [runner.run(job) for job in jobs]
+    finally:
+        runner.close()
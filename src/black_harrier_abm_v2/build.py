@@ -0,0 +1,170 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Optional, Union
+
+from .config import SimulationConfig, ModelConfig, WeightsConfig
+from .environment import Environment, Turbine
+from .agents import DEFAULT_TRANSITIONS, HarrierAgent
+from .movement import (
+    StepSelectionPolicy,
+    AltitudeModel,
+    AltitudePriors as MovAltitudePriors,
+    State,
+    Weights as MovWeights,
+)
+from .transitions import CompiledTransitions
+from .profiling import NULL_PROFILER, Profiler
+from .risk import ABMSimulation
+from .population import PopulationSimulation
+from .scheduling import AdaptiveStepping
+from .streams import RandomStreams
+
+if TYPE_CHECKING:
+    from .samplers.raster import RasterCache, RasterSamplers
+
+ENGINES = ("agent", "population")
+
+
+def build_samplers(cfg: ModelConfig, cache: Optional["RasterCache"] = None) -> "RasterSamplers":
+    """Samplers for ``cfg.inputs``, opened; pass ``cache`` to share loaded bands with other samplers."""
+    # Deferred: rasterio/pyproj load only for runs that sample rasters
+    from .samplers.raster import RasterSamplers
+
+    if cfg.inputs.crs_epsg is None:
+        raise ValueError("crs_epsg must not be None")
+    return RasterSamplers(
+        habitat_raster=cfg.inputs.habitat_raster,
+        dem_raster=cfg.inputs.dem_raster,
+        wind_u_raster=cfg.inputs.wind_u_raster,
+        wind_v_raster=cfg.inputs.wind_v_raster,
+        crs_epsg=cfg.inputs.crs_epsg,
+        max_resident_bytes=(
+            int(cfg.inputs.raster_cache_mb * 1024 * 1024) if cfg.inputs.raster_cache_mb is not None else None
+        ),
+        terrain_cache_dir=cfg.inputs.terrain_cache_dir,
+        time_interp=cfg.inputs.time_interp,
+        prefetch_slices=cfg.inputs.prefetch_slices,
+        cube_options=cfg.inputs.cube_options,
+        cache=cache,
+        tile_size=cfg.inputs.tile_size,
+        tile_prefetch_steps=cfg.inputs.tile_prefetch_steps,
+    ).open()
+
+
+def build_env(cfg: ModelConfig, samplers: Optional["RasterSamplers"] = None) -> Environment:
+    if samplers is None:
+        samplers = build_samplers(cfg)
+    env = Environment.from_samplers(samplers, turbines=[Turbine(**t) for t in cfg.turbines])
+    if cfg.inputs.static_utility:
+        from .utility import StaticUtility
+
+        env.static_utility = StaticUtility.from_samplers(samplers, cache_dir=cfg.inputs.utility_cache_dir)
+    return env
+
+
+def to_movement_weights(w: WeightsConfig) -> MovWeights:
+    """Adapter: config.WeightsConfig -> movement.Weights"""
+    return MovWeights(
+        w_habitat=w.w_habitat,
+        w_wind=w.w_wind,
+        w_target=w.w_target,
+        w_slope_penalty=w.w_slope_penalty,
+        w_turbine_avoid=w.w_turbine_avoid,
+        softmax_beta=w.softmax_beta,
+    )
+
+
+def build_agents(cfg: ModelConfig) -> list[HarrierAgent]:
+    def _pair(lat: Optional[float], lon: Optional[float]) -> Optional[tuple[float, float]]:
+        if lat is None or lon is None:
+            return None
+        return float(lat), float(lon)
+
+    agents: list[HarrierAgent] = []
+    for a in cfg.agents:
+        # Required keys via TypedDict
+        start_lat: float = float(a["start_lat"])  # ensure float type
+        start_lon: float = float(a["start_lon"])
+        state_str: str = a.get("state", State.BREEDING)
+        sex_str: str = a.get("sex", "unknown")
+
+        nest = _pair(a.get("nest_lat"), a.get("nest_lon"))
+        roost = _pair(a.get("roost_lat"), a.get("roost_lon"))
+
+        agents.append(
+            HarrierAgent(
+                agent_id=int(a["id"]),
+                lat=start_lat,
+                lon=start_lon,
+                state=state_str,
+                sex=sex_str,
+                nest=nest,
+                roost=roost,
+            )
+        )
+    return agents
+
+
+def build_altitude_priors(model_cfg: ModelConfig) -> MovAltitudePriors:
+    ap = model_cfg.altitude_priors
+    return MovAltitudePriors(
+        means={
+            "breeding": ap.breeding_mean,
+            "foraging": ap.foraging_mean,
+            "commuting": ap.commuting_mean,
+            "displaying": ap.displaying_mean,
+            "migrating": ap.migrating_mean,
+            "roosting": ap.roosting_mean,
+        },
+        sds={
+            "breeding": ap.breeding_sd,
+            "foraging": ap.foraging_sd,
+            "commuting": ap.commuting_sd,
+            "displaying": ap.displaying_sd,
+            "migrating": ap.migrating_sd,
+            "roosting": ap.roosting_sd,
+        },
+    )
+
+
+def build_transitions(model_cfg: ModelConfig) -> CompiledTransitions:
+    if model_cfg.transitions_file is None:
+        return DEFAULT_TRANSITIONS
+    return CompiledTransitions.from_file(model_cfg.transitions_file)
+
+
+def build_simulation(
+    sim_cfg: SimulationConfig,
+    model_cfg: ModelConfig,
+    env: Environment,
+    engine: str = "agent",
+    seed: Optional[int] = None,
+    replicate: int = 0,
+    profiler: Optional[Profiler] = None,
+) -> Union[ABMSimulation, PopulationSimulation]:
+    """Fresh agents, policy and altitude model around an already-built ``env``.
+
+    Every draw comes from counter-based streams keyed by ``seed`` (else ``sim_cfg.seed``, else fresh
+    entropy) and ``replicate``, so both engines give the same tracks for the same seed.
+    """
+    policy = StepSelectionPolicy(weights=to_movement_weights(model_cfg.weights))
+    alt_model = AltitudeModel(priors=build_altitude_priors(model_cfg))
+    seed = sim_cfg.seed if seed is None else seed
+    streams = RandomStreams.fresh(replicate) if seed is None else RandomStreams(seed, replicate)
+    agents = build_agents(model_cfg)
+    transitions = build_transitions(model_cfg)
+    for ag in agents:
+        ag.transitions = transitions
+    profiler = profiler or NULL_PROFILER
+    scheduler = AdaptiveStepping.from_config(env.turbine_index, sim_cfg)
+    if engine == "agent":
+        return ABMSimulation(
+            env=env, agents=agents, policy=policy, alt_model=alt_model, sim_cfg=sim_cfg, profiler=profiler,
+            scheduler=scheduler, streams=streams,
+        )
+    if engine == "population":
+        sim = PopulationSimulation.from_agents(env, agents, policy, alt_model, sim_cfg, transitions=transitions)
+        sim.profiler = profiler
+        sim.scheduler = scheduler
+        sim.streams = streams
+        return sim
+    raise ValueError(f"unknown engine {engine!r}; expected one of {ENGINES}")
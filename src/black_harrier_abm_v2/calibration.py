@@ -0,0 +1,295 @@
+from __future__ import annotations
+from dataclasses import dataclass, field, fields
+from typing import Callable, Dict, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+from .config import ModelConfig, SimulationConfig
+from .environment import Environment
+from .movement import STATES, STATE_CODES, AltitudePriors, StepSelectionPolicy, Weights
+from .population import _HIGH_FLIGHT_STATES, _NEST_STATES, _ROOST_STATES, Population
+from .timegrid import TimeGrid
+from .transitions import SEASONS, CompiledTransitions
+from .utils.geo import bearing_deg_many, destination_point_many, haversine_m_many
+
+PARAMETER_SECTIONS = ("weights", "altitude_priors", "speed", "transitions")
+STAT_BLOCKS = ("step_length", "turning", "altitude", "occupancy")
+
+
+@dataclass
+class SummaryBins:
+    """Histogram edges of the calibration statistics; values beyond the outer edges fall in the end bins."""
+
+    step_length_m: np.ndarray = field(default_factory=lambda: np.linspace(0.0, 1200.0, 25))
+    turning_deg: np.ndarray = field(default_factory=lambda: np.linspace(-180.0, 180.0, 19))
+    altitude_m: np.ndarray = field(default_factory=lambda: np.linspace(0.0, 200.0, 21))
+    min_move_m: float = 1.0  # turning angles only between two steps at least this long
+
+    def sizes(self) -> Dict[str, int]:
+        return {
+            "step_length": len(self.step_length_m) - 1,
+            "turning": len(self.turning_deg) - 1,
+            "altitude": len(self.altitude_m) - 1,
+            "occupancy": len(STATES),
+        }
+
+    def blocks(self) -> Dict[str, slice]:
+        """Column range of each statistic in the vectors returned by ``SummaryAccumulator.stats``."""
+        out, start = {}, 0
+        for name, size in self.sizes().items():
+            out[name] = slice(start, start + size)
+            start += size
+        return out
+
+
+def _bin(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    return np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+
+
+def turning_angles(prev_hdg: np.ndarray, hdg: np.ndarray) -> np.ndarray:
+    """Signed heading change in [-180, 180) degrees; NaN where the previous heading is NaN."""
+    return (np.asarray(hdg) - prev_hdg + 180.0) % 360.0 - 180.0
+
+
+class SummaryAccumulator:
+    """Step-length, turning-angle and altitude histograms and state counts for ``n_sets`` parameter sets."""
+
+    def __init__(self, n_sets: int, bins: Optional[SummaryBins] = None) -> None:
+        self.bins = bins or SummaryBins()
+        self.counts = {name: np.zeros((n_sets, size)) for name, size in self.bins.sizes().items()}
+
+    def _add(self, name: str, sets: np.ndarray, idx: np.ndarray) -> None:
+        c = self.counts[name]
+        c += np.bincount(sets * c.shape[1] + idx, minlength=c.size).reshape(c.shape)
+
+    def update(self, sets: np.ndarray, step_m: np.ndarray, turn_deg: np.ndarray, alt_m: np.ndarray,
+               states: Optional[np.ndarray]) -> None:
+        """Add one value per row; NaN values (and state codes < 0) are left out of their histogram."""
+        b = self.bins
+        for name, values, edges in (("step_length", step_m, b.step_length_m), ("turning", turn_deg, b.turning_deg),
+                                    ("altitude", alt_m, b.altitude_m)):
+            values = np.asarray(values, dtype=float)
+            ok = ~np.isnan(values)
+            self._add(name, sets[ok], _bin(values[ok], edges))
+        if states is not None:
+            states = np.asarray(states, dtype=np.intp)
+            ok = states >= 0
+            self._add("occupancy", sets[ok], states[ok])
+
+    def stats(self) -> np.ndarray:
+        """(n_sets, n_stats): each statistic's histogram as proportions, NaN for a statistic with no data."""
+        out = []
+        for c in self.counts.values():
+            total = c.sum(axis=1, keepdims=True)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                out.append(np.where(total > 0, c / total, np.nan))
+        return np.concatenate(out, axis=1)
+
+
+def telemetry_stats(df: pd.DataFrame, step_seconds: float, bins: Optional[SummaryBins] = None) -> np.ndarray:
+    """Summary statistics of GPS tracks (columns ``t``, ``agent_id``, ``lat``, ``lon``, ``alt_m``, optional
+    ``state`` as names or codes), comparable with ``CalibrationSimulation`` output.
+
+    Steps are consecutive fixes of one agent ``step_seconds`` apart (within 10%); other gaps break the
+    track, so resample telemetry to the simulation step first. Without ``state`` occupancy is NaN.
+    """
+    bins = bins or SummaryBins()
+    df = df.sort_values(["agent_id", "t"], kind="stable")
+    t = pd.to_datetime(df["t"]).to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+    agent = df["agent_id"].to_numpy()
+    lat, lon = df["lat"].to_numpy(dtype=float), df["lon"].to_numpy(dtype=float)
+    acc = SummaryAccumulator(1, bins)
+
+    step = np.r_[False, (agent[1:] == agent[:-1]) & (np.abs(np.diff(t) - step_seconds) <= 0.1 * step_seconds)]
+    step_m = np.full(len(df), np.nan)
+    hdg = np.full(len(df), np.nan)
+    i = np.flatnonzero(step)
+    step_m[i] = haversine_m_many(lat[i - 1], lon[i - 1], lat[i], lon[i])
+    hdg[i] = bearing_deg_many(lat[i - 1], lon[i - 1], lat[i], lon[i])
+    moved = step_m >= bins.min_move_m
+    turn = np.full(len(df), np.nan)
+    j = np.flatnonzero(np.r_[False, moved[1:] & moved[:-1] & step[1:]])
+    turn[j] = turning_angles(hdg[j - 1], hdg[j])
+
+    states = None
+    if "state" in df:
+        s = df["state"]
+        if pd.api.types.is_numeric_dtype(s):
+            states = s.to_numpy(dtype=np.intp)
+        else:
+            states = s.astype(str).map(STATE_CODES).fillna(-1).to_numpy(dtype=np.intp)
+    sets = np.zeros(len(df), dtype=np.intp)
+    acc.update(sets, step_m, turn, df["alt_m"].to_numpy(dtype=float), states)
+    return acc.stats()[0]
+
+
+@dataclass
+class ParameterBatch:
+    """Model parameters of ``n_sets`` simulations: the base model with some values replaced per set.
+
+    Weight fields are scalars or ``(n_sets,)`` arrays. Altitude and speed tables are ``(n_sets, n_states)``;
+    speed entries are NaN where each agent keeps its own value. ``cdf`` holds the cumulative transition
+    rows, ``(n_sets, n_seasons, n_states, n_states)``.
+    """
+
+    n_sets: int
+    weights: Weights
+    alt_means: np.ndarray
+    alt_sds: np.ndarray
+    speed_mean: np.ndarray
+    speed_sd: np.ndarray
+    cdf: np.ndarray
+
+    @classmethod
+    def from_values(cls, names: Sequence[str], values: np.ndarray, weights: Weights, priors: AltitudePriors,
+                    transitions: CompiledTransitions) -> "ParameterBatch":
+        """Parameter sets from rows of ``values``, one column per name in ``names``.
+
+        Names are ``weights.<field>``, ``altitude_priors.<state>_mean|_sd``, ``speed.<state>_mean|_sd`` or
+        ``transitions.<season>.<from>.<to>``. A transition value replaces that probability and its row is
+        renormalized to sum to 1.
+        """
+        values = np.atleast_2d(np.asarray(values, dtype=float))
+        if values.shape[1] != len(names):
+            raise ValueError(f"expected {len(names)} parameter columns, got {values.shape[1]}")
+        P, K = len(values), len(STATES)
+        w = {f.name: getattr(weights, f.name) for f in fields(Weights)}
+        means, sds = (np.tile(a, (P, 1)) for a in priors.arrays())
+        speed = {"mean": np.full((P, K), np.nan), "sd": np.full((P, K), np.nan)}
+        probs = np.broadcast_to(transitions.probs, (P,) + transitions.probs.shape).copy()
+        touched = set()
+        for j, name in enumerate(names):
+            section, _, key = name.partition(".")
+            col = values[:, j]
+            if section == "weights" and key in w:
+                w[key] = col
+            elif section in ("altitude_priors", "speed"):
+                state, _, stat = key.rpartition("_")
+                if state not in STATE_CODES or stat not in ("mean", "sd"):
+                    raise ValueError(f"cannot calibrate {name!r}; expected {section}.<state>_mean or _sd")
+                k = STATE_CODES[state]
+                if section == "speed":
+                    speed[stat][:, k] = col
+                else:
+                    (means if stat == "mean" else sds)[:, k] = col
+            elif section == "transitions":
+                season, frm, to = (key.split(".") + ["", "", ""])[:3]
+                if season not in SEASONS or frm not in STATE_CODES or to not in STATE_CODES:
+                    raise ValueError(f"cannot calibrate {name!r}; expected transitions.<season>.<from>.<to>")
+                s, i = SEASONS.index(season), STATE_CODES[frm]
+                probs[:, s, i, STATE_CODES[to]] = np.maximum(col, 0.0)
+                touched.add((s, i))
+            else:
+                raise ValueError(f"cannot calibrate {name!r}; expected <section>.<name> with section in "
+                                 f"{PARAMETER_SECTIONS}")
+        for s, i in touched:
+            probs[:, s, i] /= probs[:, s, i].sum(axis=1, keepdims=True)
+        cdf = np.cumsum(probs, axis=3)
+        cdf[..., -1] = 1.0
+        return cls(n_sets=P, weights=Weights(**w), alt_means=means, alt_sds=sds, speed_mean=speed["mean"],
+                   speed_sd=speed["sd"], cdf=cdf)
+
+    def row_weights(self, sets: np.ndarray) -> Weights:
+        """Weights for simulation rows belonging to parameter sets ``sets``: arrays become ``(rows, 1)``."""
+        return Weights(**{
+            f.name: (v[sets][:, None] if np.ndim(v) else v)
+            for f in fields(Weights) for v in [getattr(self.weights, f.name)]
+        })
+
+
+@dataclass
+class CalibrationSimulation:
+    """Vectorized engine running many parameter sets at once and reducing them to summary statistics.
+
+    Every parameter set runs the config's agents through the population engine's model; the arrays hold
+    one row per (parameter set, agent), so the parameter set is one more array axis and a batch costs
+    one simulation. Instead of tracks, each run returns ``SummaryAccumulator.stats`` per set: step-length,
+    turning-angle and altitude histograms and state occupancy (see ``telemetry_stats`` for the observed
+    counterpart). Successive runs continue one generator seeded from ``seed``.
+    """
+
+    env: Environment
+    population: Population
+    policy: StepSelectionPolicy
+    priors: AltitudePriors
+    sim_cfg: SimulationConfig
+    transitions: CompiledTransitions
+    bins: SummaryBins = field(default_factory=SummaryBins)
+    seed: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        self._rng = np.random.default_rng(self.seed)
+
+    @classmethod
+    def from_config(cls, sim_cfg: SimulationConfig, model_cfg: ModelConfig, env: Environment,
+                    seed: Optional[int] = None, bins: Optional[SummaryBins] = None) -> "CalibrationSimulation":
+        from .build import build_agents, build_altitude_priors, build_transitions, to_movement_weights
+
+        return cls(
+            env=env,
+            population=Population.from_agents(build_agents(model_cfg)),
+            policy=StepSelectionPolicy(weights=to_movement_weights(model_cfg.weights)),
+            priors=build_altitude_priors(model_cfg),
+            sim_cfg=sim_cfg,
+            transitions=build_transitions(model_cfg),
+            bins=bins or SummaryBins(),
+            seed=seed,
+        )
+
+    def parameters(self, names: Sequence[str], values: np.ndarray) -> ParameterBatch:
+        return ParameterBatch.from_values(names, values, self.policy.weights, self.priors, self.transitions)
+
+    def simulator(self, names: Sequence[str]) -> Callable[[np.ndarray], np.ndarray]:
+        """``values (n_sets, len(names)) -> stats (n_sets, n_stats)``, for the ABC drivers in ``inference``."""
+        return lambda values: self.run(self.parameters(names, values))
+
+    def run(self, batch: ParameterBatch) -> np.ndarray:
+        pop, cfg, rng = self.population, self.sim_cfg, self._rng
+        P, N = batch.n_sets, len(pop)
+        M = P * N
+        sets = np.repeat(np.arange(P), N)
+        rows = np.arange(M)
+        lat, lon = np.tile(pop.lat, P), np.tile(pop.lon, P)
+        codes = np.tile(pop.state, P)
+        nest_lat, nest_lon = np.tile(pop.nest_lat, P), np.tile(pop.nest_lon, P)
+        roost_lat, roost_lon = np.tile(pop.roost_lat, P), np.tile(pop.roost_lon, P)
+        sm, ss = batch.speed_mean[sets], batch.speed_sd[sets]
+        speed_mean = np.where(np.isnan(sm), np.tile(pop.speed_mean, (P, 1)), sm)
+        speed_sd = np.where(np.isnan(ss), np.tile(pop.speed_sd, (P, 1)), ss)
+        policy = StepSelectionPolicy(weights=batch.row_weights(sets), n_headings=self.policy.n_headings,
+                                     step_seconds=self.policy.step_seconds)
+        acc = SummaryAccumulator(P, self.bins)
+        prev_bearing = np.full(M, np.nan)
+        prev_step = np.zeros(M)
+
+        grid = TimeGrid.from_config(cfg, *((float(pop.lat.mean()), float(pop.lon.mean())) if N else ()))
+        self.env.prepare_times(grid.times)
+        for i in range(len(grid)):
+            t = grid.timestamp(i)
+            season = int(grid.season[i])
+            cdf = batch.cdf[sets, season, codes]
+            codes = np.minimum((cdf <= rng.random(M)[:, None]).sum(axis=1), len(STATES) - 1).astype(np.int8)
+
+            speed = np.maximum(0.0, speed_mean[rows, codes] + speed_sd[rows, codes] * rng.standard_normal(M))
+            speed = np.maximum(0.1, speed)
+            use_nest = _NEST_STATES[codes] & ~np.isnan(nest_lat)
+            use_roost = _ROOST_STATES[codes] & ~np.isnan(roost_lat)
+            target_lat = np.where(use_nest, nest_lat, np.where(use_roost, roost_lat, np.nan))
+            target_lon = np.where(use_nest, nest_lon, np.where(use_roost, roost_lon, np.nan))
+
+            hdg = policy.choose_headings(lat, lon, speed, t, self.env, target_lat, target_lon, rng.random(M),
+                                         step_seconds=cfg.step_seconds)
+            step = speed * cfg.step_seconds
+            lat0, lon0 = lat, lon
+            lat, lon = destination_point_many(lat, lon, hdg, step)
+            self.env.prefetch(lat, lon, hdg, step)
+            alt = np.maximum(0.0, batch.alt_means[sets, codes] + batch.alt_sds[sets, codes] * rng.standard_normal(M))
+            alt = np.where(_HIGH_FLIGHT_STATES[codes], alt * 1.1, alt)
+
+            # Bearings from positions, as ``telemetry_stats`` sees them
+            bearing = bearing_deg_many(lat0, lon0, lat, lon)
+            moved = (step >= self.bins.min_move_m) & (prev_step >= self.bins.min_move_m)
+            turn = np.where(moved, turning_angles(prev_bearing, bearing), np.nan)
+            acc.update(sets, step, turn, alt, codes)
+            prev_bearing, prev_step = bearing, step
+        return acc.stats()
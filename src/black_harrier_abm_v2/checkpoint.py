@@ -0,0 +1,93 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+import os
+import pickle
+import time
+
+from .population import PopulationSimulation
+from .risk import ABMSimulation
+from .sinks import TrackSink, resume_sink
+
+Simulation = Union[ABMSimulation, PopulationSimulation]
+CHECKPOINT_VERSION = 1
+
+
+@dataclass
+class Checkpointer:
+    """Periodically pickles the simulation and sink state to ``path`` (atomically, via a temp file).
+
+    Checkpoints are taken at chunk boundaries, right after a chunk has been written to the sink, so the
+    saved step index and the sink position always agree. ``meta`` (e.g. config path, engine, seed) is
+    stored alongside and must match on resume.
+    """
+
+    path: str
+    every_seconds: float = 300.0
+    meta: Dict[str, Any] = field(default_factory=dict)
+    saves: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        self._last = time.monotonic()
+
+    def save(self, sim: Simulation, sink: TrackSink) -> None:
+        state = {
+            "version": CHECKPOINT_VERSION,
+            "meta": self.meta,
+            "sim": sim.snapshot(),
+            "sink": sink.checkpoint(),
+        }
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.path)
+        self.saves += 1
+        self._last = time.monotonic()
+
+    def due(self) -> bool:
+        return time.monotonic() - self._last >= self.every_seconds
+
+    def load(self) -> Dict[str, Any]:
+        with open(self.path, "rb") as f:
+            state = pickle.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"{self.path}: unsupported checkpoint version {state.get('version')!r}")
+        if state["meta"] != self.meta:
+            raise ValueError(f"{self.path}: checkpoint was written for {state['meta']}, not {self.meta}")
+        return state
+
+    def exists(self) -> bool:
+        return Path(self.path).exists()
+
+    def clear(self) -> None:
+        Path(self.path).unlink(missing_ok=True)
+
+
+def resume(checkpointer: Checkpointer, sim: Simulation) -> TrackSink:
+    """Restore ``sim`` from the last checkpoint and reopen its sink at the checkpointed position."""
+    state = checkpointer.load()
+    sim.restore(state["sim"])
+    return resume_sink(state["sink"])
+
+
+def run_with_checkpoints(
+    sim: Simulation, sink: TrackSink, checkpointer: Optional[Checkpointer], chunk_steps: int = 60
+) -> int:
+    """Like ``sim.run_to(sink)``, saving a checkpoint whenever ``checkpointer.every_seconds`` have passed.
+
+    The caller closes ``sink`` and then removes the checkpoint with ``checkpointer.clear()``.
+    """
+    if checkpointer is None:
+        return sim.run_to(sink, chunk_steps=chunk_steps)
+    prof = sim.profiler
+    for batch in sim.iter_steps(chunk_steps):
+        t0 = prof.clock()
+        sink.write(batch)
+        t1 = prof.clock()
+        prof.add("output", t1 - t0, items=len(batch["agent_id"]))
+        if checkpointer.due():
+            checkpointer.save(sim, sink)
+            prof.add("checkpoint", prof.clock() - t1)
+    return sink.rows_written
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
 import yaml
 import pandas as pd
@@ -12,6 +12,18 @@ class InputsConfig:
     wind_u_raster: str | None
     wind_v_raster: str | None
     crs_epsg: int | None = 4326
+    raster_cache_mb: float | None = None  # resident-band budget; None keeps every layer loaded
+    terrain_cache_dir: str | None = None  # reuse slope/aspect computed from the same DEM across runs
+    # Time-indexed habitat/wind layers (multiband GeoTIFF, NetCDF, Zarr)
+    time_interp: str = "linear"  # or "nearest"
+    prefetch_slices: int = 1
+    cube_options: dict = field(default_factory=dict)  # per layer (habitat, wind_u, wind_v): variable, start, freq, interp
+    # Tiled windowed reads for static layers too large to hold whole; raster_cache_mb then bounds resident tiles
+    tile_size: int | None = None
+    tile_prefetch_steps: float = 1.0
+    # Precompute habitat/slope/turbine utility once per weights and layout; optionally cached on disk
+    static_utility: bool = False
+    utility_cache_dir: str | None = None
 
 
 @dataclass
@@ -49,6 +61,10 @@ class SimulationConfig:
     bsa_min_m: float = 30.0
     bsa_max_m: float = 130.0
     turbine_influence_m: float = 200.0
+    exposure_mode: str = "point"  # or "segment": exposure along each step's path, see exposure.py
+    adaptive_stepping: bool = False  # skip turbine queries for agents beyond every turbine's reach, see scheduling.py
+    adaptive_buffer_m: float = 50.0  # safety margin added to the turbine reach
+    seed: int | None = None  # run seed when none is given on the command line; see streams.py
 
 
 @dataclass
@@ -58,6 +74,7 @@ class ModelConfig:
     altitude_priors: AltitudePriors
     turbines: list[dict]
     agents: list[dict]
+    transitions_file: str | None = None  # YAML/JSON seasonal matrices; None uses agents.TRANSITIONS
 
 
 def load_config(path: str) -> tuple[SimulationConfig, ModelConfig]:
@@ -74,6 +91,10 @@ def load_config(path: str) -> tuple[SimulationConfig, ModelConfig]:
         bsa_min_m=float(sim.get("bsa_min_m", 30.0)),
         bsa_max_m=float(sim.get("bsa_max_m", 130.0)),
         turbine_influence_m=float(sim.get("turbine_influence_m", 200.0)),
+        exposure_mode=sim.get("exposure_mode", "point"),
+        adaptive_stepping=bool(sim.get("adaptive_stepping", False)),
+        adaptive_buffer_m=float(sim.get("adaptive_buffer_m", 50.0)),
+        seed=None if sim.get("seed") is None else int(sim["seed"]),
     )
 
     inputs_cfg = InputsConfig(
@@ -82,6 +103,15 @@ def load_config(path: str) -> tuple[SimulationConfig, ModelConfig]:
         wind_u_raster=model["inputs"].get("wind_u_raster"),
         wind_v_raster=model["inputs"].get("wind_v_raster"),
         crs_epsg=int(model["inputs"].get("crs_epsg", 4326)),
+        raster_cache_mb=model["inputs"].get("raster_cache_mb"),
+        terrain_cache_dir=model["inputs"].get("terrain_cache_dir"),
+        time_interp=model["inputs"].get("time_interp", "linear"),
+        prefetch_slices=int(model["inputs"].get("prefetch_slices", 1)),
+        cube_options=model["inputs"].get("cube_options") or {},
+        tile_size=model["inputs"].get("tile_size"),
+        tile_prefetch_steps=float(model["inputs"].get("tile_prefetch_steps", 1.0)),
+        static_utility=bool(model["inputs"].get("static_utility", False)),
+        utility_cache_dir=model["inputs"].get("utility_cache_dir"),
     )
 
     weights_cfg = WeightsConfig(**model.get("weights", {}))
@@ -93,6 +123,7 @@ def load_config(path: str) -> tuple[SimulationConfig, ModelConfig]:
         altitude_priors=altitude_cfg,
         turbines=model.get("turbines", []),
         agents=model.get("agents", []),
+        transitions_file=model.get("transitions_file"),
     )
 
     return sim_cfg, model_cfg
\ No newline at end of file
@@ -1,8 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Callable, Optional, Tuple, List
+from typing import Any, Callable, Optional, Tuple, List
+import numpy as np
 import pandas as pd
 
+from .spatial import TurbineIndex
+from .profiling import NULL_PROFILER, Profiler
+
 
 @dataclass
 class Turbine:
@@ -19,12 +23,70 @@ class Environment:
     wind_sampler: Optional[Callable[[float, float, pd.Timestamp], Tuple[float, float]]] = None
     slope_sampler: Optional[Callable[[float, float], float]] = None
     turbines: List[Turbine] = field(default_factory=list)
+    # Optional array-in/array-out samplers; when missing the *_many methods loop over the scalar ones
+    habitat_many_sampler: Optional[Callable[[np.ndarray, np.ndarray, pd.Timestamp], np.ndarray]] = None
+    wind_many_sampler: Optional[Callable[[np.ndarray, np.ndarray, pd.Timestamp], Tuple[np.ndarray, np.ndarray]]] = None
+    slope_many_sampler: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None
+    # Called once per run with the time axis (datetime64 array), e.g. to precompute temporal interpolation weights
+    prepare_times_hook: Optional[Callable[[np.ndarray], None]] = None
+    # Called after each move with positions, headings (deg) and step lengths (m), e.g. to prefetch raster tiles
+    prefetch_hook: Optional[Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], None]] = None
+    # Optional ``utility.StaticUtility``: precomputed habitat/slope/turbine utility surfaces per weights
+    static_utility: Optional[Any] = None
+    # Sampler calls are timed and counted as ``env.<layer>`` phases when enabled
+    profiler: Profiler = field(default_factory=lambda: NULL_PROFILER, repr=False)
+    turbine_index: TurbineIndex = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.rebuild_turbine_index()
+
+    def rebuild_turbine_index(self) -> None:
+        # Call after mutating ``turbines`` in place
+        self.turbine_index = TurbineIndex.from_turbines(self.turbines)
+
+    @classmethod
+    def from_samplers(cls, samplers: Any, turbines: Optional[List[Turbine]] = None) -> "Environment":
+        """Wire scalar and batched methods of a sampler object (e.g. ``RasterSamplers``)."""
+        return cls(
+            habitat_sampler=samplers.habitat,
+            wind_sampler=samplers.wind,
+            slope_sampler=samplers.slope,
+            turbines=list(turbines or []),
+            habitat_many_sampler=getattr(samplers, "habitat_many", None),
+            wind_many_sampler=getattr(samplers, "wind_many", None),
+            slope_many_sampler=getattr(samplers, "slope_many", None),
+            prepare_times_hook=getattr(samplers, "prepare_times", None),
+            prefetch_hook=getattr(samplers, "prefetch_along", None),
+        )
+
+    def prepare_times(self, times: np.ndarray) -> None:
+        if self.prepare_times_hook is not None:
+            self.prepare_times_hook(times)
+
+    def static_surface(self, weights: Any):
+        """Precomputed static utility surface for ``weights``, or None to evaluate every term per step."""
+        if self.static_utility is None:
+            return None
+        return self.static_utility.surface(self, weights)
+
+    def prefetch(self, lats: np.ndarray, lons: np.ndarray, headings_deg: np.ndarray, distances_m: np.ndarray) -> None:
+        if self.prefetch_hook is not None:
+            self.prefetch_hook(lats, lons, headings_deg, distances_m)
+
+    def _call(self, name: str, n: int, fn: Callable, *args):
+        prof = self.profiler
+        if not prof.enabled:
+            return fn(*args)
+        t0 = prof.clock()
+        out = fn(*args)
+        prof.add(name, prof.clock() - t0, items=n)
+        return out
 
     def habitat(self, lat: float, lon: float, t: pd.Timestamp) -> float:
         if not self.habitat_sampler:
             return 0.5
         try:
-            val = float(self.habitat_sampler(lat, lon, t))
+            val = float(self._call("env.habitat", 1, self.habitat_sampler, lat, lon, t))
             return max(0.0, min(1.0, val))
         except Exception:
             return 0.5
@@ -33,7 +95,7 @@ class Environment:
         if not self.wind_sampler:
             return (0.0, 0.0)
         try:
-            u, v = self.wind_sampler(lat, lon, t)
+            u, v = self._call("env.wind", 1, self.wind_sampler, lat, lon, t)
             return float(u), float(v)
         except Exception:
             return (0.0, 0.0)
@@ -42,7 +104,55 @@ class Environment:
         if not self.slope_sampler:
             return 0.0
         try:
-            s = float(self.slope_sampler(lat, lon))
+            s = float(self._call("env.slope", 1, self.slope_sampler, lat, lon))
             return max(-1.0, min(1.0, s))
         except Exception:
-            return 0.0
\ No newline at end of file
+            return 0.0
+
+    # Batched variants: same defaults and clamps as above, applied element-wise
+
+    def habitat_many(self, lats: np.ndarray, lons: np.ndarray, t: pd.Timestamp) -> np.ndarray:
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        if self.habitat_many_sampler is None:
+            if not self.habitat_sampler:
+                return np.full(lats.shape, 0.5)
+            return _scalar_shim(lambda a, b: self.habitat(a, b, t), lats, lons)
+        try:
+            vals = np.asarray(self._call("env.habitat_many", lats.size, self.habitat_many_sampler, lats, lons, t), dtype=float).reshape(lats.shape)
+        except Exception:
+            return np.full(lats.shape, 0.5)
+        return np.clip(np.where(np.isnan(vals), 0.5, vals), 0.0, 1.0)
+
+    def wind_many(self, lats: np.ndarray, lons: np.ndarray, t: pd.Timestamp) -> Tuple[np.ndarray, np.ndarray]:
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        if self.wind_many_sampler is None:
+            if not self.wind_sampler:
+                return np.zeros(lats.shape), np.zeros(lats.shape)
+            uv = [self.wind(a, b, t) for a, b in zip(lats.ravel(), lons.ravel())]
+            u = np.array([p[0] for p in uv], dtype=float).reshape(lats.shape)
+            v = np.array([p[1] for p in uv], dtype=float).reshape(lats.shape)
+            return u, v
+        try:
+            u, v = self._call("env.wind_many", lats.size, self.wind_many_sampler, lats, lons, t)
+            u = np.asarray(u, dtype=float).reshape(lats.shape)
+            v = np.asarray(v, dtype=float).reshape(lats.shape)
+        except Exception:
+            return np.zeros(lats.shape), np.zeros(lats.shape)
+        return np.nan_to_num(u, nan=0.0), np.nan_to_num(v, nan=0.0)
+
+    def slope_many(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+        if self.slope_many_sampler is None:
+            if not self.slope_sampler:
+                return np.zeros(lats.shape)
+            return _scalar_shim(self.slope, lats, lons)
+        try:
+            s = np.asarray(self._call("env.slope_many", lats.size, self.slope_many_sampler, lats, lons), dtype=float).reshape(lats.shape)
+        except Exception:
+            return np.zeros(lats.shape)
+        return np.clip(np.nan_to_num(s, nan=0.0), -1.0, 1.0)
+
+
+def _scalar_shim(fn: Callable[[float, float], float], lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    out = np.fromiter((fn(a, b) for a, b in zip(lats.ravel(), lons.ravel())), dtype=float, count=lats.size)
+    return out.reshape(lats.shape)
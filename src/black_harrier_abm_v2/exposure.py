@@ -0,0 +1,285 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+
+from .config import SimulationConfig
+from .environment import Environment
+from .movement import STATES
+from .sinks import TrackBatch, TrackSink
+from .spatial import EARTH_RADIUS_M, TurbineIndex
+from .timegrid import solar_hour
+from .utils.geo import haversine_m_many
+
+GROUPS = ("total", "turbine", "state", "agent", "hour")
+EXPOSURE_MODES = ("point", "segment")
+
+
+class _Stats:
+    """BSA seconds, entries, minimum approach distance and BSA path length for ``n`` keys."""
+
+    def __init__(self, n: int) -> None:
+        self.seconds = np.zeros(n)
+        self.entries = np.zeros(n, dtype=np.int64)
+        self.min_d = np.full(n, np.inf)
+        self.path_m = np.zeros(n)
+
+    def grow(self, n: int) -> None:
+        extra = n - len(self.seconds)
+        if extra > 0:
+            self.seconds = np.concatenate([self.seconds, np.zeros(extra)])
+            self.entries = np.concatenate([self.entries, np.zeros(extra, dtype=np.int64)])
+            self.min_d = np.concatenate([self.min_d, np.full(extra, np.inf)])
+            self.path_m = np.concatenate([self.path_m, np.zeros(extra)])
+
+    def update(self, keys: np.ndarray, seconds: np.ndarray, entries: np.ndarray, d: np.ndarray,
+               path_m: Optional[np.ndarray] = None) -> None:
+        """Add per-record exposure; ``d`` is NaN for records outside the BSA."""
+        n = len(self.seconds)
+        self.seconds += np.bincount(keys, weights=seconds, minlength=n)
+        self.entries += np.bincount(keys, weights=entries, minlength=n).astype(np.int64)
+        inside = ~np.isnan(d)
+        np.minimum.at(self.min_d, keys[inside], d[inside])
+        if path_m is not None:
+            self.path_m += np.bincount(keys, weights=path_m, minlength=n)
+
+
+@dataclass
+class ExposureAccumulator(TrackSink):
+    """Collision-exposure summary reduced on the fly from track batches.
+
+    ``mode="point"``: a track point is in the blade-swept area (BSA) of a turbine when it lies within
+    ``influence_m`` of it and its altitude is inside that turbine's ``rotor_min_m``..``rotor_max_m`` band;
+    it is attributed to the nearest such turbine and counts one step. An entry is a step in BSA after a
+    step outside it (or in another turbine's BSA).
+
+    ``mode="segment"``: the path between consecutive points of an agent is a straight segment (in a plane
+    tangent at each turbine) with altitude interpolated linearly, and the time and length spent inside
+    each turbine's influence disc and rotor band are measured exactly, so fast birds crossing a disc
+    between samples are counted at any ``step_seconds``. Each turbine gets its own time; the other groups
+    get the union over turbines. An entry is a crossing into a disc/band during a segment. An agent's
+    first point starts its path and carries no time.
+
+    The ``hour`` group is the local solar hour (UTC plus longitude / 15 h) at each point, the clock the
+    model's day/night behaviour runs on. Memory is O(turbines + states + agents + 24), independent of
+    run length. Batches must list each agent's rows in time order, as the engines do.
+    """
+
+    index: TurbineIndex
+    step_seconds: float
+    influence_m: float = 200.0
+    mode: str = "point"
+    rows_written: int = 0
+
+    def __post_init__(self) -> None:
+        if self.mode not in EXPOSURE_MODES:
+            raise ValueError(f"exposure mode must be one of {EXPOSURE_MODES}, got {self.mode!r}")
+        self._stats: Dict[str, _Stats] = {
+            "total": _Stats(1),
+            "turbine": _Stats(len(self.index)),
+            "state": _Stats(len(STATES)),
+            "agent": _Stats(0),
+            "hour": _Stats(24),
+        }
+        self._slot: Dict[int, int] = {}
+        self._agent_ids: List[int] = []
+        self._prev = np.empty(0, dtype=np.intp)  # last BSA turbine per agent slot, -1 for none
+        # Last point per agent slot (segment mode): lat, lon, alt, t (ns) and rows seen so far
+        self._last = np.empty((0, 4))
+        self._seen = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def for_simulation(cls, env: Environment, sim_cfg: SimulationConfig) -> "ExposureAccumulator":
+        return cls(index=env.turbine_index, step_seconds=sim_cfg.step_seconds,
+                   influence_m=sim_cfg.turbine_influence_m, mode=sim_cfg.exposure_mode)
+
+    def _slots(self, agent_ids: np.ndarray) -> np.ndarray:
+        uniq, inverse = np.unique(agent_ids, return_inverse=True)
+        for a in uniq.tolist():
+            if a not in self._slot:
+                self._slot[a] = len(self._agent_ids)
+                self._agent_ids.append(a)
+        n = len(self._agent_ids)
+        if n > len(self._prev):
+            extra = n - len(self._prev)
+            self._prev = np.concatenate([self._prev, np.full(extra, -1, dtype=np.intp)])
+            self._last = np.concatenate([self._last, np.full((extra, 4), np.nan)])
+            self._seen = np.concatenate([self._seen, np.zeros(extra, dtype=np.int64)])
+            self._stats["agent"].grow(n)
+        return np.array([self._slot[a] for a in uniq.tolist()], dtype=np.intp)[inverse]
+
+    def bsa_turbines(self, lats: np.ndarray, lons: np.ndarray, alts: np.ndarray):
+        """Nearest turbine whose rotor band contains the altitude (-1 for none) and its distance (NaN for none)."""
+        n = len(lats)
+        turbine, dist = np.full(n, -1, dtype=np.intp), np.full(n, np.nan)
+        pts, tids, d = self.index.within_many(lats, lons, self.influence_m)
+        band = (alts[pts] >= self.index.rotor_min_m[tids]) & (alts[pts] <= self.index.rotor_max_m[tids])
+        pts, tids, d = pts[band], tids[band], d[band]
+        if len(pts):
+            order = np.lexsort((d, pts))
+            pts, tids, d = pts[order], tids[order], d[order]
+            first = np.r_[True, pts[1:] != pts[:-1]]
+            turbine[pts[first]], dist[pts[first]] = tids[first], d[first]
+        return turbine, dist
+
+    def bsa_intervals(self, lat0, lon0, alt0, lat1, lon1, alt1):
+        """(segment, turbine, s_in, s_out, min distance) for every part of a segment inside a turbine's BSA.
+
+        ``s`` is the fraction along the segment from point 0 to point 1; each (segment, turbine) pair has at
+        most one interval since both the disc and the rotor band are convex along a straight segment.
+        """
+        half = haversine_m_many(lat0, lon0, lat1, lon1) / 2.0
+        dlon = (np.asarray(lon1) - lon0 + 540.0) % 360.0 - 180.0
+        mid_lat, mid_lon = (np.asarray(lat0) + lat1) / 2.0, lon0 + dlon / 2.0
+        reach = self.influence_m + (float(half.max()) if len(half) else 0.0)
+        seg, tids, _ = self.index.within_many(mid_lat, mid_lon, reach)
+        # Local east/north metres around each candidate turbine
+        t_lat, t_lon = self.index.lats[tids], self.index.lons[tids]
+        kx = np.radians(1.0) * EARTH_RADIUS_M * np.cos(np.radians(t_lat))
+        ky = np.radians(1.0) * EARTH_RADIUS_M
+        x0 = kx * ((lon0[seg] - t_lon + 540.0) % 360.0 - 180.0)
+        y0 = ky * (lat0[seg] - t_lat)
+        dx, dy = kx * dlon[seg], ky * (lat1[seg] - lat0[seg])
+        a = dx * dx + dy * dy
+        b = x0 * dx + y0 * dy
+        c = x0 * x0 + y0 * y0 - self.influence_m ** 2
+        moving = a > 0
+        root = np.sqrt(np.maximum(b * b - a * c, 0.0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s_in = np.where(moving, (-b - root) / a, np.where(c <= 0, 0.0, np.inf))
+            s_out = np.where(moving, (-b + root) / a, np.where(c <= 0, 1.0, -np.inf))
+        s_in = np.where(b * b - a * c < 0, np.inf, s_in)
+        # Altitude band along the segment
+        z0, dz = alt0[seg], alt1[seg] - alt0[seg]
+        lo, hi = self.index.rotor_min_m[tids], self.index.rotor_max_m[tids]
+        in_band = (z0 >= lo) & (z0 <= hi)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            za, zb = (lo - z0) / dz, (hi - z0) / dz
+        climbing = dz != 0
+        b_in = np.where(climbing, np.minimum(za, zb), np.where(in_band, 0.0, np.inf))
+        b_out = np.where(climbing, np.maximum(za, zb), np.where(in_band, 1.0, -np.inf))
+        s_in = np.maximum.reduce([s_in, b_in, np.zeros_like(s_in)])
+        s_out = np.minimum.reduce([s_out, b_out, np.ones_like(s_out)])
+        keep = s_out > s_in
+        seg, tids, s_in, s_out = seg[keep], tids[keep], s_in[keep], s_out[keep]
+        x0, y0, dx, dy, a, b = x0[keep], y0[keep], dx[keep], dy[keep], a[keep], b[keep]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s_near = np.clip(np.where(a > 0, -b / a, 0.0), s_in, s_out)
+        d = np.hypot(x0 + s_near * dx, y0 + s_near * dy)
+        return seg, tids, s_in, s_out, d
+
+    def write(self, batch: TrackBatch) -> None:
+        n = len(batch["agent_id"])
+        if n == 0:
+            return
+        slots = self._slots(np.asarray(batch["agent_id"]))
+        t = np.asarray(batch["t"], dtype="datetime64[ns]")
+        # Local solar hour at each point, as TimeGrid computes it for the diurnal model
+        hours = np.minimum(solar_hour(t, np.asarray(batch["lon"], dtype=float)).astype(np.intp), 23)
+        keys = {
+            "total": np.zeros(n, dtype=np.intp),
+            "state": np.asarray(batch["state"], dtype=np.intp),
+            "agent": slots,
+            "hour": hours,
+        }
+        # Each row next to the same agent's previous row (carried over between batches)
+        order = np.argsort(slots, kind="stable")
+        sl = slots[order]
+        new_agent = np.r_[True, sl[1:] != sl[:-1]]
+        last = np.r_[sl[1:] != sl[:-1], True]
+        if self.mode == "point":
+            self._write_points(batch, keys, order, sl, new_agent, last)
+        else:
+            self._write_segments(batch, t, keys, order, sl, new_agent, last)
+        self.rows_written += n
+
+    def _write_points(self, batch, keys, order, sl, new_agent, last) -> None:
+        alts = np.asarray(batch["alt_m"], dtype=float)
+        turbine, dist = self.bsa_turbines(np.asarray(batch["lat"]), np.asarray(batch["lon"]), alts)
+        in_bsa = turbine >= 0
+        seq = turbine[order]
+        prev = np.empty_like(seq)
+        prev[1:] = seq[:-1]
+        prev[new_agent] = self._prev[sl[new_agent]]
+        entry = np.zeros(len(turbine), dtype=bool)
+        entry[order] = (seq >= 0) & (seq != prev)
+        self._prev[sl[last]] = seq[last]
+
+        keys["turbine"] = np.where(in_bsa, turbine, 0)
+        seconds = in_bsa * float(self.step_seconds)
+        for group, stats in self._stats.items():
+            stats.update(keys[group], seconds, entry, dist)
+
+    def _write_segments(self, batch, t, keys, order, sl, new_agent, last) -> None:
+        n = len(sl)
+        cur = np.column_stack([
+            np.asarray(batch["lat"], dtype=float), np.asarray(batch["lon"], dtype=float),
+            np.asarray(batch["alt_m"], dtype=float), t.astype(np.int64).astype(float),
+        ])[order]
+        prev = np.empty_like(cur)
+        prev[1:] = cur[:-1]
+        prev[new_agent] = self._last[sl[new_agent]]
+        starts = np.flatnonzero(new_agent)
+        rank = np.arange(n) - np.repeat(starts, np.diff(np.r_[starts, n]))
+        k = self._seen[sl] + rank  # rows of this agent before this one
+        self._last[sl[last]] = cur[last]
+        np.add.at(self._seen, sl[new_agent], np.diff(np.r_[starts, n]))
+
+        rows = order[k >= 1]  # rows that close a segment, in batch order positions
+        p, q = prev[k >= 1], cur[k >= 1]
+        first = k[k >= 1] == 1
+        seconds = (q[:, 3] - p[:, 3]) / 1e9
+        length = haversine_m_many(p[:, 0], p[:, 1], q[:, 0], q[:, 1])
+        seg, tids, s_in, s_out, d = self.bsa_intervals(p[:, 0], p[:, 1], p[:, 2], q[:, 0], q[:, 1], q[:, 2])
+        entry = (s_in > 1e-9) | first[seg]
+        frac = s_out - s_in
+        self._stats["turbine"].update(tids, frac * seconds[seg], entry, d, frac * length[seg])
+
+        # Union over turbines per segment: merge intervals sorted by (segment, s_in)
+        m = len(rows)
+        covered, n_entries, min_d = np.zeros(m), np.zeros(m), np.full(m, np.nan)
+        if len(seg):
+            o = np.lexsort((s_in, seg))
+            sg, a, b = seg[o], s_in[o] + 2.0 * seg[o], s_out[o] + 2.0 * seg[o]
+            reach = np.maximum.accumulate(b)
+            before = np.r_[-np.inf, reach[:-1]]
+            opens = (before < a) | np.r_[True, sg[1:] != sg[:-1]]
+            block_start = a[opens]
+            block_end = np.maximum.reduceat(b, np.flatnonzero(opens))
+            np.add.at(covered, sg[opens], block_end - block_start)
+            np.add.at(n_entries, seg, entry)
+            min_d = np.full(m, np.inf)
+            np.minimum.at(min_d, seg, d)
+            min_d[np.isinf(min_d)] = np.nan
+        for group in ("total", "state", "agent", "hour"):
+            self._stats[group].update(keys[group][rows], covered * seconds, n_entries, min_d, covered * length)
+
+    def table(self, groups: Sequence[str] = GROUPS) -> pd.DataFrame:
+        """One row per (group, key): BSA seconds, entries and minimum horizontal approach while in BSA (m).
+
+        Segment mode adds ``bsa_path_m``, the path length flown inside the BSA.
+        """
+        labels = {
+            "total": ["all"],
+            "turbine": [str(i) for i in range(len(self.index))],
+            "state": list(STATES),
+            "agent": [str(a) for a in self._agent_ids],
+            "hour": [f"{h:02d}" for h in range(24)],
+        }
+        frames = []
+        for group in groups:
+            st = self._stats[group]
+            frame = pd.DataFrame({
+                "group": group,
+                "key": labels[group],
+                "bsa_seconds": st.seconds,
+                "entries": st.entries.astype(np.int32),
+                "min_approach_m": np.where(np.isinf(st.min_d), np.nan, st.min_d).astype(np.float32),
+            })
+            if self.mode == "segment":
+                frame["bsa_path_m"] = st.path_m.astype(np.float32)
+            frames.append(frame)
+        out = pd.concat(frames, ignore_index=True)
+        out["group"] = pd.Categorical(out["group"], categories=list(GROUPS))
+        return out
@@ -0,0 +1,177 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Mapping, Optional, Sequence
+import numpy as np
+import pandas as pd
+import yaml
+
+from .calibration import SummaryBins
+
+Simulator = Callable[[np.ndarray], np.ndarray]  # (n_sets, n_params) -> (n_sets, n_stats)
+
+
+@dataclass
+class UniformPrior:
+    """Independent uniform priors on named parameters (see ``calibration.ParameterBatch`` for names)."""
+
+    names: List[str]
+    low: np.ndarray
+    high: np.ndarray
+
+    def __post_init__(self) -> None:
+        self.low, self.high = np.asarray(self.low, dtype=float), np.asarray(self.high, dtype=float)
+        if np.any(self.high <= self.low):
+            raise ValueError("every prior needs low < high")
+
+    @classmethod
+    def from_dict(cls, bounds: Mapping[str, Sequence[float]]) -> "UniformPrior":
+        return cls(names=list(bounds), low=[float(b[0]) for b in bounds.values()],
+                   high=[float(b[1]) for b in bounds.values()])
+
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        return rng.uniform(self.low, self.high, size=(n, len(self.names)))
+
+    def contains(self, theta: np.ndarray) -> np.ndarray:
+        return np.all((theta >= self.low) & (theta <= self.high), axis=-1)
+
+
+@dataclass
+class CalibrationSpec:
+    """ABC settings: priors, simulation budget and how statistics are compared."""
+
+    prior: UniformPrior
+    samples: int = 10_000  # rejection draws, or simulations per SMC generation at most
+    batch: int = 500  # parameter sets per vectorized simulation
+    accept: float = 0.01  # fraction of draws kept by rejection
+    generations: int = 1  # >1 refines the rejection sample with ABC-SMC
+    seed: int = 0
+    block_weights: Dict[str, float] = field(default_factory=dict)
+    bins: SummaryBins = field(default_factory=SummaryBins)
+
+    @classmethod
+    def from_file(cls, path: str) -> "CalibrationSpec":
+        """YAML with ``parameters`` (``{name: [low, high]}``) and optional ``samples``, ``batch``, ``accept``,
+        ``generations``, ``seed``, ``block_weights`` and ``bins`` (``{step_length_m: [start, stop, n_bins]}``)."""
+        with open(path, "r") as f:
+            doc = yaml.safe_load(f) or {}
+        if not doc.get("parameters"):
+            raise ValueError(f"{path}: no parameters to calibrate")
+        bins = SummaryBins()
+        for name, (start, stop, n) in (doc.get("bins") or {}).items():
+            if not hasattr(bins, name):
+                raise ValueError(f"{path}: unknown bins {name!r}")
+            setattr(bins, name, np.linspace(float(start), float(stop), int(n) + 1))
+        return cls(prior=UniformPrior.from_dict(doc["parameters"]), samples=int(doc.get("samples", 10_000)),
+                   batch=int(doc.get("batch", 500)), accept=float(doc.get("accept", 0.01)),
+                   generations=int(doc.get("generations", 1)), seed=int(doc.get("seed", 0)),
+                   block_weights=dict(doc.get("block_weights") or {}), bins=bins)
+
+
+def stat_distance(sim: np.ndarray, observed: np.ndarray, bins: SummaryBins,
+                  block_weights: Optional[Mapping[str, float]] = None) -> np.ndarray:
+    """Distance of each row of ``sim`` to ``observed``: root of the weighted sum over statistics of squared
+    Euclidean distances between histograms. Statistics missing from ``observed`` (NaN) are skipped; a
+    simulated statistic with no data counts as maximally distant (2)."""
+    block_weights = block_weights or {}
+    total = np.zeros(len(sim))
+    for name, cols in bins.blocks().items():
+        obs = observed[cols]
+        if np.isnan(obs).any():
+            continue
+        d2 = ((sim[:, cols] - obs) ** 2).sum(axis=1)
+        total += float(block_weights.get(name, 1.0)) * np.where(np.isnan(d2), 2.0, d2)
+    return np.sqrt(total)
+
+
+def _simulate(simulate: Simulator, theta: np.ndarray, batch: int) -> np.ndarray:
+    return np.concatenate([simulate(theta[i:i + batch]) for i in range(0, len(theta), batch)])
+
+
+def abc_rejection(simulate: Simulator, observed: np.ndarray, spec: CalibrationSpec,
+                  rng: Optional[np.random.Generator] = None) -> pd.DataFrame:
+    """Rejection ABC: ``spec.samples`` prior draws simulated ``spec.batch`` at a time; the ``spec.accept``
+    fraction closest to ``observed`` is accepted. One row per draw: parameters, ``distance``, ``accepted``."""
+    rng = rng or np.random.default_rng(spec.seed)
+    theta = spec.prior.sample(rng, spec.samples)
+    d = stat_distance(_simulate(simulate, theta, spec.batch), observed, spec.bins, spec.block_weights)
+    n_keep = max(1, int(round(spec.accept * len(theta))))
+    accepted = np.zeros(len(theta), dtype=bool)
+    accepted[np.argsort(d, kind="stable")[:n_keep]] = True
+    out = pd.DataFrame(theta, columns=spec.prior.names)
+    out["distance"] = d
+    out["accepted"] = accepted
+    return out
+
+
+def abc_smc(simulate: Simulator, observed: np.ndarray, spec: CalibrationSpec,
+            rng: Optional[np.random.Generator] = None) -> pd.DataFrame:
+    """ABC-SMC (population Monte Carlo): a rejection generation, then ``spec.generations - 1`` rounds that
+    perturb weighted particles with a Gaussian kernel (twice their weighted covariance) and keep
+    proposals within the median distance of the previous generation.
+
+    Each generation keeps ``spec.accept * spec.samples`` particles and spends at most ``spec.samples``
+    simulations. Returns the particles of every generation with ``generation``, ``weight`` and ``distance``.
+    """
+    rng = rng or np.random.default_rng(spec.seed)
+    first = abc_rejection(simulate, observed, spec, rng)
+    names = spec.prior.names
+    kept = first[first["accepted"]]
+    theta, d = kept[names].to_numpy(), kept["distance"].to_numpy()
+    w = np.full(len(theta), 1.0 / len(theta))
+    frames = [_particles(names, theta, w, d, 0)]
+    n_particles = len(theta)
+    for g in range(1, spec.generations if n_particles > 1 else 1):
+        eps = float(np.median(d))
+        cov = 2.0 * np.atleast_2d(np.cov(theta, rowvar=False, aweights=w))
+        chol = np.linalg.cholesky(cov + 1e-12 * np.eye(len(names)))
+        new_theta, new_d, spent = [], [], 0
+        while sum(map(len, new_theta)) < n_particles and spent < spec.samples:
+            n = min(spec.batch, spec.samples - spent)
+            parents = rng.choice(len(theta), size=n, p=w)
+            prop = theta[parents] + rng.standard_normal((n, len(names))) @ chol.T
+            prop = prop[spec.prior.contains(prop)]
+            spent += n
+            if not len(prop):
+                continue
+            dist = stat_distance(simulate(prop), observed, spec.bins, spec.block_weights)
+            new_theta.append(prop[dist <= eps])
+            new_d.append(dist[dist <= eps])
+        if not sum(map(len, new_theta)):
+            break  # tolerance not reachable within the budget: keep the previous generation
+        cand, cand_d = np.concatenate(new_theta)[:n_particles], np.concatenate(new_d)[:n_particles]
+        # Importance weights: uniform prior over the kernel mixture density of the proposals
+        inv = np.linalg.inv(cov)
+        diff = cand[:, None, :] - theta[None, :, :]
+        kern = np.exp(-0.5 * np.einsum("ijk,kl,ijl->ij", diff, inv, diff))
+        new_w = 1.0 / (kern @ w)
+        theta, d, w = cand, cand_d, new_w / new_w.sum()
+        frames.append(_particles(names, theta, w, d, g))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _particles(names: List[str], theta: np.ndarray, w: np.ndarray, d: np.ndarray, generation: int) -> pd.DataFrame:
+    out = pd.DataFrame(theta, columns=names)
+    out.insert(0, "generation", generation)
+    out["weight"] = w
+    out["distance"] = d
+    return out
+
+
+def posterior_summary(particles: pd.DataFrame, names: Sequence[str]) -> pd.DataFrame:
+    """Weighted mean, sd and 5/50/95% quantiles per parameter of the last generation (or accepted draws)."""
+    if "generation" in particles:
+        last = particles[particles["generation"] == particles["generation"].max()]
+        w = last["weight"].to_numpy()
+    else:
+        last = particles[particles["accepted"]]
+        w = np.full(len(last), 1.0 / len(last))
+    rows = []
+    for name in names:
+        x = last[name].to_numpy()
+        order = np.argsort(x)
+        cum = np.cumsum(w[order])
+        mean = float(np.sum(w * x))
+        q = {f"q{int(p * 100):02d}": float(x[order][min(np.searchsorted(cum, p), len(x) - 1)])
+             for p in (0.05, 0.5, 0.95)}
+        rows.append({"parameter": name, "mean": mean, "sd": float(np.sqrt(np.sum(w * (x - mean) ** 2))), **q})
+    return pd.DataFrame(rows)
@@ -1,12 +1,12 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
-import math
+from typing import Dict, Tuple
 import random
 import numpy as np
 import pandas as pd
 
-from .utils.geo import destination_point, haversine_m
+from .spatial import TurbineIndex
+from .utils.geo import destination_point_many, haversine_m_many
 
 
 class State:
@@ -18,6 +18,18 @@ class State:
     ROOSTING = "roosting"
 
 
+# Integer state codes used by the array-based engines
+STATES: Tuple[str, ...] = (
+    State.BREEDING,
+    State.FORAGING,
+    State.COMMUTING,
+    State.DISPLAYING,
+    State.MIGRATING,
+    State.ROOSTING,
+)
+STATE_CODES: Dict[str, int] = {s: i for i, s in enumerate(STATES)}
+
+
 @dataclass
 class Weights:
     w_habitat: float = 1.0
@@ -33,15 +45,133 @@ class AltitudePriors:
     means: Dict[str, float]
     sds: Dict[str, float]
 
-    def sample(self, state: str, rng: random.Random) -> float:
+    def sample(self, state: str, rng: random.Random, z: float | None = None) -> float:
         m = float(self.means.get(state, 10.0))
         s = float(self.sds.get(state, 3.0))
-        return max(0.0, rng.gauss(m, s))
+        return max(0.0, rng.gauss(m, s) if z is None else m + s * z)
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Means and sds indexed by state code, with the same defaults as ``sample``."""
+        means = np.array([float(self.means.get(st, 10.0)) for st in STATES])
+        sds = np.array([float(self.sds.get(st, 3.0)) for st in STATES])
+        return means, sds
+
+
+def turbine_penalty_many(lats: np.ndarray, lons: np.ndarray, index: TurbineIndex) -> np.ndarray:
+    """Summed avoidance penalty at each point: -(1.5 - d / (1.5 * rotor_radius)) for turbines within 1.5 radii."""
+    lats = np.asarray(lats, dtype=float)
+    if not len(index):
+        return np.zeros(lats.shape)
+    reach_max = float(index.rotor_radius_m.max()) * 1.5
+    pts, tids, d = index.within_many(lats, lons, reach_max)
+    reach = index.rotor_radius_m[tids] * 1.5
+    keep = d < reach
+    pen = np.bincount(pts[keep], weights=(1.5 - d / reach)[keep], minlength=lats.size)
+    return -pen.reshape(lats.shape)
+
+
+def static_utility_many(weights: Weights, lats: np.ndarray, lons: np.ndarray, env, t=None,
+                        include_habitat: bool = True) -> np.ndarray:
+    """Time-invariant terms of the heading utility at points: slope and turbine penalties, plus habitat."""
+    out = (
+        weights.w_slope_penalty * -np.abs(env.slope_many(lats, lons))
+        + weights.w_turbine_avoid * turbine_penalty_many(lats, lons, env.turbine_index)
+    )
+    if include_habitat:
+        out = out + weights.w_habitat * env.habitat_many(lats, lons, t)
+    return out
+
+
+def heading_utilities(
+    weights: Weights,
+    headings: np.ndarray,
+    lats: np.ndarray,
+    lons: np.ndarray,
+    speeds: np.ndarray,
+    t: pd.Timestamp,
+    env,
+    target_lats: np.ndarray,
+    target_lons: np.ndarray,
+    step_seconds: float,
+    clear: np.ndarray | None = None,
+) -> np.ndarray:
+    """Utility of every candidate heading for N agents at once, shape (N, len(headings)).
+
+    Agent arrays have shape (N,); a NaN target means "no target". Weight fields may be scalars or
+    arrays broadcastable to (N, 1). When ``env`` offers a precomputed static surface for ``weights``,
+    habitat, slope and turbine terms come from one lookup per candidate. ``clear`` marks agents whose
+    candidates are all beyond every turbine's avoidance reach; their turbine term is zero unqueried.
+    """
+    lats, lons = np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+    dist = np.maximum(0.1, np.asarray(speeds, dtype=float)) * step_seconds
+    hdg = np.asarray(headings, dtype=float)[None, :]
+    lat2, lon2 = destination_point_many(lats[:, None], lons[:, None], hdg, dist[:, None])
+
+    wind_util, target_util = _dynamic_terms(hdg, lats, lons, lat2, lon2, t, env, target_lats, target_lons)
+    surface = env.static_surface(weights) if hasattr(env, "static_surface") else None
+    if surface is not None:
+        static = surface.sample_many(lat2, lon2)
+        off = np.isnan(static)
+        if off.any():  # candidates off the surface's grid
+            static[off] = static_utility_many(weights, lat2[off], lon2[off], env, t, surface.includes_habitat)
+        if not surface.includes_habitat:
+            static = static + weights.w_habitat * env.habitat_many(lat2, lon2, t)
+        return static + weights.w_wind * wind_util + weights.w_target * target_util
+
+    h = env.habitat_many(lat2, lon2, t)
+    slope_pen = -np.abs(env.slope_many(lat2, lon2))
+    if clear is None:
+        turbine_pen = turbine_penalty_many(lat2, lon2, env.turbine_index)
+    else:
+        turbine_pen = np.zeros(lat2.shape)
+        near = ~np.asarray(clear, dtype=bool)
+        if near.any():
+            turbine_pen[near] = turbine_penalty_many(lat2[near], lon2[near], env.turbine_index)
+
+    return (
+        weights.w_habitat * h
+        + weights.w_wind * wind_util
+        + weights.w_target * target_util
+        + weights.w_slope_penalty * slope_pen
+        + weights.w_turbine_avoid * turbine_pen
+    )
+
+
+def _dynamic_terms(hdg, lats, lons, lat2, lon2, t, env, target_lats, target_lons) -> Tuple[np.ndarray, np.ndarray]:
+    # Wind alignment and target pull, shape (N, headings)
+    u, v = env.wind_many(lats, lons, t)
+    wind_speed = np.hypot(u, v)
+    wind_dir = (np.degrees(np.arctan2(u, v)) + 360) % 360
+    diff = np.abs(((hdg - wind_dir[:, None]) + 180) % 360 - 180)
+    wind_util = np.where((wind_speed > 0)[:, None], np.cos(np.radians(diff)), 0.0)
+
+    target_lats = np.asarray(target_lats, dtype=float)
+    target_lons = np.asarray(target_lons, dtype=float)
+    has_target = ~np.isnan(target_lats)
+    d0 = haversine_m_many(lats, lons, target_lats, target_lons)[:, None]
+    d1 = haversine_m_many(lat2, lon2, target_lats[:, None], target_lons[:, None])
+    target_util = np.where(has_target[:, None], (d0 - d1) / np.maximum(1.0, d0), 0.0)
+    return wind_util, target_util
+
+
+def softmax_choice(utilities: np.ndarray, beta, uniforms: np.ndarray) -> np.ndarray:
+    """Row-wise softmax draw, mirroring ``random.choices``: bisect(cumsum(p), u * total)."""
+    weights = np.exp(beta * (utilities - utilities.max(axis=1, keepdims=True)))
+    probs = weights / weights.sum(axis=1, keepdims=True)
+    cum = np.cumsum(probs, axis=1)
+    x = np.asarray(uniforms, dtype=float)[:, None] * cum[:, -1:]
+    return np.minimum((cum <= x).sum(axis=1), utilities.shape[1] - 1)
 
 
 @dataclass
 class StepSelectionPolicy:
     weights: Weights
+    n_headings: int = 24
+    step_seconds: float = 60.0
+
+    @property
+    def headings(self) -> np.ndarray:
+        return np.arange(self.n_headings) * (360.0 / self.n_headings)
 
     def choose_heading(
         self,
@@ -53,58 +183,48 @@ class StepSelectionPolicy:
         state: str,
         target: Tuple[float, float] | None,
         rng: random.Random,
+        step_seconds: float | None = None,
+        u: float | None = None,
+        clear: bool = False,
     ) -> float:
-        headings = np.arange(0, 360, 15)
-        dist = max(0.1, speed_mps) * 60.0  # assumes 60s step; see Simulation for generalization
-
-        u, v = env.wind(lat, lon, t)
-        wind_speed = math.hypot(u, v)
-        wind_dir = (math.degrees(math.atan2(u, v)) + 360) % 360 if wind_speed > 0 else None
-
-        utilities: List[float] = []
-        for hdg in headings:
-            lat2, lon2 = destination_point(lat, lon, hdg, dist)
-            h = env.habitat(lat2, lon2, t)
-
-            wind_util = 0.0
-            if wind_dir is not None:
-                diff = abs(((hdg - wind_dir) + 180) % 360 - 180)
-                wind_util = math.cos(math.radians(diff))
-
-            target_util = 0.0
-            if target is not None:
-                d0 = haversine_m(lat, lon, target[0], target[1])
-                d1 = haversine_m(lat2, lon2, target[0], target[1])
-                target_util = (d0 - d1) / max(1.0, d0)
-
-            slope_pen = -abs(env.slope(lat2, lon2))
-
-            turbine_pen = 0.0
-            for tb in env.turbines:
-                from .utils.geo import haversine_m as hdist
-                d = hdist(lat2, lon2, tb.lat, tb.lon)
-                if d < tb.rotor_radius_m * 1.5:
-                    turbine_pen -= (1.5 - d / (tb.rotor_radius_m * 1.5))
-
-            U = (
-                self.weights.w_habitat * h
-                + self.weights.w_wind * wind_util
-                + self.weights.w_target * target_util
-                + self.weights.w_slope_penalty * slope_pen
-                + self.weights.w_turbine_avoid * turbine_pen
-            )
-            utilities.append(U)
-
-        beta = self.weights.softmax_beta
-        utilities_np = np.array(utilities)
-        weights = np.exp(beta * (utilities_np - utilities_np.max()))
-        probs = weights / weights.sum()
-        return float(rng.choices(list(headings), weights=list(probs), k=1)[0])
+        tlat, tlon = target if target is not None else (np.nan, np.nan)
+        hdg = self.choose_headings(
+            np.array([lat]), np.array([lon]), np.array([speed_mps]), t, env,
+            np.array([tlat]), np.array([tlon]), np.array([rng.random() if u is None else u]), step_seconds,
+            np.array([clear]),
+        )
+        return float(hdg[0])
+
+    def choose_headings(
+        self,
+        lats: np.ndarray,
+        lons: np.ndarray,
+        speeds: np.ndarray,
+        t: pd.Timestamp,
+        env,
+        target_lats: np.ndarray,
+        target_lons: np.ndarray,
+        uniforms: np.ndarray,
+        step_seconds: float | None = None,
+        clear: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """Batched ``choose_heading``: one uniform per agent, returns headings in degrees."""
+        headings = self.headings
+        U = heading_utilities(
+            self.weights, headings, lats, lons, speeds, t, env, target_lats, target_lons,
+            self.step_seconds if step_seconds is None else step_seconds, clear,
+        )
+        return headings[softmax_choice(U, self.weights.softmax_beta, uniforms)]
 
 
 @dataclass
 class AltitudeModel:
     priors: AltitudePriors
 
-    def sample(self, state: str, rng: random.Random) -> float:
-        return self.priors.sample(state, rng)
\ No newline at end of file
+    def sample(self, state: str, rng: random.Random, z: float | None = None) -> float:
+        return self.priors.sample(state, rng, z)
+
+    def sample_many(self, codes: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Altitudes for state codes from caller-supplied standard normal draws ``z``."""
+        means, sds = self.priors.arrays()
+        return np.maximum(0.0, means[codes] + sds[codes] * z)
\ No newline at end of file
@@ -0,0 +1,266 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Union
+import numpy as np
+import pandas as pd
+
+from .environment import Environment
+from .agents import DEFAULT_STATE_PARAMS, DEFAULT_TRANSITIONS, HarrierAgent
+from .movement import STATES, STATE_CODES, State, StepSelectionPolicy, AltitudeModel
+from .utils.geo import destination_point_many
+from .transitions import CompiledTransitions
+from .config import SimulationConfig
+from .timegrid import TimeGrid
+from .profiling import NULL_PROFILER, Profiler
+from .scheduling import AdaptiveStepping
+from .streams import RandomStreams
+from .sinks import MemorySink, TrackBatch, TrackSink, chunk_batches, stream
+
+
+_NEST_STATES = np.isin(STATES, [State.BREEDING, State.COMMUTING, State.DISPLAYING])
+_ROOST_STATES = np.isin(STATES, [State.ROOSTING, State.FORAGING])
+_HIGH_FLIGHT_STATES = np.isin(STATES, [State.DISPLAYING, State.MIGRATING, State.COMMUTING])
+
+
+@dataclass
+class Population:
+    """Structure-of-arrays view of a list of ``HarrierAgent``; index i is the i-th agent."""
+
+    agent_id: np.ndarray
+    lat: np.ndarray
+    lon: np.ndarray
+    state: np.ndarray  # int8 codes into movement.STATES
+    nest_lat: np.ndarray
+    nest_lon: np.ndarray
+    roost_lat: np.ndarray
+    roost_lon: np.ndarray
+    speed_mean: np.ndarray  # (N, n_states)
+    speed_sd: np.ndarray  # (N, n_states)
+    sex: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.agent_id)
+
+    @classmethod
+    def from_agents(cls, agents: List[HarrierAgent]) -> "Population":
+        def _pair(p, i):
+            return np.array([np.nan if x is None else x[i] for x in p], dtype=float)
+
+        nests = [ag.nest for ag in agents]
+        roosts = [ag.roost for ag in agents]
+        params = [[ag.state_params.get(st, DEFAULT_STATE_PARAMS[st]) for st in STATES] for ag in agents]
+        return cls(
+            agent_id=np.array([ag.agent_id for ag in agents], dtype=np.int64),
+            lat=np.array([ag.lat for ag in agents], dtype=float),
+            lon=np.array([ag.lon for ag in agents], dtype=float),
+            state=np.array([STATE_CODES[ag.state] for ag in agents], dtype=np.int8),
+            nest_lat=_pair(nests, 0),
+            nest_lon=_pair(nests, 1),
+            roost_lat=_pair(roosts, 0),
+            roost_lon=_pair(roosts, 1),
+            speed_mean=np.array([[p.speed_mean for p in row] for row in params], dtype=float).reshape(len(agents), len(STATES)),
+            speed_sd=np.array([[p.speed_sd for p in row] for row in params], dtype=float).reshape(len(agents), len(STATES)),
+            sex=[ag.sex for ag in agents],
+        )
+
+    def select(self, rows) -> "Population":
+        """The agents at ``rows`` (an index array or slice), as a new population."""
+        sex = list(np.asarray(self.sex, dtype=object)[rows]) if self.sex else []
+        return Population(
+            agent_id=self.agent_id[rows], lat=self.lat[rows], lon=self.lon[rows], state=self.state[rows],
+            nest_lat=self.nest_lat[rows], nest_lon=self.nest_lon[rows], roost_lat=self.roost_lat[rows],
+            roost_lon=self.roost_lon[rows], speed_mean=self.speed_mean[rows], speed_sd=self.speed_sd[rows], sex=sex,
+        )
+
+    def to_agents(self) -> List[HarrierAgent]:
+        def _pair(a, b, i):
+            return None if np.isnan(a[i]) or np.isnan(b[i]) else (float(a[i]), float(b[i]))
+
+        agents = []
+        for i in range(len(self)):
+            agents.append(
+                HarrierAgent(
+                    agent_id=int(self.agent_id[i]),
+                    lat=float(self.lat[i]),
+                    lon=float(self.lon[i]),
+                    state=STATES[self.state[i]],
+                    sex=self.sex[i] if self.sex else "unknown",
+                    nest=_pair(self.nest_lat, self.nest_lon, i),
+                    roost=_pair(self.roost_lat, self.roost_lon, i),
+                )
+            )
+        return agents
+
+
+@dataclass
+class PopulationSimulation:
+    """Array engine: advances every agent per timestep with batched draws.
+
+    Same model and output columns as ``ABMSimulation``. With ``streams`` both engines take identical
+    counter-based draws, so their tracks agree draw by draw; without, the population shares one NumPy
+    ``Generator`` seeded from ``seed`` and tracks only agree in distribution.
+    """
+
+    env: Environment
+    population: Population
+    policy: StepSelectionPolicy
+    alt_model: AltitudeModel
+    sim_cfg: SimulationConfig
+    seed: Union[int, np.random.SeedSequence, None] = None
+    transitions: CompiledTransitions = field(default_factory=lambda: DEFAULT_TRANSITIONS)
+    profiler: Profiler = field(default_factory=lambda: NULL_PROFILER, repr=False)
+    scheduler: Optional[AdaptiveStepping] = None
+    streams: Optional[RandomStreams] = None
+    grid: Optional[TimeGrid] = field(default=None, init=False, repr=False)
+    next_step: int = field(default=0, init=False)
+    _rng: Optional[np.random.Generator] = field(default=None, init=False, repr=False)
+    _resume: Optional[dict] = field(default=None, init=False, repr=False)
+
+    @classmethod
+    def from_agents(cls, env, agents, policy, alt_model, sim_cfg, seed=None, transitions=None) -> "PopulationSimulation":
+        return cls(env=env, population=Population.from_agents(agents), policy=policy, alt_model=alt_model,
+                   sim_cfg=sim_cfg, seed=seed, transitions=transitions or DEFAULT_TRANSITIONS)
+
+    @property
+    def agents(self) -> List[HarrierAgent]:
+        return self.population.to_agents()
+
+    def time_grid(self) -> TimeGrid:
+        pop = self.population
+        if len(pop) == 0:
+            return TimeGrid.from_config(self.sim_cfg)
+        return TimeGrid.from_config(self.sim_cfg, lat=float(pop.lat.mean()), lon=float(pop.lon.mean()))
+
+    def snapshot(self) -> dict:
+        """State after the last completed step: population arrays and the random streams or generator state."""
+        return {
+            "step": self.next_step,
+            "population": self.population,
+            "rng": None if self._rng is None else self._rng.bit_generator.state,
+            "grid_ref": None if self.grid is None else (self.grid.lat, self.grid.lon),
+            "schedule": None if self.scheduler is None else self.scheduler.state(),
+            "streams": self.streams,
+        }
+
+    def restore(self, snapshot: dict) -> None:
+        """Continue from ``snapshot`` on the next ``iter_steps`` call."""
+        self.population = snapshot["population"]
+        self.streams = snapshot.get("streams")
+        self._resume = snapshot
+
+    def _draws(self, i: int, rng: np.random.Generator) -> np.ndarray:
+        """Step ``i``'s draws, one row per ``streams.PURPOSES`` entry (the shared generator in that order)."""
+        pop = self.population
+        if self.streams is not None:
+            return self.streams.draws(i, pop.agent_id)
+        n = len(pop)
+        return np.stack([rng.random(n), rng.standard_normal(n), rng.random(n), rng.standard_normal(n)])
+
+    def step(self, i: int, rng: np.random.Generator) -> TrackBatch:
+        """Advance every agent through step ``i`` of ``self.grid``."""
+        pop, cfg, grid, prof = self.population, self.sim_cfg, self.grid, self.profiler
+        clock = prof.clock
+        t = grid.timestamp(i)
+        n = len(pop)
+        rows = np.arange(n)
+
+        # State transition: bisect each agent's cumulative row
+        t0 = clock()
+        u_state, z_speed, u_heading, z_alt = self._draws(i, rng)
+        season = int(grid.season[i])
+        pop.state = codes = self.transitions.draw_many(season, pop.state, u_state)
+        t1 = clock()
+        prof.add("transition", t1 - t0, items=n)
+
+        # Speed & target selection
+        speed = np.maximum(0.0, pop.speed_mean[rows, codes] + pop.speed_sd[rows, codes] * z_speed)
+        speed = np.maximum(0.1, speed)
+        use_nest = _NEST_STATES[codes] & ~np.isnan(pop.nest_lat)
+        use_roost = _ROOST_STATES[codes] & ~np.isnan(pop.roost_lat)
+        target_lat = np.where(use_nest, pop.nest_lat, np.where(use_roost, pop.roost_lat, np.nan))
+        target_lon = np.where(use_nest, pop.nest_lon, np.where(use_roost, pop.roost_lon, np.nan))
+        t2 = clock()
+        prof.add("speed", t2 - t1, items=n)
+
+        dist = speed * cfg.step_seconds
+        # Agents out of every turbine's reach skip the turbine terms; None: all are queried
+        far = None if self.scheduler is None else self.scheduler.plan(rows, pop.lat, pop.lon, dist)
+        hdg = self.policy.choose_headings(
+            pop.lat, pop.lon, speed, t, self.env, target_lat, target_lon, u_heading, step_seconds=cfg.step_seconds,
+            clear=far,
+        )
+        t3 = clock()
+        prof.add("heading", t3 - t2, items=n)
+
+        # Move & altitude
+        pop.lat, pop.lon = destination_point_many(pop.lat, pop.lon, hdg, dist)
+        self.env.prefetch(pop.lat, pop.lon, hdg, dist)
+        alt = self.alt_model.sample_many(codes, z_alt)
+        alt = np.where(_HIGH_FLIGHT_STATES[codes], alt * 1.1, alt)
+        t4 = clock()
+        prof.add("movement", t4 - t3, items=n)
+
+        # Risk proxy
+        in_band = (alt >= cfg.bsa_min_m) & (alt <= cfg.bsa_max_m)
+        if far is not None:
+            in_band &= ~far
+        nearest_id = np.full(n, -1, dtype=np.intp)
+        nearest_d = np.full(n, np.nan)
+        if in_band.any():
+            ids, d = self.env.turbine_index.nearest_many(
+                pop.lat[in_band], pop.lon[in_band], max_distance_m=cfg.turbine_influence_m
+            )
+            nearest_id[in_band], nearest_d[in_band] = ids, d
+        t5 = clock()
+        prof.add("risk", t5 - t4, items=n)
+
+        batch = {
+            "t": np.full(n, grid.times[i]),
+            "agent_id": pop.agent_id.copy(),
+            "lat": pop.lat.copy(),
+            "lon": pop.lon.copy(),
+            "alt_m": alt,
+            "state": codes.copy(),
+            "in_bsa": nearest_id >= 0,
+            "nearest_turbine_id": nearest_id,
+            "nearest_turbine_d_m": nearest_d,
+        }
+        prof.add("record", clock() - t5, items=n)
+        prof.step_done(n)
+        return batch
+
+    def iter_steps(self, chunk_steps: int = 1) -> Iterator[TrackBatch]:
+        """Advance the simulation lazily, yielding one columnar batch per ``chunk_steps`` timesteps."""
+
+        def _steps() -> Iterator[TrackBatch]:
+            resume, self._resume = self._resume, None
+            self._rng = rng = np.random.default_rng(self.seed)
+            start = 0
+            if self.scheduler is not None:
+                self.scheduler.reset(len(self.population))
+            if resume is not None:
+                start = resume["step"]
+                if resume["rng"] is not None:
+                    rng.bit_generator.state = resume["rng"]
+                if self.scheduler is not None and resume.get("schedule") is not None:
+                    self.scheduler.set_state(resume["schedule"])
+            if resume is None or resume["grid_ref"] is None:
+                self.grid = self.time_grid()
+            else:
+                self.grid = TimeGrid.from_config(self.sim_cfg, *resume["grid_ref"])
+            self.env.prepare_times(self.grid.times)
+            self.profiler.start(len(self.grid) - start)
+            for i in range(start, len(self.grid)):
+                batch = self.step(i, rng)
+                self.next_step = i + 1
+                yield batch
+
+        return chunk_batches(_steps(), chunk_steps)
+
+    def run_to(self, sink: TrackSink, chunk_steps: int = 60) -> int:
+        return stream(self.iter_steps(chunk_steps), sink, self.profiler)
+
+    def run(self) -> pd.DataFrame:
+        sink = MemorySink()
+        self.run_to(sink)
+        return sink.frame()
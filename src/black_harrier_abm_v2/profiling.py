@@ -0,0 +1,107 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import json
+import time
+
+ProgressCallback = Callable[[int, int], None]  # (steps done, total steps)
+CACHE_STATS = ("hits", "misses", "evictions", "resident_bytes", "slice_reads", "tile_reads", "prefetches")
+
+
+def _zero() -> float:
+    return 0.0
+
+
+@dataclass
+class Profiler:
+    """Cumulative wall time, call and item counts per named phase, plus run progress.
+
+    Engines bracket each phase with ``t0 = prof.clock()`` ... ``prof.add(name, prof.clock() - t0)``.
+    A disabled profiler's clock returns 0 and ``add`` returns immediately, so it can stay wired in;
+    it still reports progress if ``progress`` is set.
+    Phase names starting with ``env.`` are sampler calls and are nested inside ``heading``.
+    """
+
+    enabled: bool = True
+    progress: Optional[ProgressCallback] = None
+    progress_every: int = 1  # steps between progress callbacks
+    phases: Dict[str, List[float]] = field(default_factory=dict)  # name -> [seconds, calls, items]
+    caches: Dict[str, Any] = field(default_factory=dict)
+    steps: int = 0
+    total_steps: int = 0
+    agent_steps: int = 0
+
+    def __post_init__(self) -> None:
+        self.clock: Callable[[], float] = time.perf_counter if self.enabled else _zero
+        self._t_start: Optional[float] = None
+        self._t_last: Optional[float] = None
+
+    def add(self, name: str, seconds: float, calls: int = 1, items: int = 0) -> None:
+        if not self.enabled:
+            return
+        acc = self.phases.get(name)
+        if acc is None:
+            acc = self.phases[name] = [0.0, 0, 0]
+        acc[0] += seconds
+        acc[1] += calls
+        acc[2] += items
+
+    def watch_cache(self, name: str, cache: Any) -> None:
+        """Report ``hits``/``misses``/``evictions`` (and ``resident_bytes``, ``slice_reads``, ``tile_reads``,
+        ``prefetches``) of ``cache`` in the summary."""
+        self.caches[name] = cache
+
+    def start(self, total_steps: int) -> None:
+        if not self.enabled and self.progress is None:
+            return
+        self.total_steps += total_steps
+        if self._t_start is None:
+            self._t_start = time.perf_counter()
+
+    def step_done(self, n_agents: int) -> None:
+        if not self.enabled and self.progress is None:
+            return
+        self.steps += 1
+        self.agent_steps += n_agents
+        self._t_last = time.perf_counter()
+        if self.progress is not None and (self.steps % max(1, self.progress_every) == 0 or self.steps == self.total_steps):
+            self.progress(self.steps, self.total_steps)
+
+    def summary(self) -> Dict[str, Any]:
+        wall = (self._t_last - self._t_start) if self._t_start is not None and self._t_last is not None else 0.0
+        top = sum(acc[0] for name, acc in self.phases.items() if not name.startswith("env."))
+        phases = {
+            name: {
+                "seconds": acc[0],
+                "calls": int(acc[1]),
+                "items": int(acc[2]),
+                "share": acc[0] / top if top > 0 else 0.0,
+            }
+            for name, acc in sorted(self.phases.items(), key=lambda kv: -kv[1][0])
+        }
+        caches = {}
+        for name, cache in self.caches.items():
+            stats = {k: getattr(cache, k) for k in CACHE_STATS if hasattr(cache, k)}
+            lookups = stats.get("hits", 0) + stats.get("misses", 0)
+            if lookups:
+                stats["hit_rate"] = stats["hits"] / lookups
+            caches[name] = stats
+        return {
+            "enabled": self.enabled,
+            "wall_seconds": wall,
+            "steps": self.steps,
+            "total_steps": self.total_steps,
+            "agent_steps": self.agent_steps,
+            "agent_steps_per_s": self.agent_steps / wall if wall > 0 else None,
+            "phases": phases,
+            "caches": caches,
+        }
+
+    def to_json(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+
+NULL_PROFILER = Profiler(enabled=False)
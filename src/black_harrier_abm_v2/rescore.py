@@ -0,0 +1,109 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence
+import numpy as np
+import pandas as pd
+import yaml
+
+from .config import SimulationConfig
+from .environment import Turbine
+from .exposure import ExposureAccumulator
+from .movement import STATES, STATE_CODES
+from .sinks import TrackBatch, open_sink
+from .spatial import TurbineIndex
+
+RESCORE_GROUPS = ("total", "turbine", "state", "hour")
+
+
+def frame_to_batch(df: pd.DataFrame) -> TrackBatch:
+    """Track rows as written by the sinks (CSV or Parquet) back to a columnar batch."""
+    state = df["state"]
+    if isinstance(state.dtype, pd.CategoricalDtype) and list(state.cat.categories) == list(STATES):
+        codes = state.cat.codes
+    else:
+        codes = state.astype(str).map(STATE_CODES)
+    return {
+        "t": pd.to_datetime(df["t"]).to_numpy(dtype="datetime64[ns]"),
+        "agent_id": df["agent_id"].to_numpy(dtype=np.int64),
+        "lat": df["lat"].to_numpy(dtype=float),
+        "lon": df["lon"].to_numpy(dtype=float),
+        "alt_m": df["alt_m"].to_numpy(dtype=float),
+        "state": np.asarray(codes, dtype=np.int8),
+    }
+
+
+def iter_track_batches(path: str, chunk_rows: int = 1_000_000) -> Iterator[TrackBatch]:
+    """Stream a tracks file (``.csv`` or ``.parquet``) in chunks of at most ``chunk_rows`` rows."""
+    columns = ["t", "agent_id", "lat", "lon", "alt_m", "state"]
+    if Path(path).suffix.lower() in (".parquet", ".pq"):
+        import pyarrow.parquet as pq
+
+        for rb in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield frame_to_batch(rb.to_pandas())
+    else:
+        for df in pd.read_csv(path, usecols=columns, chunksize=chunk_rows):
+            yield frame_to_batch(df)
+
+
+def score_batch(batch: TrackBatch, index: TurbineIndex, sim_cfg: SimulationConfig) -> TrackBatch:
+    """Recompute the engine's risk columns for ``index``: nearest turbine within ``turbine_influence_m`` for
+    points with altitude in ``bsa_min_m``..``bsa_max_m``."""
+    n = len(batch["agent_id"])
+    alt = np.asarray(batch["alt_m"], dtype=float)
+    in_band = (alt >= sim_cfg.bsa_min_m) & (alt <= sim_cfg.bsa_max_m)
+    nearest_id = np.full(n, -1, dtype=np.intp)
+    nearest_d = np.full(n, np.nan)
+    if in_band.any():
+        ids, d = index.nearest_many(batch["lat"][in_band], batch["lon"][in_band], max_distance_m=sim_cfg.turbine_influence_m)
+        nearest_id[in_band], nearest_d[in_band] = ids, d
+    return {**batch, "in_bsa": nearest_id >= 0, "nearest_turbine_id": nearest_id, "nearest_turbine_d_m": nearest_d}
+
+
+def load_layouts(path: str) -> Dict[str, List[Turbine]]:
+    """YAML mapping of layout name to a list of turbine dicts (the ``model.turbines`` format)."""
+    with open(path, "r") as f:
+        doc = yaml.safe_load(f) or {}
+    return {str(name): [Turbine(**t) for t in turbines] for name, turbines in doc.items()}
+
+
+def rescore_tracks(
+    path: str,
+    layouts: Mapping[str, Sequence[Turbine]],
+    sim_cfg: SimulationConfig,
+    chunk_rows: int = 1_000_000,
+    tracks_dir: Optional[str] = None,
+    groups: Sequence[str] = RESCORE_GROUPS,
+) -> pd.DataFrame:
+    """Exposure of recorded tracks under each layout, reading the tracks once.
+
+    Returns one ``ExposureAccumulator`` row per (layout, group, key). With ``tracks_dir``, also writes the
+    tracks with recomputed ``in_bsa``/``nearest_turbine_*`` columns per layout (same format as ``path``).
+    Valid when movement does not depend on the layout (e.g. ``w_turbine_avoid: 0``). Recorded coordinates
+    are float32, so distances carry metre-level rounding.
+    """
+    indexes = {name: TurbineIndex.from_turbines(list(turbines)) for name, turbines in layouts.items()}
+    accs = {
+        name: ExposureAccumulator(index=idx, step_seconds=sim_cfg.step_seconds, influence_m=sim_cfg.turbine_influence_m,
+                                  mode=sim_cfg.exposure_mode)
+        for name, idx in indexes.items()
+    }
+    sinks = {}
+    if tracks_dir is not None:
+        Path(tracks_dir).mkdir(parents=True, exist_ok=True)
+        suffix = Path(path).suffix or ".csv"
+        sinks = {name: open_sink(str(Path(tracks_dir) / f"{Path(path).stem}_{name}{suffix}")) for name in layouts}
+    try:
+        for batch in iter_track_batches(path, chunk_rows):
+            for name, idx in indexes.items():
+                accs[name].write(batch)
+                if name in sinks:
+                    sinks[name].write(score_batch(batch, idx, sim_cfg))
+    finally:
+        for sink in sinks.values():
+            sink.close()
+    frames = []
+    for name, acc in accs.items():
+        table = acc.table(groups)
+        table.insert(0, "layout", name)
+        frames.append(table)
+    return pd.concat(frames, ignore_index=True)
@@ -1,13 +1,21 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List, Dict
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional
+import numpy as np
 import pandas as pd
 
 from .environment import Environment
-from .agents import HarrierAgent, month_to_season
-from .movement import State, StepSelectionPolicy, AltitudeModel
-from .utils.geo import destination_point
+from .agents import HarrierAgent
+from .movement import STATE_CODES, State, StepSelectionPolicy, AltitudeModel
+from .utils.geo import destination_point_many
 from .config import SimulationConfig
+from .timegrid import TimeGrid
+from .profiling import NULL_PROFILER, Profiler
+from .sinks import MemorySink, TrackBatch, TrackSink, chunk_batches, stream
+from .scheduling import AdaptiveStepping
+from .streams import RandomStreams
+
+_NO_DRAWS = (None, None, None, None)
 
 
 @dataclass
@@ -17,67 +25,149 @@ class ABMSimulation:
     policy: StepSelectionPolicy
     alt_model: AltitudeModel
     sim_cfg: SimulationConfig
+    profiler: Profiler = field(default_factory=lambda: NULL_PROFILER, repr=False)
+    scheduler: Optional[AdaptiveStepping] = None
+    streams: Optional[RandomStreams] = None  # None: each agent draws from its own ``rng``
+    grid: Optional[TimeGrid] = field(default=None, init=False, repr=False)
+    next_step: int = field(default=0, init=False)
+    _resume: Optional[dict] = field(default=None, init=False, repr=False)
 
+    def time_grid(self) -> TimeGrid:
+        lat = float(np.mean([ag.lat for ag in self.agents])) if self.agents else None
+        lon = float(np.mean([ag.lon for ag in self.agents])) if self.agents else None
+        return TimeGrid.from_config(self.sim_cfg, lat=lat, lon=lon)
 
-    def run(self) -> pd.DataFrame:
-        records: List[Dict] = []
-        for ag in self.agents:
-            ag.step_seconds = self.sim_cfg.step_seconds
+    def snapshot(self) -> dict:
+        """State after the last completed step; agents carry their positions, states and RNG state."""
+        grid_ref = None if self.grid is None else (self.grid.lat, self.grid.lon)
+        schedule = None if self.scheduler is None else self.scheduler.state()
+        return {"step": self.next_step, "agents": self.agents, "grid_ref": grid_ref, "schedule": schedule,
+                "streams": self.streams}
 
-        t = self.sim_cfg.start_time
-        while t <= self.sim_cfg.end_time:
-            for ag in self.agents:
-                # Update state
-                season = month_to_season(t)
-                ag.state = ag.next_state(season)
-
-                # Speed & target selection
-                speed = max(0.1, ag.sample_speed())
-                target = ag.nest if ag.state in (State.BREEDING, State.COMMUTING, State.DISPLAYING) and ag.nest else (
-                    ag.roost if ag.state in (State.ROOSTING, State.FORAGING) and ag.roost else None
-                )
+    def restore(self, snapshot: dict) -> None:
+        """Continue from ``snapshot`` on the next ``iter_steps`` call."""
+        self.agents = snapshot["agents"]
+        self.streams = snapshot.get("streams")
+        self._resume = snapshot
 
-                # Choose heading via policy
-                hdg = self.policy.choose_heading(
-                    lat=ag.lat, lon=ag.lon, speed_mps=speed, t=t, env=self.env, state=ag.state, target=target, rng=ag.rng
-                )
+    def _step(self, k: int) -> TrackBatch:
+        grid, prof = self.grid, self.profiler
+        clock = prof.clock
+        t = grid.timestamp(k)
+        season = int(grid.season[k])
+        n = len(self.agents)
+        lats, lons, alts = np.empty(n), np.empty(n), np.empty(n)
+        states = np.empty(n, dtype=np.int8)
+        nearest_ids = np.full(n, -1, dtype=np.intp)
+        nearest_ds = np.full(n, np.nan)
+        hdgs, dists = np.empty(n), np.empty(n)
+        ids = np.array([ag.agent_id for ag in self.agents], dtype=np.int64)
+        # Counter-based runs draw the whole step up front; rows follow streams.PURPOSES
+        draws = None if self.streams is None else self.streams.draws(k, ids).T.tolist()
+        for i, ag in enumerate(self.agents):
+            u_state, z_speed, u_heading, z_alt = _NO_DRAWS if draws is None else draws[i]
+            # Update state
+            t0 = clock()
+            ag.state = ag.next_state(season, u_state)
+            t1 = clock()
+            prof.add("transition", t1 - t0)
+
+            # Speed & target selection
+            speed = max(0.1, ag.sample_speed(z_speed))
+            target = ag.nest if ag.state in (State.BREEDING, State.COMMUTING, State.DISPLAYING) and ag.nest else (
+                ag.roost if ag.state in (State.ROOSTING, State.FORAGING) and ag.roost else None
+            )
+            t2 = clock()
+            prof.add("speed", t2 - t1)
+
+            # Choose heading via policy
+            dist = speed * self.sim_cfg.step_seconds
+            far = False
+            if self.scheduler is not None:
+                far = bool(self.scheduler.plan(np.array([i]), np.array([ag.lat]), np.array([ag.lon]),
+                                               np.array([dist]))[0])
+            hdg = self.policy.choose_heading(
+                lat=ag.lat, lon=ag.lon, speed_mps=speed, t=t, env=self.env, state=ag.state, target=target,
+                rng=ag.rng, step_seconds=self.sim_cfg.step_seconds, u=u_heading, clear=far,
+            )
+            t3 = clock()
+            prof.add("heading", t3 - t2)
+
+            # Move
+            # NumPy trigonometry as in the population engine, so both engines move agents bit for bit alike
+            lat2, lon2 = (float(x[0]) for x in destination_point_many(
+                np.array([ag.lat]), np.array([ag.lon]), np.array([hdg]), np.array([dist])))
+            alt = self.alt_model.sample(ag.state, ag.rng, z_alt)
+            if ag.state in (State.DISPLAYING, State.MIGRATING, State.COMMUTING):
+                alt *= 1.1
 
-                # Move
-                dist = speed * self.sim_cfg.step_seconds
-                lat2, lon2 = destination_point(ag.lat, ag.lon, hdg, dist)
-                alt = self.alt_model.sample(ag.state, ag.rng)
-                if ag.state in (State.DISPLAYING, State.MIGRATING, State.COMMUTING):
-                    alt *= 1.1
-
-                ag.lat, ag.lon = lat2, lon2
-
-                # Risk proxy
-                in_bsa = False
-                nearest_id = None
-                nearest_d = None
-                for i, tb in enumerate(self.env.turbines):
-                    from .utils.geo import haversine_m
-                    d = haversine_m(lat2, lon2, tb.lat, tb.lon)
-                    if d <= self.sim_cfg.turbine_influence_m and (self.sim_cfg.bsa_min_m <= alt <= self.sim_cfg.bsa_max_m):
-                        in_bsa = True
-                        if nearest_d is None or d < nearest_d:
-                            nearest_id = i
-                            nearest_d = d
-
-                records.append(
-                    {
-                        "t": t,
-                        "agent_id": ag.agent_id,
-                        "lat": ag.lat,
-                        "lon": ag.lon,
-                        "alt_m": alt,
-                        "state": ag.state,
-                        "in_bsa": in_bsa,
-                        "nearest_turbine_id": nearest_id,
-                        "nearest_turbine_d_m": nearest_d,
-                    }
+            ag.lat, ag.lon = lat2, lon2
+            t4 = clock()
+            prof.add("movement", t4 - t3)
+
+            # Risk proxy: nearest turbine within the influence radius, if flying in the BSA band
+            if not far and self.sim_cfg.bsa_min_m <= alt <= self.sim_cfg.bsa_max_m:
+                nearest_id, nearest_d = self.env.turbine_index.nearest(
+                    lat2, lon2, max_distance_m=self.sim_cfg.turbine_influence_m
                 )
+                if nearest_id is not None:
+                    nearest_ids[i], nearest_ds[i] = nearest_id, nearest_d
+            t5 = clock()
+            prof.add("risk", t5 - t4)
+
+            lats[i], lons[i], alts[i] = ag.lat, ag.lon, alt
+            hdgs[i], dists[i] = hdg, dist
+            states[i] = STATE_CODES[ag.state]
+
+        t0 = clock()
+        self.env.prefetch(lats, lons, hdgs, dists)
+        t1 = clock()
+        prof.add("movement", t1 - t0, calls=0)
+        batch = {
+            "t": np.full(n, grid.times[k]),
+            "agent_id": ids,
+            "lat": lats,
+            "lon": lons,
+            "alt_m": alts,
+            "state": states,
+            "in_bsa": nearest_ids >= 0,
+            "nearest_turbine_id": nearest_ids,
+            "nearest_turbine_d_m": nearest_ds,
+        }
+        prof.add("record", clock() - t1)
+        prof.step_done(n)
+        return batch
+
+    def iter_steps(self, chunk_steps: int = 1) -> Iterator[TrackBatch]:
+        """Advance the simulation lazily, yielding one columnar batch per ``chunk_steps`` timesteps."""
 
-            t += pd.Timedelta(seconds=self.sim_cfg.step_seconds)
+        def _steps() -> Iterator[TrackBatch]:
+            for ag in self.agents:
+                ag.step_seconds = self.sim_cfg.step_seconds
+            resume, self._resume = self._resume, None
+            start = 0 if resume is None else resume["step"]
+            if self.scheduler is not None:
+                self.scheduler.reset(len(self.agents))
+                if resume is not None and resume.get("schedule") is not None:
+                    self.scheduler.set_state(resume["schedule"])
+            if resume is None or resume["grid_ref"] is None:
+                self.grid = self.time_grid()
+            else:
+                self.grid = TimeGrid.from_config(self.sim_cfg, *resume["grid_ref"])
+            self.env.prepare_times(self.grid.times)
+            self.profiler.start(len(self.grid) - start)
+            for i in range(start, len(self.grid)):
+                batch = self._step(i)
+                self.next_step = i + 1
+                yield batch
+
+        return chunk_batches(_steps(), chunk_steps)
 
-        return pd.DataFrame.from_records(records)
\ No newline at end of file
+    def run_to(self, sink: TrackSink, chunk_steps: int = 60) -> int:
+        """Stream the whole run into ``sink``; memory is bounded by ``chunk_steps``, not run length."""
+        return stream(self.iter_steps(chunk_steps), sink, self.profiler)
+
+    def run(self) -> pd.DataFrame:
+        sink = MemorySink()
+        self.run_to(sink)
+        return sink.frame()
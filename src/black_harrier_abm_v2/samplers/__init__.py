@@ -1,2 +1,4 @@
-from .raster import RasterSamplers
-__all__ = ["RasterSamplers"]
\ No newline at end of file
+from .raster import RasterCache, RasterLayer, RasterSamplers
+from .temporal import TimeCube
+from .tiled import TileCache, TiledRaster
+__all__ = ["RasterCache", "RasterLayer", "RasterSamplers", "TimeCube", "TileCache", "TiledRaster"]
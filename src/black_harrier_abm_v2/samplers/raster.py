@@ -1,11 +1,244 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Sequence, Tuple, Union
+import hashlib
+import math
+import os
 import numpy as np
 import rasterio
-from rasterio.warp import transform
+from affine import Affine
+from pyproj import CRS, Transformer
 import pandas as pd
 
+from ..utils.geo import destination_point_many
+
+if TYPE_CHECKING:
+    from .temporal import TimeCube
+    from .tiled import TileCache, TiledRaster
+
+
+WGS84 = CRS.from_epsg(4326)
+EARTH_RADIUS_M = 6371000.0
+TERRAIN_CACHE_VERSION = 1
+TERRAIN_LAYERS = ("slope", "aspect")  # derived from the DEM; channel order of tiled terrain
+
+
+@dataclass
+class RasterLayer:
+    """One band held in memory with its grid metadata and lon/lat -> grid transformer."""
+
+    path: str
+    data: np.ndarray
+    transform: Affine
+    crs: CRS
+    nodata: Optional[float] = None
+    to_raster: Optional[Transformer] = None  # None when the raster is already EPSG:4326
+
+    def __post_init__(self) -> None:
+        self._inv = ~self.transform
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.data.nbytes)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.data.shape[0], self.data.shape[1]
+
+    def index(self, lat: float, lon: float) -> Optional[Tuple[int, int]]:
+        x, y = (lon, lat) if self.to_raster is None else self.to_raster.transform(lon, lat)
+        inv = self._inv
+        col = math.floor(inv.a * x + inv.b * y + inv.c)
+        row = math.floor(inv.d * x + inv.e * y + inv.f)
+        nrows, ncols = self.shape
+        if 0 <= row < nrows and 0 <= col < ncols:
+            return row, col
+        return None
+
+    def sample(self, lat: float, lon: float) -> Optional[float]:
+        rc = self.index(lat, lon)
+        if rc is None:
+            return None
+        val = float(self.data[rc])
+        if math.isnan(val) or (self.nodata is not None and val == self.nodata):
+            return None
+        return val
+
+    def index_many(self, lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        return grid_index_many(self._inv, self.shape, self.to_raster, lats, lons)
+
+    def sample_many(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Vectorized ``sample``: NaN marks nodata and out-of-bounds points. Output has the shape of ``lats``."""
+        shape = np.shape(lats)
+        rows, cols, valid = self.index_many(lats, lons)
+        vals = self.data[rows, cols].astype(float)
+        missing = ~valid | np.isnan(vals)
+        if self.nodata is not None:
+            missing |= vals == self.nodata
+        vals[missing] = np.nan
+        return vals.reshape(shape)
+
+
+def grid_index_many(
+    inv: Affine, shape: Tuple[int, int], to_raster: Optional[Transformer], lats: np.ndarray, lons: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Flat row/col indices and an in-bounds mask for lon/lat points on a grid with inverse transform ``inv``."""
+    lats = np.asarray(lats, dtype=float).ravel()
+    lons = np.asarray(lons, dtype=float).ravel()
+    xs, ys = (lons, lats) if to_raster is None else to_raster.transform(lons, lats)
+    cols = np.floor(inv.a * xs + inv.b * ys + inv.c)
+    rows = np.floor(inv.d * xs + inv.e * ys + inv.f)
+    nrows, ncols = shape
+    valid = (rows >= 0) & (rows < nrows) & (cols >= 0) & (cols < ncols)
+    rows = np.where(valid, rows, 0).astype(np.intp)
+    cols = np.where(valid, cols, 0).astype(np.intp)
+    return rows, cols, valid
+
+
+def _to_raster_transformer(crs: CRS) -> Optional[Transformer]:
+    if crs == WGS84:
+        return None
+    return Transformer.from_crs(WGS84, crs, always_xy=True)
+
+
+@dataclass
+class RasterCache:
+    """Opens each raster once and keeps band 1 resident, evicting least-recently-used layers.
+
+    ``max_resident_bytes=None`` keeps everything. A single layer larger than the budget is
+    still kept (it is needed to sample), but everything else is evicted first.
+    """
+
+    max_resident_bytes: Optional[int] = None
+    default_crs_epsg: int = 4326
+    _layers: "OrderedDict[str, RasterLayer]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _transformers: dict = field(default_factory=dict, init=False, repr=False)
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    evictions: int = field(default=0, init=False)
+
+    def __enter__(self) -> "RasterCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._layers
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(layer.nbytes for layer in self._layers.values())
+
+    def get(self, path: str) -> RasterLayer:
+        return self.derived(path, lambda: self._load(path))
+
+    def derived(self, key: str, build: Callable[[], RasterLayer]) -> RasterLayer:
+        """Get-or-build a layer under ``key`` (e.g. a slope grid computed from a DEM); shares the byte budget."""
+        layer = self._layers.get(key)
+        if layer is not None:
+            self.hits += 1
+            self._layers.move_to_end(key)
+            return layer
+        self.misses += 1
+        layer = build()
+        self.put(key, layer)
+        return layer
+
+    def put(self, key: str, layer: RasterLayer) -> None:
+        self._layers[key] = layer
+        self._layers.move_to_end(key)
+        self._evict(keep=key)
+
+    def load_many(self, paths: Sequence[str], workers: int = 4) -> None:
+        """Read the bands of ``paths`` not yet resident, up to ``workers`` files concurrently.
+
+        Files are read ``workers`` at a time, so at most that many bands are held outside the budget.
+        """
+        todo = [p for p in dict.fromkeys(paths) if p not in self._layers]
+        if not todo:
+            return
+        workers = max(1, min(workers, len(todo)))
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            for i in range(0, len(todo), workers):
+                group = todo[i:i + workers]
+                for path, layer in zip(group, ex.map(self._load, group)):
+                    self.misses += 1
+                    self.put(path, layer)
+
+    def _load(self, path: str) -> RasterLayer:
+        with rasterio.open(path) as ds:
+            data = ds.read(1)
+            crs = CRS.from_user_input(ds.crs) if ds.crs else CRS.from_epsg(self.default_crs_epsg)
+            transform, nodata = ds.transform, ds.nodata
+        return RasterLayer(
+            path=path, data=data, transform=transform, crs=crs, nodata=nodata, to_raster=self.transformer(crs)
+        )
+
+    def transformer(self, crs: CRS) -> Optional[Transformer]:
+        key = crs.to_wkt()
+        if key not in self._transformers:
+            self._transformers[key] = _to_raster_transformer(crs)
+        return self._transformers[key]
+
+    def _evict(self, keep: str) -> None:
+        if self.max_resident_bytes is None:
+            return
+        while self.resident_bytes > self.max_resident_bytes:
+            victim = next((p for p in self._layers if p != keep), None)
+            if victim is None:
+                break
+            del self._layers[victim]
+            self.evictions += 1
+
+    def evict(self, path: str) -> None:
+        if self._layers.pop(path, None) is not None:
+            self.evictions += 1
+
+    def close(self) -> None:
+        self._layers.clear()
+        self._transformers.clear()
+
+
+def pixel_size_m(layer: RasterLayer) -> Tuple[np.ndarray, float]:
+    """Signed pixel width per row (m, shape (nrows, 1)) and height (m) of a north-up grid."""
+    t = layer.transform
+    if layer.crs.is_geographic:
+        nrows = layer.shape[0]
+        row_lats = t.f + t.e * (np.arange(nrows) + 0.5)
+        dx = EARTH_RADIUS_M * np.radians(t.a) * np.cos(np.radians(row_lats))
+        return dx[:, None], EARTH_RADIUS_M * math.radians(t.e)
+    unit = layer.crs.axis_info[0].unit_conversion_factor if layer.crs.axis_info else 1.0
+    return np.full((layer.shape[0], 1), t.a * unit), t.e * unit
+
+
+def slope_aspect(layer: RasterLayer) -> Tuple[np.ndarray, np.ndarray]:
+    """Slope (degrees) and aspect (degrees clockwise from north, downslope) for every DEM cell.
+
+    Central differences inside the grid, one-sided differences on the edges; nodata propagates as NaN.
+    """
+    elev = layer.data.astype(np.float64)
+    if layer.nodata is not None:
+        elev[elev == layer.nodata] = np.nan
+    dx, dy = pixel_size_m(layer)
+    nrows, ncols = elev.shape
+    d_row = np.gradient(elev, axis=0) if nrows > 1 else np.zeros_like(elev)
+    d_col = np.gradient(elev, axis=1) if ncols > 1 else np.zeros_like(elev)
+    dz_east = d_col / dx
+    dz_north = d_row / dy
+    slope = np.degrees(np.arctan(np.hypot(dz_east, dz_north)))
+    aspect = (np.degrees(np.arctan2(-dz_east, -dz_north)) + 360.0) % 360.0
+    return slope.astype(np.float32), aspect.astype(np.float32)
+
+
+def _terrain_cache_file(cache_dir: str, dem_path: str) -> Path:
+    st = os.stat(dem_path)
+    key = f"{os.path.abspath(dem_path)}|{st.st_mtime_ns}|{st.st_size}|{TERRAIN_CACHE_VERSION}"
+    return Path(cache_dir) / f"terrain_{hashlib.sha1(key.encode()).hexdigest()[:16]}.npz"
+
 
 @dataclass
 class RasterSamplers:
@@ -14,46 +247,226 @@ class RasterSamplers:
     wind_u_raster: Optional[str] = None
     wind_v_raster: Optional[str] = None
     crs_epsg: int = 4326
+    max_resident_bytes: Optional[int] = None
+    cache: Optional[RasterCache] = None
+    slope_full_penalty_deg: float = 45.0  # slopes at or above this get the full -1 penalty
+    terrain_cache_dir: Optional[str] = None  # on-disk slope/aspect cache keyed by DEM path, mtime and size
+    # Time-indexed layers (multiband GeoTIFF, NetCDF, Zarr) for habitat / wind_u / wind_v
+    time_interp: str = "linear"
+    prefetch_slices: int = 1
+    cube_options: Dict[str, dict] = field(default_factory=dict)  # per layer: variable, times, start/freq, interp
+    # Tiled mode: static layers are read in tile_size windows and ``max_resident_bytes`` bounds resident tiles
+    tile_size: Optional[int] = None
+    tile_prefetch_steps: float = 1.0  # look-ahead along each agent's heading, in steps; 0 disables prefetch
+
+    def __post_init__(self) -> None:
+        if self.cache is None:
+            self.cache = RasterCache(max_resident_bytes=self.max_resident_bytes, default_crs_epsg=self.crs_epsg)
+        self._cubes: Dict[str, "TimeCube"] = {}
+        self._is_cube: Dict[str, bool] = {}
+        self._tiled: Dict[str, "TiledRaster"] = {}
+        self.tiles: Optional["TileCache"] = None
+        if self.tile_size:
+            from .tiled import TileCache
+
+            self.tiles = TileCache(max_resident_bytes=self.max_resident_bytes)
+
+    @property
+    def layers(self) -> Dict[str, str]:
+        named = {"habitat": self.habitat_raster, "wind_u": self.wind_u_raster, "wind_v": self.wind_v_raster}
+        return {name: path for name, path in named.items() if path}
+
+    @property
+    def cubes(self) -> Dict[str, "TimeCube"]:
+        """Time-indexed layers opened so far, by layer name."""
+        return dict(self._cubes)
+
+    def static_layer(self, path: str) -> Union[RasterLayer, "TiledRaster"]:
+        """Whole-band layer, or a ``TiledRaster`` in tiled mode."""
+        if self.tiles is None:
+            return self.cache.get(path)
+        layer = self._tiled.get(path)
+        if layer is None:
+            from .tiled import TiledRaster
+
+            layer = self._tiled[path] = TiledRaster.open(path, self.tiles, tile_size=self.tile_size,
+                                                         default_crs_epsg=self.crs_epsg)
+        return layer
+
+    def _source(self, name: str, path: str) -> Union[RasterLayer, "TiledRaster", "TimeCube"]:
+        cube = self._cubes.get(name)
+        if cube is not None:
+            return cube
+        from .temporal import is_cube_path, open_cube
+
+        if path not in self._is_cube:
+            self._is_cube[path] = is_cube_path(path)
+        if not self._is_cube[path]:
+            return self.static_layer(path)
+        opts = {"interp": self.time_interp, "prefetch": self.prefetch_slices, **self.cube_options.get(name, {})}
+        cube = self._cubes[name] = open_cube(path, opts, default_crs_epsg=self.crs_epsg)
+        return cube
+
+    def prepare_times(self, times: np.ndarray) -> None:
+        """Precompute temporal interpolation weights of every time-indexed layer for a run's time axis."""
+        for name, path in self.layers.items():
+            self._source(name, path)
+        for cube in self._cubes.values():
+            cube.prepare(times)
+
+    def prefetch_along(self, lats: np.ndarray, lons: np.ndarray, headings_deg: np.ndarray, distances_m: np.ndarray) -> None:
+        """Queue background reads of the tiles agents are heading into (tiled mode only)."""
+        if not self._tiled or self.tile_prefetch_steps <= 0:
+            return
+        ahead_lat, ahead_lon = destination_point_many(lats, lons, headings_deg,
+                                                      np.asarray(distances_m) * self.tile_prefetch_steps)
+        for layer in self._tiled.values():
+            layer.prefetch(ahead_lat, ahead_lon)
+
+    def _sample_layer_many(self, name: str, path: str, lats: np.ndarray, lons: np.ndarray, t) -> np.ndarray:
+        src = self._source(name, path)
+        if name in self._cubes:
+            return src.sample_many(lats, lons, t)
+        return src.sample_many(lats, lons)
+
+    @property
+    def paths(self) -> Tuple[str, ...]:
+        rasters = (self.habitat_raster, self.dem_raster, self.wind_u_raster, self.wind_v_raster)
+        return tuple(p for p in rasters if p)
+
+    def open(self) -> "RasterSamplers":
+        # Load every configured layer up front so the first simulation step does not pay for it
+        for name, path in self.layers.items():
+            self._source(name, path)
+        if self.dem_raster:
+            self.terrain_layer("slope")
+        return self
+
+    def terrain(self) -> Tuple[RasterLayer, RasterLayer]:
+        """Slope and aspect layers (see ``terrain_layer``)."""
+        return self.terrain_layer("slope"), self.terrain_layer("aspect")
+
+    def terrain_layer(self, name: str) -> RasterLayer:
+        """Slope or aspect layer derived from the DEM once (or read from ``terrain_cache_dir``).
 
-    def _sample_raster(self, path: Optional[str], lat: float, lon: float) -> Optional[float]:
+        Each is its own cache entry, built on first use: the step loop only samples slope, so aspect never
+        competes with it for the byte budget unless asked for. In tiled mode both are derived tile by
+        tile as agents reach them instead.
+        """
+        if self.tiles is not None:
+            return self._terrain_tiles()[TERRAIN_LAYERS.index(name)]
+        return self.cache.derived(f"{self.dem_raster}#{name}", lambda: self._derive_terrain(name))
+
+    def _derive_terrain(self, name: str) -> RasterLayer:
+        cache_file = _terrain_cache_file(self.terrain_cache_dir, self.dem_raster) if self.terrain_cache_dir else None
+        if cache_file is not None and cache_file.exists():
+            with np.load(cache_file) as npz:
+                data = npz[name]
+                transform = Affine(*npz["transform"])
+                crs = CRS.from_wkt(str(npz["crs"]))
+        else:
+            dem = self.cache.get(self.dem_raster)
+            slope, aspect = slope_aspect(dem)
+            data = slope if name == "slope" else aspect
+            transform, crs = dem.transform, dem.crs
+            # The elevation band is not sampled directly, only its derivatives
+            self.cache.evict(self.dem_raster)
+            if cache_file is not None:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp = cache_file.with_suffix(".tmp.npz")
+                np.savez(tmp, slope=slope, aspect=aspect, transform=np.array(transform)[:6], crs=crs.to_wkt())
+                os.replace(tmp, cache_file)
+        return RasterLayer(path=f"{self.dem_raster}#{name}", data=data, transform=transform, crs=crs,
+                           to_raster=self.cache.transformer(crs))
+
+    def _terrain_tiles(self):
+        key = f"{self.dem_raster}#terrain"
+        terrain = self._tiled.get(key)
+        if terrain is None:
+            from .tiled import TileChannel, TiledRaster, terrain_tiles
+
+            dem = TiledRaster.open(self.dem_raster, self.tiles, tile_size=self.tile_size,
+                                   default_crs_epsg=self.crs_epsg)
+            terrain = self._tiled[key] = terrain_tiles(dem)
+            self._terrain_views = (TileChannel(terrain, 0), TileChannel(terrain, 1))
+        return self._terrain_views
+
+    def close(self) -> None:
+        for cube in self._cubes.values():
+            cube.close()
+        self._cubes.clear()
+        if self.tiles is not None:
+            self.tiles.close()
+        for layer in self._tiled.values():
+            layer.close()
+        self._tiled.clear()
+        self.cache.close()
+
+    def __enter__(self) -> "RasterSamplers":
+        return self.open()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _sample_raster(self, path: Optional[str], lat: float, lon: float, t=None, name: str = "") -> Optional[float]:
         if not path:
             return None
-        with rasterio.open(path) as ds:
-            # Transform WGS84 to raster CRS
-            result = transform({"init": "epsg:4326"}, ds.crs, [lon], [lat])
-            xs, ys = result[:2]
-            row, col = ds.index(xs[0], ys[0])
-            val = ds.read(1)[row, col]
-            if np.isnan(val):
-                return None
-            return float(val)
+        src = self._source(name, path) if name else self.static_layer(path)
+        if name in self._cubes:
+            return src.sample(lat, lon, t)
+        return src.sample(lat, lon)
 
     def habitat(self, lat: float, lon: float, t: pd.Timestamp) -> float:
-        val = self._sample_raster(self.habitat_raster, lat, lon)
+        val = self._sample_raster(self.habitat_raster, lat, lon, t, "habitat")
         if val is None:
             return 0.5
         # Assume habitat raster is already scaled 0..1; clamp for safety
         return max(0.0, min(1.0, float(val)))
 
     def slope(self, lat: float, lon: float) -> float:
-        # Very simple slope proxy: finite diff on DEM; for production use a real gradient
+        # Uphill/downhill penalty in [-1, 0] from the precomputed slope grid
         if not self.dem_raster:
             return 0.0
-        with rasterio.open(self.dem_raster) as ds:
-            result = transform({"init": "epsg:4326"}, ds.crs, [lon], [lat])
-            xs, ys = result[:2]
-            r, c = ds.index(xs[0], ys[0])
-            elev = ds.read(1)
-            r0, c0 = max(1, r), max(1, c)
-            window = elev[r0 - 1 : r0 + 2, c0 - 1 : c0 + 2]
-            gy, gx = np.gradient(window.astype(float))
-            slope_mag = float(np.hypot(gx.mean(), gy.mean()))
-            # Normalize to ~[0,1] then map to [-1,1] with sign ~ uphill penalty
-            return -min(1.0, slope_mag / 50.0)
+        deg = self.terrain_layer("slope").sample(lat, lon)
+        if deg is None:
+            return 0.0
+        return -min(1.0, deg / self.slope_full_penalty_deg)
+
+    def aspect(self, lat: float, lon: float) -> Optional[float]:
+        if not self.dem_raster:
+            return None
+        return self.terrain_layer("aspect").sample(lat, lon)
 
     def wind(self, lat: float, lon: float, t: pd.Timestamp) -> Tuple[float, float]:
         if not (self.wind_u_raster and self.wind_v_raster):
             return (0.0, 0.0)
-        u = self._sample_raster(self.wind_u_raster, lat, lon) or 0.0
-        v = self._sample_raster(self.wind_v_raster, lat, lon) or 0.0
-        return (float(u), float(v))
\ No newline at end of file
+        u = self._sample_raster(self.wind_u_raster, lat, lon, t, "wind_u") or 0.0
+        v = self._sample_raster(self.wind_v_raster, lat, lon, t, "wind_v") or 0.0
+        return (float(u), float(v))
+
+    # Batched variants: one coordinate transform, one row/col computation and one gather per layer
+
+    def habitat_many(self, lats: np.ndarray, lons: np.ndarray, t: pd.Timestamp) -> np.ndarray:
+        if not self.habitat_raster:
+            return np.full(np.shape(lats), 0.5)
+        vals = self._sample_layer_many("habitat", self.habitat_raster, lats, lons, t)
+        return np.clip(np.where(np.isnan(vals), 0.5, vals), 0.0, 1.0)
+
+    def slope_many(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        if not self.dem_raster:
+            return np.zeros(np.shape(lats))
+        deg = self.terrain_layer("slope").sample_many(lats, lons)
+        return np.nan_to_num(-np.minimum(1.0, deg / self.slope_full_penalty_deg), nan=0.0)
+
+    def aspect_many(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        if not self.dem_raster:
+            return np.full(np.shape(lats), np.nan)
+        return self.terrain_layer("aspect").sample_many(lats, lons)
+
+    def wind_many(self, lats: np.ndarray, lons: np.ndarray, t: pd.Timestamp) -> Tuple[np.ndarray, np.ndarray]:
+        if not (self.wind_u_raster and self.wind_v_raster):
+            zeros = np.zeros(np.shape(lats))
+            return zeros, zeros.copy()
+        u = self._sample_layer_many("wind_u", self.wind_u_raster, lats, lons, t)
+        v = self._sample_layer_many("wind_v", self.wind_v_raster, lats, lons, t)
+        return np.nan_to_num(u, nan=0.0), np.nan_to_num(v, nan=0.0)
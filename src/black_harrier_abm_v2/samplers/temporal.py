@@ -0,0 +1,265 @@
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Optional, Sequence, Tuple
+import threading
+import numpy as np
+import pandas as pd
+import rasterio
+from affine import Affine
+from pyproj import CRS, Transformer
+
+from .raster import grid_index_many, _to_raster_transformer
+
+CUBE_SUFFIXES = (".nc", ".nc4", ".netcdf", ".zarr")
+INTERP_MODES = ("linear", "nearest")
+
+
+def _to_ns(t) -> Optional[int]:
+    if t is None:
+        return None
+    if isinstance(t, np.datetime64):
+        return int(t.astype("datetime64[ns]").astype(np.int64))
+    return int(pd.Timestamp(t).value)
+
+
+@dataclass
+class TimeCube:
+    """Time-indexed stack of 2-D slices on one grid, sampled with nearest or linear temporal interpolation.
+
+    Slices are read lazily through ``read_slice``. Only the pair bracketing the requested time (plus up to
+    ``prefetch`` slices ahead, loaded on a background thread) is kept resident; resident and in-flight
+    slices together never exceed ``max_resident_slices``. After ``prepare``, prefetches follow the run's
+    brackets, so slices a coarse time step jumps over are never read.
+    """
+
+    path: str
+    times: np.ndarray  # datetime64[ns], strictly increasing
+    shape: Tuple[int, int]
+    transform: Affine
+    crs: CRS
+    read_slice: Callable[[int], np.ndarray]
+    nodata: Optional[float] = None
+    interp: str = "linear"
+    prefetch: int = 1
+    max_resident_slices: int = 4
+    on_close: Optional[Callable[[], None]] = field(default=None, repr=False)  # releases what read_slice opened
+    _slices: "OrderedDict[int, np.ndarray]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _pending: Dict[int, Future] = field(default_factory=dict, init=False, repr=False)
+    slice_reads: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        if self.interp not in INTERP_MODES:
+            raise ValueError(f"interp must be one of {INTERP_MODES}, got {self.interp!r}")
+        self.times = np.asarray(self.times, dtype="datetime64[ns]")
+        if len(self.times) == 0 or np.any(np.diff(self.times.astype(np.int64)) <= 0):
+            raise ValueError(f"{self.path}: time axis must be non-empty and strictly increasing")
+        self._times_ns = self.times.astype(np.int64)
+        self._inv = ~self.transform
+        self.to_raster: Optional[Transformer] = _to_raster_transformer(self.crs)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._prepared: Dict[int, Tuple[int, int, float]] = {}
+        self._upcoming: Optional[np.ndarray] = None  # sorted slice indices the prepared brackets use
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def resident_bytes(self) -> int:
+        return sum(a.nbytes for a in self._slices.values())
+
+    def bracket(self, t) -> Tuple[int, int, float]:
+        """Slice indices (i0, i1) and weight w of i1 for time ``t``; clamped to the ends of the axis."""
+        t_ns = _to_ns(t)
+        hit = self._prepared.get(t_ns)
+        if hit is not None:
+            return hit
+        n = len(self)
+        if t_ns is None or t_ns <= self._times_ns[0]:
+            return 0, 0, 0.0
+        if t_ns >= self._times_ns[-1]:
+            return n - 1, n - 1, 0.0
+        i0 = int(np.searchsorted(self._times_ns, t_ns, side="right")) - 1
+        i1 = i0 + 1
+        w = (t_ns - self._times_ns[i0]) / (self._times_ns[i1] - self._times_ns[i0])
+        if self.interp == "nearest":
+            return (i1, i1, 0.0) if w >= 0.5 else (i0, i0, 0.0)
+        return i0, i1, float(w)
+
+    def prepare(self, times: np.ndarray) -> None:
+        """Precompute (i0, i1, w) for every time of a run's grid so per-step lookups skip the search."""
+        t_ns = np.asarray(times, dtype="datetime64[ns]").astype(np.int64)
+        last = len(self) - 1
+        i0 = np.clip(np.searchsorted(self._times_ns, t_ns, side="right") - 1, 0, last)
+        i1 = np.minimum(i0 + 1, last)
+        span = (self._times_ns[i1] - self._times_ns[i0]).astype(float)
+        w = np.where(span > 0, (t_ns - self._times_ns[i0]) / np.where(span > 0, span, 1.0), 0.0)
+        before, after = t_ns <= self._times_ns[0], t_ns >= self._times_ns[-1]
+        i0 = np.where(before, 0, np.where(after, last, i0))
+        i1 = np.where(before, 0, np.where(after, last, i1))
+        w = np.where(before | after, 0.0, w)
+        if self.interp == "nearest":
+            i0 = i1 = np.where(w >= 0.5, i1, i0)
+            w = np.zeros_like(w)
+        self._prepared = {int(t): (int(a), int(b), float(c)) for t, a, b, c in zip(t_ns, i0, i1, w)}
+        self._upcoming = np.unique(np.concatenate([i0, np.where(w > 0.0, i1, i0)]))
+
+    def _slice(self, i: int) -> np.ndarray:
+        with self._lock:
+            arr = self._slices.get(i)
+            if arr is not None:
+                self._slices.move_to_end(i)
+                return arr
+            fut = self._pending.pop(i, None)
+        arr = fut.result() if fut is not None else self._read(i)
+        with self._lock:
+            self._slices[i] = arr
+            self._slices.move_to_end(i)
+        return arr
+
+    def _read(self, i: int) -> np.ndarray:
+        arr = np.asarray(self.read_slice(i), dtype=np.float32)
+        if self.nodata is not None:
+            arr = np.where(arr == self.nodata, np.float32(np.nan), arr)
+        with self._lock:
+            self.slice_reads += 1
+        return arr
+
+    def _advance(self, i0: int, i1: int) -> None:
+        # Drop slices and prefetches behind the clock, keep the resident set bounded, then prefetch ahead
+        with self._lock:
+            cap = max(2, self.max_resident_slices)
+            for i in [i for i in self._slices if i < i0]:
+                del self._slices[i]
+            for i in [i for i in self._pending if i < i0]:
+                self._pending.pop(i).cancel()
+            while len(self._slices) > cap:
+                victim = next(i for i in self._slices if i not in (i0, i1))
+                del self._slices[victim]
+            if self._upcoming is None:
+                ahead = range(i1 + 1, min(len(self), i1 + 1 + self.prefetch))
+            else:
+                nxt = int(np.searchsorted(self._upcoming, i1, side="right"))
+                ahead = self._upcoming[nxt:nxt + self.prefetch].tolist()
+            ahead = [i for i in ahead if i not in self._slices and i not in self._pending]
+            ahead = ahead[:max(0, cap - len(self._slices) - len(self._pending))]
+            if ahead and self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cube-prefetch")
+            for i in ahead:
+                self._pending[i] = self._executor.submit(self._read, i)
+
+    def sample_many(self, lats: np.ndarray, lons: np.ndarray, t) -> np.ndarray:
+        """Values at points for time ``t``; NaN for nodata and out-of-bounds. Output has the shape of ``lats``."""
+        shape = np.shape(lats)
+        i0, i1, w = self.bracket(t)
+        rows, cols, valid = grid_index_many(self._inv, self.shape, self.to_raster, lats, lons)
+        vals = self._slice(i0)[rows, cols].astype(float)
+        if i1 != i0 and w > 0.0:
+            vals = vals * (1.0 - w) + self._slice(i1)[rows, cols] * w
+        self._advance(i0, i1)
+        vals[~valid] = np.nan
+        return vals.reshape(shape)
+
+    def sample(self, lat: float, lon: float, t) -> Optional[float]:
+        val = float(self.sample_many(np.array([lat]), np.array([lon]), t)[0])
+        return None if np.isnan(val) else val
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self._pending.clear()
+        self._slices.clear()
+        if self.on_close is not None:
+            self.on_close()
+
+    @classmethod
+    def from_geotiff(cls, path: str, times: Optional[Sequence] = None, default_crs_epsg: int = 4326, **kwargs) -> "TimeCube":
+        """Multiband GeoTIFF, one band per time. Times come from ``times`` or, failing that, each band's
+        ``TIME`` tag or description (any string ``pd.Timestamp`` parses)."""
+        with rasterio.open(path) as ds:
+            if times is None:
+                tags = [ds.tags(b).get("TIME") or ds.descriptions[b - 1] for b in range(1, ds.count + 1)]
+                if not all(tags):
+                    raise ValueError(f"{path}: bands carry no TIME tag or description; pass times explicitly")
+                times = tags
+            if len(times) != ds.count:
+                raise ValueError(f"{path}: {ds.count} bands but {len(times)} times")
+            crs = CRS.from_user_input(ds.crs) if ds.crs else CRS.from_epsg(default_crs_epsg)
+            shape, transform, nodata = (ds.height, ds.width), ds.transform, ds.nodata
+
+        local = threading.local()
+        handles: list = []
+        handles_lock = threading.Lock()
+
+        def read_slice(i: int) -> np.ndarray:
+            # rasterio handles are not thread-safe: one per thread (clock thread and prefetch thread)
+            ds = getattr(local, "ds", None)
+            if ds is None or ds.closed:
+                ds = local.ds = rasterio.open(path)
+                with handles_lock:
+                    handles.append(ds)
+            return ds.read(i + 1)
+
+        def close_handles() -> None:
+            with handles_lock:
+                for ds in handles:
+                    ds.close()
+                handles.clear()
+
+        return cls(path=path, times=pd.to_datetime(list(times)).values, shape=shape, transform=transform,
+                   crs=crs, read_slice=read_slice, nodata=nodata, on_close=close_handles, **kwargs)
+
+    @classmethod
+    def from_xarray(cls, path: str, variable: Optional[str] = None, default_crs_epsg: int = 4326, **kwargs) -> "TimeCube":
+        """NetCDF or Zarr on a regular grid with a ``time`` axis (ERA5-style lat/lon or projected x/y)."""
+        import xarray as xr
+
+        ds = xr.open_zarr(path) if Path(path).suffix == ".zarr" else xr.open_dataset(path)
+        da = ds[variable] if variable else ds[next(iter(ds.data_vars))]
+        ydim = next(d for d in ("latitude", "lat", "y") if d in da.dims)
+        xdim = next(d for d in ("longitude", "lon", "x") if d in da.dims)
+        da = da.transpose("time", ydim, xdim)
+        xs, ys = da[xdim].values.astype(float), da[ydim].values.astype(float)
+        dx = (xs[-1] - xs[0]) / (len(xs) - 1) if len(xs) > 1 else 1.0
+        dy = (ys[-1] - ys[0]) / (len(ys) - 1) if len(ys) > 1 else -1.0
+        transform = Affine(dx, 0.0, xs[0] - dx / 2, 0.0, dy, ys[0] - dy / 2)
+        crs = CRS.from_epsg(default_crs_epsg)
+        try:
+            import rioxarray  # noqa: F401  (registers the .rio accessor)
+
+            if da.rio.crs is not None:
+                crs = CRS.from_user_input(da.rio.crs)
+        except ImportError:
+            pass
+        nodata = da.attrs.get("_FillValue", da.encoding.get("_FillValue"))
+
+        def read_slice(i: int) -> np.ndarray:
+            return da.isel(time=i).values
+
+        return cls(path=path, times=da["time"].values, shape=(len(ys), len(xs)), transform=transform, crs=crs,
+                   read_slice=read_slice, nodata=nodata, on_close=ds.close, **kwargs)
+
+
+def is_cube_path(path: str) -> bool:
+    """NetCDF/Zarr paths and GeoTIFFs with more than one band are treated as time cubes."""
+    if Path(path).suffix.lower() in CUBE_SUFFIXES:
+        return True
+    with rasterio.open(path) as ds:
+        return ds.count > 1
+
+
+def open_cube(path: str, options: Optional[dict] = None, default_crs_epsg: int = 4326) -> TimeCube:
+    """Open ``path`` as a ``TimeCube``; ``options`` may set variable, times, start/freq, interp, prefetch."""
+    opts = dict(options or {})
+    kwargs = {k: opts.pop(k) for k in ("interp", "prefetch", "max_resident_slices") if k in opts}
+    if Path(path).suffix.lower() in CUBE_SUFFIXES:
+        return TimeCube.from_xarray(path, variable=opts.get("variable"), default_crs_epsg=default_crs_epsg, **kwargs)
+    times = opts.get("times")
+    if times is None and "start" in opts:
+        with rasterio.open(path) as ds:
+            times = pd.date_range(opts["start"], periods=ds.count, freq=opts.get("freq", "1h"))
+    return TimeCube.from_geotiff(path, times=times, default_crs_epsg=default_crs_epsg, **kwargs)
@@ -0,0 +1,247 @@
+from __future__ import annotations
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, Optional, Tuple
+import threading
+import numpy as np
+import rasterio
+from affine import Affine
+from pyproj import CRS, Transformer
+from rasterio.windows import Window
+
+from .raster import RasterLayer, _to_raster_transformer, grid_index_many, slope_aspect
+
+TileKey = Tuple[Hashable, int, int]  # (layer key, tile row, tile col)
+
+
+@dataclass
+class TileCache:
+    """LRU cache of raster tiles shared by every tiled layer, bounded by ``max_resident_bytes``.
+
+    Tiles can be requested synchronously (``get``) or queued for a background read (``prefetch``); a
+    ``get`` for a queued tile waits for that read instead of issuing a second one. A finished prefetch
+    enters the LRU like any other tile, so predicted tiles that are never sampled are evicted in turn,
+    and at most ``max_pending`` prefetches are in flight.
+    """
+
+    max_resident_bytes: Optional[int] = None
+    max_pending: int = 8
+    _tiles: "OrderedDict[TileKey, np.ndarray]" = field(default_factory=OrderedDict, init=False, repr=False)
+    _pending: Dict[TileKey, Future] = field(default_factory=dict, init=False, repr=False)
+    resident_bytes: int = field(default=0, init=False)
+    hits: int = field(default=0, init=False)
+    misses: int = field(default=0, init=False)
+    evictions: int = field(default=0, init=False)
+    tile_reads: int = field(default=0, init=False)
+    prefetches: int = field(default=0, init=False)
+
+    def __post_init__(self) -> None:
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def __contains__(self, key: TileKey) -> bool:
+        return key in self._tiles
+
+    def get(self, key: TileKey, read: Callable[[], np.ndarray]) -> np.ndarray:
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self.hits += 1
+                self._tiles.move_to_end(key)
+                return tile
+            self.misses += 1
+            fut = self._pending.pop(key, None)
+        tile = fut.result() if fut is not None else self._read(read)
+        self._put(key, tile)
+        return tile
+
+    def prefetch(self, key: TileKey, read: Callable[[], np.ndarray]) -> None:
+        with self._lock:
+            if key in self._tiles or key in self._pending or len(self._pending) >= self.max_pending:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tile-prefetch")
+            self._pending[key] = self._executor.submit(self._fetch, key, read)
+            self.prefetches += 1
+
+    def _fetch(self, key: TileKey, read: Callable[[], np.ndarray]) -> np.ndarray:
+        # Background read; unless a ``get`` already claimed the future, the tile goes straight into the LRU
+        tile = self._read(read)
+        with self._lock:
+            if self._pending.pop(key, None) is not None:
+                self._put_locked(key, tile)
+        return tile
+
+    def _read(self, read: Callable[[], np.ndarray]) -> np.ndarray:
+        tile = read()
+        with self._lock:
+            self.tile_reads += 1
+        return tile
+
+    def _put(self, key: TileKey, tile: np.ndarray) -> None:
+        with self._lock:
+            self._put_locked(key, tile)
+
+    def _put_locked(self, key: TileKey, tile: np.ndarray) -> None:
+        if key not in self._tiles:
+            self.resident_bytes += tile.nbytes
+        self._tiles[key] = tile
+        self._tiles.move_to_end(key)
+        if self.max_resident_bytes is None:
+            return
+        # The newest tile always stays: it is about to be sampled
+        while self.resident_bytes > self.max_resident_bytes and len(self._tiles) > 1:
+            _, victim = self._tiles.popitem(last=False)
+            self.resident_bytes -= victim.nbytes
+            self.evictions += 1
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        with self._lock:
+            self._pending.clear()
+            self._tiles.clear()
+            self.resident_bytes = 0
+
+
+@dataclass
+class TiledRaster:
+    """Band 1 of a raster read on demand in ``tile_size`` x ``tile_size`` windows through a ``TileCache``.
+
+    Samples like ``RasterLayer`` (NaN/None for nodata and out-of-bounds) but only the tiles around the
+    sampled points are ever resident. ``read_tile(row0, col0, height, width)`` returns a 2-D window, or
+    ``(channels, height, width)`` for derived multi-channel layers (see ``terrain_tiles``).
+    """
+
+    key: Hashable
+    shape: Tuple[int, int]
+    transform: Affine
+    crs: CRS
+    read_tile: Callable[[int, int, int, int], np.ndarray]
+    cache: TileCache
+    tile_size: int = 512
+    nodata: Optional[float] = None
+    to_raster: Optional[Transformer] = None
+    on_close: Optional[Callable[[], None]] = field(default=None, repr=False)  # releases what read_tile opened
+
+    def __post_init__(self) -> None:
+        self._inv = ~self.transform
+        self._ntile_cols = -(-self.shape[1] // self.tile_size)
+
+    def close(self) -> None:
+        if self.on_close is not None:
+            self.on_close()
+
+    @classmethod
+    def open(cls, path: str, cache: TileCache, tile_size: int = 512, default_crs_epsg: int = 4326,
+             to_raster: Optional[Transformer] = None) -> "TiledRaster":
+        with rasterio.open(path) as ds:
+            crs = CRS.from_user_input(ds.crs) if ds.crs else CRS.from_epsg(default_crs_epsg)
+            shape, transform, nodata = (ds.height, ds.width), ds.transform, ds.nodata
+        local = threading.local()
+        handles: list = []
+        handles_lock = threading.Lock()
+
+        def read_tile(row0: int, col0: int, height: int, width: int) -> np.ndarray:
+            # rasterio handles are not thread-safe: one per thread (sampling thread and prefetch thread)
+            ds = getattr(local, "ds", None)
+            if ds is None or ds.closed:
+                ds = local.ds = rasterio.open(path)
+                with handles_lock:
+                    handles.append(ds)
+            return ds.read(1, window=Window(col0, row0, width, height))
+
+        def close_handles() -> None:
+            with handles_lock:
+                for ds in handles:
+                    ds.close()
+                handles.clear()
+
+        return cls(key=path, shape=shape, transform=transform, crs=crs, read_tile=read_tile, cache=cache,
+                   tile_size=tile_size, nodata=nodata, to_raster=to_raster or _to_raster_transformer(crs),
+                   on_close=close_handles)
+
+    def _reader(self, tr: int, tc: int) -> Callable[[], np.ndarray]:
+        ts = self.tile_size
+        row0, col0 = tr * ts, tc * ts
+        height, width = min(ts, self.shape[0] - row0), min(ts, self.shape[1] - col0)
+        return lambda: self.read_tile(row0, col0, height, width)
+
+    def tile(self, tr: int, tc: int) -> np.ndarray:
+        return self.cache.get((self.key, tr, tc), self._reader(tr, tc))
+
+    def sample_many(self, lats: np.ndarray, lons: np.ndarray, channel: Optional[int] = None) -> np.ndarray:
+        """Vectorized lookup, one gather per touched tile. Output has the shape of ``lats``."""
+        shape = np.shape(lats)
+        rows, cols, valid = grid_index_many(self._inv, self.shape, self.to_raster, lats, lons)
+        vals = np.full(rows.shape, np.nan)
+        idx = np.flatnonzero(valid)
+        if len(idx):
+            ts = self.tile_size
+            tiles = (rows[idx] // ts) * self._ntile_cols + cols[idx] // ts
+            order = np.argsort(tiles, kind="stable")
+            idx, tiles = idx[order], tiles[order]
+            starts = np.flatnonzero(np.r_[True, tiles[1:] != tiles[:-1]])
+            for s, e in zip(starts, np.r_[starts[1:], len(idx)]):
+                tr, tc = divmod(int(tiles[s]), self._ntile_cols)
+                data = self.tile(tr, tc)
+                if channel is not None:
+                    data = data[channel]
+                sel = idx[s:e]
+                vals[sel] = data[rows[sel] - tr * ts, cols[sel] - tc * ts]
+        if self.nodata is not None:
+            vals[vals == self.nodata] = np.nan
+        return vals.reshape(shape)
+
+    def sample(self, lat: float, lon: float, channel: Optional[int] = None) -> Optional[float]:
+        val = float(self.sample_many(np.array([lat]), np.array([lon]), channel)[0])
+        return None if np.isnan(val) else val
+
+    def prefetch(self, lats: np.ndarray, lons: np.ndarray) -> None:
+        """Queue background reads of the tiles containing these points (out-of-bounds points are ignored)."""
+        rows, cols, valid = grid_index_many(self._inv, self.shape, self.to_raster, lats, lons)
+        ts = self.tile_size
+        tiles = np.unique((rows[valid] // ts) * self._ntile_cols + cols[valid] // ts)
+        for t in tiles.tolist():
+            tr, tc = divmod(t, self._ntile_cols)
+            self.cache.prefetch((self.key, tr, tc), self._reader(tr, tc))
+
+
+@dataclass
+class TileChannel:
+    """One channel of a multi-channel ``TiledRaster``, with the ``sample``/``sample_many`` interface."""
+
+    raster: TiledRaster
+    channel: int
+
+    def sample_many(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        return self.raster.sample_many(lats, lons, self.channel)
+
+    def sample(self, lat: float, lon: float) -> Optional[float]:
+        return self.raster.sample(lat, lon, self.channel)
+
+
+def terrain_tiles(dem: TiledRaster) -> TiledRaster:
+    """Slope/aspect computed per DEM tile (channels 0 and 1) from a window with a one-cell halo.
+
+    The halo gives central differences on tile edges, so values match ``slope_aspect`` on the full grid.
+    """
+    nrows, ncols = dem.shape
+
+    def read_tile(row0: int, col0: int, height: int, width: int) -> np.ndarray:
+        r0, c0 = max(0, row0 - 1), max(0, col0 - 1)
+        r1, c1 = min(nrows, row0 + height + 1), min(ncols, col0 + width + 1)
+        window = RasterLayer(
+            path=str(dem.key), data=dem.read_tile(r0, c0, r1 - r0, c1 - c0),
+            transform=dem.transform * Affine.translation(c0, r0), crs=dem.crs, nodata=dem.nodata,
+            to_raster=dem.to_raster,
+        )
+        slope, aspect = slope_aspect(window)
+        crop = (slice(row0 - r0, row0 - r0 + height), slice(col0 - c0, col0 - c0 + width))
+        return np.stack([slope[crop], aspect[crop]])
+
+    return TiledRaster(key=f"{dem.key}#terrain", shape=dem.shape, transform=dem.transform, crs=dem.crs,
+                       read_tile=read_tile, cache=dem.cache, tile_size=dem.tile_size, to_raster=dem.to_raster,
+                       on_close=dem.close)
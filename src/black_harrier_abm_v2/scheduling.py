@@ -0,0 +1,69 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Optional
+import numpy as np
+
+from .config import SimulationConfig
+from .spatial import TurbineIndex
+
+
+@dataclass
+class AdaptiveStepping:
+    """Skips turbine work for agents that cannot reach any turbine this step; tracks are unchanged.
+
+    An agent's ``clearance`` is its distance to the nearest turbine at its last check, less the distance
+    flown since. While the clearance exceeds this step's distance plus ``reach_m`` (the wider of the
+    influence radius and the 1.5 rotor radii of the avoidance penalty, plus ``buffer_m``), no candidate
+    point of the heading search and no position the agent can move to is within reach of a turbine: the
+    avoidance term is exactly zero and the risk query finds nothing, so both are skipped. Otherwise the
+    agent is checked again with one nearest-turbine query.
+
+    Only that turbine work is skipped. Every agent still takes every step and runs the full heading
+    search, with its habitat, slope and wind sampling, so tracks and risk columns equal those of a run
+    without the scheduler. The gain is limited to the turbine queries; with a precomputed static utility
+    surface, whose lookup already includes the turbine term, only the risk query is saved.
+
+    ``clearance`` is indexed by the engine's agent position and is part of the engine snapshot.
+    """
+
+    index: TurbineIndex
+    influence_m: float = 200.0
+    buffer_m: float = 50.0
+    clearance: np.ndarray = field(default_factory=lambda: np.empty(0), repr=False)
+    checks: int = field(default=0, init=False)
+    skips: int = field(default=0, init=False)
+
+    @property
+    def reach_m(self) -> float:
+        avoid = float(self.index.rotor_radius_m.max()) * 1.5 if len(self.index) else 0.0
+        return max(self.influence_m, avoid) + self.buffer_m
+
+    @classmethod
+    def from_config(cls, index: TurbineIndex, sim_cfg: SimulationConfig) -> Optional["AdaptiveStepping"]:
+        """Scheduler for ``sim_cfg.adaptive_stepping``; None (every agent queries turbines every step) otherwise."""
+        if not sim_cfg.adaptive_stepping:
+            return None
+        return cls(index=index, influence_m=sim_cfg.turbine_influence_m, buffer_m=sim_cfg.adaptive_buffer_m)
+
+    def reset(self, n: int) -> None:
+        self.clearance = np.full(n, -np.inf)
+
+    def state(self) -> dict:
+        return {"clearance": self.clearance.copy()}
+
+    def set_state(self, state: dict) -> None:
+        self.clearance = state["clearance"]
+
+    def plan(self, rows: np.ndarray, lats: np.ndarray, lons: np.ndarray, step_m: np.ndarray) -> np.ndarray:
+        """Mask over ``rows`` of agents out of every turbine's reach while moving ``step_m`` from
+        ``lats, lons``; their clearance is then charged with the move."""
+        reach = self.reach_m
+        check = self.clearance[rows] - step_m <= reach
+        if check.any():
+            _, d = self.index.nearest_many(lats[check], lons[check])
+            self.clearance[rows[check]] = np.where(np.isnan(d), np.inf, d)
+            self.checks += int(check.sum())
+        far = self.clearance[rows] - step_m > reach
+        self.clearance[rows] -= step_m
+        self.skips += int(far.sum())
+        return far
@@ -0,0 +1,141 @@
+from __future__ import annotations
+from typing import Dict, Iterator, List, Tuple
+import multiprocessing as mp
+import queue
+import traceback
+import numpy as np
+
+from .build import build_env, build_simulation
+from .config import load_config
+from .sinks import TrackBatch, TrackSink, stream
+
+
+def shard_bounds(n_agents: int, shards: int) -> List[Tuple[int, int]]:
+    """Contiguous, near-equal ``[start, stop)`` ranges of agent positions; empty shards are dropped."""
+    edges = np.linspace(0, n_agents, max(1, shards) + 1).round().astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+# Per-worker state: config and environment (rasters, turbine index) are loaded once per process
+_WORKER: Dict = {}
+
+
+def _init_worker(config_path: str, engine: str, seed: int, replicate: int, chunk_steps: int) -> None:
+    sim_cfg, model_cfg = load_config(config_path)
+    _WORKER.update(
+        engine=engine,
+        sim_cfg=sim_cfg,
+        model_cfg=model_cfg,
+        env=build_env(model_cfg),
+        seed=seed,
+        replicate=replicate,
+        chunk_steps=chunk_steps,
+    )
+
+
+def _iter_shard(bounds: Tuple[int, int]) -> Iterator[TrackBatch]:
+    """Run agents ``start:stop`` for the whole time axis, one batch per output chunk."""
+    w = _WORKER
+    start, stop = bounds
+    sim = build_simulation(w["sim_cfg"], w["model_cfg"], w["env"], engine=w["engine"], seed=w["seed"],
+                           replicate=w["replicate"])
+    if w["engine"] == "agent":
+        sim.agents = sim.agents[start:stop]
+    else:
+        sim.population = sim.population.select(slice(start, stop))
+    return sim.iter_steps(w["chunk_steps"])
+
+
+def _shard_worker(initargs: Tuple, bounds: Tuple[int, int], out: mp.Queue) -> None:
+    """Worker process: put each chunk of one shard on ``out`` (blocking while it is full), then None.
+    A failure is sent as its formatted traceback."""
+    try:
+        _init_worker(*initargs)
+        for batch in _iter_shard(bounds):
+            out.put(batch)
+        out.put(None)
+    except BaseException:
+        out.put(traceback.format_exc())
+
+
+def _next_chunk(q: mp.Queue, proc: mp.Process):
+    while True:
+        try:
+            item = q.get(timeout=1.0)
+        except queue.Empty:
+            if not proc.is_alive() and q.empty():
+                raise RuntimeError(f"shard worker exited with code {proc.exitcode}")
+            continue
+        if isinstance(item, str):
+            raise RuntimeError(f"shard worker failed:\n{item}")
+        return item
+
+
+def merge_shard_chunks(chunks: List[TrackBatch], sizes: List[int]) -> TrackBatch:
+    """Interleave the same output chunk of every shard back into the serial engine's step-major order."""
+    out = {}
+    for key in chunks[0]:
+        cols = [np.asarray(c[key]).reshape(-1, n) for c, n in zip(chunks, sizes)]
+        out[key] = np.concatenate(cols, axis=1).ravel()
+    return out
+
+
+def iter_sharded(
+    config_path: str,
+    shards: int,
+    seed: int = 0,
+    replicate: int = 0,
+    chunk_steps: int = 60,
+    engine: str = "agent",
+    max_ahead: int = 2,
+) -> Iterator[TrackBatch]:
+    """Run of ``config_path`` split across ``shards`` worker processes.
+
+    Agents only read the shared environment and their own counter-based streams (keyed by seed,
+    replicate and agent id), so each shard runs its agents' full trajectories independently. Each shard
+    hands its chunks to the parent through a queue holding at most ``max_ahead`` of them; chunk c is
+    merged and yielded as soon as every shard has produced it, row for row the batch ``iter_steps`` of
+    the serial engine yields for the same seed. Nothing is written to disk, and memory is bounded by
+    ``shards * max_ahead`` chunks whatever the run length.
+    """
+    _, model_cfg = load_config(config_path)
+    bounds = shard_bounds(len(model_cfg.agents), shards)
+    sizes = [b - a for a, b in bounds]
+    initargs = (config_path, engine, seed, replicate, chunk_steps)
+    if len(bounds) <= 1:
+        _init_worker(*initargs)
+        for b in bounds:
+            yield from _iter_shard(b)
+        return
+    ctx = mp.get_context()
+    queues = [ctx.Queue(maxsize=max(1, max_ahead)) for _ in bounds]
+    procs = [ctx.Process(target=_shard_worker, args=(initargs, b, q), daemon=True) for b, q in zip(bounds, queues)]
+    for p in procs:
+        p.start()
+    try:
+        while True:
+            chunks = [_next_chunk(q, p) for q, p in zip(queues, procs)]
+            if chunks[0] is None:
+                break
+            yield merge_shard_chunks(chunks, sizes)
+        for p in procs:
+            p.join()
+    finally:
+        # Early exit or failure: stop shards still blocked on a full queue
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+                p.join()
+
+
+def run_sharded(
+    config_path: str,
+    sink: TrackSink,
+    shards: int,
+    seed: int = 0,
+    replicate: int = 0,
+    chunk_steps: int = 60,
+    engine: str = "agent",
+) -> int:
+    """Stream a sharded run (see ``iter_sharded``) into ``sink``; returns the rows written."""
+    return stream(iter_sharded(config_path, shards, seed, replicate, chunk_steps, engine), sink)
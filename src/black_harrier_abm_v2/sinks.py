@@ -0,0 +1,278 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+
+from .movement import STATES
+from .profiling import Profiler
+
+# Columnar batch of track rows; ``state`` holds int codes into movement.STATES and
+# ``nearest_turbine_id`` uses -1 for "none"
+TrackBatch = Dict[str, np.ndarray]
+
+TRACK_COLUMNS = (
+    "t",
+    "agent_id",
+    "lat",
+    "lon",
+    "alt_m",
+    "state",
+    "in_bsa",
+    "nearest_turbine_id",
+    "nearest_turbine_d_m",
+)
+
+
+def empty_batch() -> TrackBatch:
+    batch = {k: np.empty(0) for k in TRACK_COLUMNS}
+    batch["t"] = np.empty(0, dtype="datetime64[ns]")
+    for k in ("agent_id", "state", "nearest_turbine_id"):
+        batch[k] = np.empty(0, dtype=np.intp)
+    return batch
+
+
+def concat_batches(batches: List[TrackBatch]) -> TrackBatch:
+    if len(batches) == 1:
+        return batches[0]
+    return {k: np.concatenate([b[k] for b in batches]) for k in batches[0]}
+
+
+def chunk_batches(steps: Iterable[TrackBatch], chunk_steps: int) -> Iterator[TrackBatch]:
+    """Group per-step batches into batches of ``chunk_steps`` timesteps."""
+    pending: List[TrackBatch] = []
+    for batch in steps:
+        pending.append(batch)
+        if len(pending) >= max(1, chunk_steps):
+            yield concat_batches(pending)
+            pending = []
+    if pending:
+        yield concat_batches(pending)
+
+
+def batch_to_frame(batch: TrackBatch) -> pd.DataFrame:
+    """Track rows with compact dtypes: int32 ids, float32 coordinates, categorical state, nullable turbine id."""
+    ids = np.asarray(batch["nearest_turbine_id"])
+    turbine_id = pd.array(np.where(ids >= 0, ids, 0).astype(np.int32), dtype="Int32")
+    turbine_id[ids < 0] = pd.NA
+    return pd.DataFrame(
+        {
+            "t": pd.to_datetime(batch["t"]),
+            "agent_id": np.asarray(batch["agent_id"], dtype=np.int32),
+            "lat": np.asarray(batch["lat"], dtype=np.float32),
+            "lon": np.asarray(batch["lon"], dtype=np.float32),
+            "alt_m": np.asarray(batch["alt_m"], dtype=np.float32),
+            "state": pd.Categorical.from_codes(np.asarray(batch["state"], dtype=np.int8), categories=list(STATES)),
+            "in_bsa": np.asarray(batch["in_bsa"], dtype=bool),
+            "nearest_turbine_id": turbine_id,
+            "nearest_turbine_d_m": np.asarray(batch["nearest_turbine_d_m"], dtype=np.float32),
+        }
+    )
+
+
+class TrackSink:
+    """Consumes track batches; use as a context manager or call ``close``."""
+
+    rows_written: int = 0
+
+    def write(self, batch: TrackBatch) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+    def checkpoint(self) -> Any:
+        """Flush and return what ``resume_sink`` needs to continue this sink after a restart.
+
+        In-memory sinks (and reducers such as ``ExposureAccumulator``) are their own checkpoint.
+        """
+        return self
+
+    def __enter__(self) -> "TrackSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+@dataclass
+class MemorySink(TrackSink):
+    frames: List[pd.DataFrame] = field(default_factory=list)
+    rows_written: int = 0
+
+    def write(self, batch: TrackBatch) -> None:
+        df = batch_to_frame(batch)
+        self.frames.append(df)
+        self.rows_written += len(df)
+
+    def frame(self) -> pd.DataFrame:
+        if not self.frames:
+            return batch_to_frame(empty_batch())
+        return pd.concat(self.frames, ignore_index=True)
+
+
+@dataclass
+class CSVSink(TrackSink):
+    path: str
+    rows_written: int = 0
+    resume: Optional[dict] = None  # from ``checkpoint``: truncate to the checkpointed offset and append
+
+    def __post_init__(self) -> None:
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        if self.resume is None:
+            self._fh = open(self.path, "w", newline="")
+            return
+        self._fh = open(self.path, "r+", newline="")
+        self._fh.seek(self.resume["offset"])
+        self._fh.truncate()
+        self.rows_written = self.resume["rows_written"]
+
+    def write(self, batch: TrackBatch) -> None:
+        df = batch_to_frame(batch)
+        df.to_csv(self._fh, index=False, header=self.rows_written == 0)
+        self.rows_written += len(df)
+
+    def checkpoint(self) -> dict:
+        self._fh.flush()
+        return {"kind": "csv", "path": self.path, "offset": self._fh.tell(), "rows_written": self.rows_written}
+
+    def close(self) -> None:
+        if not self._fh.closed:
+            if self.rows_written == 0:
+                self._fh.write(",".join(TRACK_COLUMNS) + "\n")
+            self._fh.close()
+
+
+@dataclass
+class ParquetSink(TrackSink):
+    """Writes one Parquet row group per batch (requires ``pyarrow``).
+
+    A Parquet file is only readable once closed, so ``checkpoint`` closes the current file as a part
+    under ``<path>.parts/`` and continues in a new part; ``close`` merges the parts into ``path``
+    row group by row group.
+    """
+
+    path: str
+    compression: str = "zstd"
+    rows_written: int = 0
+    resume: Optional[dict] = None  # from ``checkpoint``: keep its parts, drop anything written after it
+
+    def __post_init__(self) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e:  # pragma: no cover - depends on the environment
+            raise ImportError("ParquetSink requires pyarrow (pip install pyarrow)") from e
+        self._pa, self._pq = pa, pq
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._writer = None
+        self._closed = False
+        self._parts_dir = Path(f"{self.path}.parts")
+        self._parts: List[str] = []
+        self._current = self.path
+        if self.resume is not None:
+            self._parts = list(self.resume["parts"])
+            self.rows_written = self.resume["rows_written"]
+            for stray in self._parts_dir.glob("*.parquet"):
+                if str(stray) not in self._parts:
+                    stray.unlink()
+            Path(self.path).unlink(missing_ok=True)
+            if self._parts:
+                self._current = self._next_part()
+
+    def _next_part(self) -> str:
+        self._parts_dir.mkdir(parents=True, exist_ok=True)
+        return str(self._parts_dir / f"part-{len(self._parts):05d}.parquet")
+
+    def write(self, batch: TrackBatch) -> None:
+        table = self._pa.Table.from_pandas(batch_to_frame(batch), preserve_index=False)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._current, table.schema, compression=self.compression)
+        self._writer.write_table(table)
+        self.rows_written += table.num_rows
+
+    def checkpoint(self) -> dict:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            part = self._next_part()
+            Path(self._current).replace(part)
+            self._parts.append(part)
+            self._current = self._next_part()
+        return {"kind": "parquet", "path": self.path, "compression": self.compression,
+                "parts": list(self._parts), "rows_written": self.rows_written}
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        wrote = self._writer is not None
+        if wrote:
+            self._writer.close()
+            self._writer = None
+            if self._parts:
+                self._parts.append(self._current)
+        if self._parts:
+            self._merge_parts()
+        elif not wrote:
+            empty = batch_to_frame(empty_batch())
+            self._pq.write_table(self._pa.Table.from_pandas(empty, preserve_index=False), self.path)
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is not None and self._parts:
+            # Failed mid-run after a checkpoint: leave the parts in place for a resume
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._closed = True
+            return
+        self.close()
+
+    def _merge_parts(self) -> None:
+        writer = None
+        for part in self._parts:
+            pf = self._pq.ParquetFile(part)
+            for i in range(pf.num_row_groups):
+                table = pf.read_row_group(i)
+                if writer is None:
+                    writer = self._pq.ParquetWriter(self.path, table.schema, compression=self.compression)
+                writer.write_table(table)
+        if writer is not None:
+            writer.close()
+        for part in self._parts_dir.glob("*.parquet"):
+            part.unlink()
+        self._parts_dir.rmdir()
+
+
+def resume_sink(checkpoint: Any) -> TrackSink:
+    """Reopen a sink from ``TrackSink.checkpoint`` output."""
+    if isinstance(checkpoint, TrackSink):
+        return checkpoint
+    if checkpoint["kind"] == "csv":
+        return CSVSink(checkpoint["path"], resume=checkpoint)
+    if checkpoint["kind"] == "parquet":
+        return ParquetSink(checkpoint["path"], compression=checkpoint["compression"], resume=checkpoint)
+    raise ValueError(f"unknown sink checkpoint kind {checkpoint['kind']!r}")
+
+
+def open_sink(path: Optional[str]) -> TrackSink:
+    """Pick a sink from the output path: ``.parquet``/``.pq`` -> Parquet, anything else CSV, None -> memory."""
+    if path is None:
+        return MemorySink()
+    if Path(path).suffix.lower() in (".parquet", ".pq"):
+        return ParquetSink(path)
+    return CSVSink(path)
+
+
+def stream(batches: Iterable[TrackBatch], sink: TrackSink, profiler: Optional[Profiler] = None) -> int:
+    """Write every batch to ``sink``; returns the number of rows written."""
+    if profiler is None or not profiler.enabled:
+        for batch in batches:
+            sink.write(batch)
+        return sink.rows_written
+    for batch in batches:
+        t0 = profiler.clock()
+        sink.write(batch)
+        profiler.add("output", profiler.clock() - t0, items=len(batch["agent_id"]))
+    return sink.rows_written
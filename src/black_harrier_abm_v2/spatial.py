@@ -0,0 +1,111 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from itertools import chain
+from typing import Optional, Sequence, Tuple
+import math
+import numpy as np
+from scipy.spatial import cKDTree
+
+from .utils.geo import haversine_m_many
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def _unit_xyz(lats, lons) -> np.ndarray:
+    phi, lam = np.radians(lats), np.radians(lons)
+    cos_phi = np.cos(phi)
+    return np.column_stack([cos_phi * np.cos(lam), cos_phi * np.sin(lam), np.sin(phi)])
+
+
+def _chord(radius_m: float) -> float:
+    # Straight-line distance on the unit sphere for a great-circle distance; slightly padded so the
+    # haversine filter applied afterwards decides the boundary, exactly like the brute-force scan
+    if not math.isfinite(radius_m):
+        return np.inf
+    return 2.0 * math.sin(min(math.pi, radius_m / EARTH_RADIUS_M) / 2.0) * (1.0 + 1e-9) + 1e-12
+
+
+@dataclass
+class TurbineIndex:
+    """KD-tree over turbine positions on the unit sphere.
+
+    Chord length is monotone in great-circle distance, so radius and nearest-neighbour queries are
+    exact; returned distances are haversine metres, as in ``utils.geo``.
+    """
+
+    lats: np.ndarray
+    lons: np.ndarray
+    rotor_radius_m: np.ndarray
+    rotor_min_m: np.ndarray
+    rotor_max_m: np.ndarray
+    _tree: Optional[cKDTree] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        if len(self.lats):
+            self._tree = cKDTree(_unit_xyz(self.lats, self.lons))
+
+    @classmethod
+    def from_turbines(cls, turbines: Sequence) -> "TurbineIndex":
+        return cls(
+            lats=np.array([tb.lat for tb in turbines], dtype=float),
+            lons=np.array([tb.lon for tb in turbines], dtype=float),
+            rotor_radius_m=np.array([tb.rotor_radius_m for tb in turbines], dtype=float),
+            rotor_min_m=np.array([tb.rotor_min_m for tb in turbines], dtype=float),
+            rotor_max_m=np.array([tb.rotor_max_m for tb in turbines], dtype=float),
+        )
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def within(self, lat: float, lon: float, radius_m: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Turbine ids and distances (m) with distance <= radius_m, ordered by id."""
+        _, ids, d = self.within_many(np.array([lat]), np.array([lon]), radius_m)
+        order = np.argsort(ids)
+        return ids[order], d[order]
+
+    def within_many(
+        self, lats: np.ndarray, lons: np.ndarray, radius_m: float
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """All (point, turbine, distance) pairs with distance <= radius_m, as three flat arrays."""
+        lats = np.asarray(lats, dtype=float).ravel()
+        lons = np.asarray(lons, dtype=float).ravel()
+        if self._tree is None or not len(lats):
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty.copy(), np.empty(0)
+        xyz = _unit_xyz(lats, lons)
+        chord = _chord(radius_m)
+        # Cheap nearest-neighbour pass first: most points have no turbine in range at all
+        _, nn = self._tree.query(xyz, k=1, distance_upper_bound=chord)
+        cand = np.flatnonzero(nn < len(self))
+        hits = self._tree.query_ball_point(xyz[cand], chord, return_sorted=False) if len(cand) else []
+        counts = np.fromiter(map(len, hits), dtype=np.intp, count=len(hits))
+        tids = np.fromiter(chain.from_iterable(hits), dtype=np.intp, count=int(counts.sum()))
+        pts = np.repeat(cand, counts)
+        d = haversine_m_many(lats[pts], lons[pts], self.lats[tids], self.lons[tids])
+        keep = d <= radius_m
+        return pts[keep], tids[keep], d[keep]
+
+    def nearest(self, lat: float, lon: float, max_distance_m: float = math.inf) -> Tuple[Optional[int], Optional[float]]:
+        ids, d = self.nearest_many(np.array([lat]), np.array([lon]), max_distance_m)
+        if ids[0] < 0:
+            return None, None
+        return int(ids[0]), float(d[0])
+
+    def nearest_many(
+        self, lats: np.ndarray, lons: np.ndarray, max_distance_m: float = math.inf
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Nearest turbine id (-1 if none within max_distance_m) and its distance (NaN if none)."""
+        lats = np.asarray(lats, dtype=float).ravel()
+        lons = np.asarray(lons, dtype=float).ravel()
+        ids = np.full(len(lats), -1, dtype=np.intp)
+        d = np.full(len(lats), np.nan)
+        if self._tree is None or not len(lats):
+            return ids, d
+        _, idx = self._tree.query(_unit_xyz(lats, lons), k=1, distance_upper_bound=_chord(max_distance_m))
+        found = idx < len(self)
+        dist = haversine_m_many(lats[found], lons[found], self.lats[idx[found]], self.lons[idx[found]])
+        ok = dist <= max_distance_m
+        sel = np.flatnonzero(found)[ok]
+        ids[sel] = idx[found][ok]
+        d[sel] = dist[ok]
+        return ids, d
@@ -0,0 +1,91 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Tuple
+import numpy as np
+
+# Draws per agent and step, in the row order of ``RandomStreams.draws``: uniform, normal, uniform, normal
+PURPOSES = ("transition", "speed", "heading", "altitude")
+
+_CHUNK = 1 << 14  # agents per Philox pass: keeps the round temporaries in cache
+_M64 = (1 << 64) - 1
+_M32, _S32 = np.uint64(0xFFFFFFFF), np.uint64(32)
+_PHILOX_M = (0xD2E7470EE14C6C93, 0xCA5A826395121157)
+_PHILOX_W = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xBB67AE8584CAA73B))
+
+
+def _mulhilo(m: int, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """High and low 64-bit words of ``m * b``, from 32-bit partial products."""
+    ml, mh = np.uint64(m & 0xFFFFFFFF), np.uint64(m >> 32)
+    bl, bh = b & _M32, b >> _S32
+    p0, p1, p2, p3 = ml * bl, ml * bh, mh * bl, mh * bh
+    mid = (p0 >> _S32) + (p1 & _M32) + (p2 & _M32)
+    return p3 + (p1 >> _S32) + (p2 >> _S32) + (mid >> _S32), (mid << _S32) | (p0 & _M32)
+
+
+def philox4x64(counter: np.ndarray, key: Tuple[int, int]) -> np.ndarray:
+    """Philox4x64-10 blocks for the ``(4, n)`` uint64 ``counter`` columns under a two-word ``key``.
+
+    Column j is the block ``np.random.Philox(key=key, counter=counter[:, j] - 1)`` yields first, computed
+    for every column at once.
+    """
+    c0, c1, c2, c3 = (np.asarray(c, dtype=np.uint64) for c in counter)
+    k0 = np.array([key[0] & _M64], dtype=np.uint64)
+    k1 = np.array([key[1] & _M64], dtype=np.uint64)
+    for r in range(10):
+        if r:
+            k0, k1 = k0 + _PHILOX_W[0], k1 + _PHILOX_W[1]
+        hi0, lo0 = _mulhilo(_PHILOX_M[0], c0)
+        hi1, lo1 = _mulhilo(_PHILOX_M[1], c2)
+        c0, c1, c2, c3 = hi1 ^ c1 ^ k0, lo1, hi0 ^ c3 ^ k1, lo0
+    return np.stack([c0, c1, c2, c3])
+
+
+def to_uniform(bits: np.ndarray) -> np.ndarray:
+    """Doubles in [0, 1) from the top 53 bits, as ``Generator.random`` does."""
+    return (bits >> np.uint64(11)) * (1.0 / 9007199254740992.0)
+
+
+def box_muller(bits_a: np.ndarray, bits_b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Two independent standard normals from two words each."""
+    r = np.sqrt(-2.0 * np.log1p(-to_uniform(bits_a)))
+    theta = 2.0 * np.pi * to_uniform(bits_b)
+    return r * np.cos(theta), r * np.sin(theta)
+
+
+@dataclass(frozen=True)
+class RandomStreams:
+    """Counter-based random numbers for the engines.
+
+    Agent ``a``'s draws at step ``k`` come from one Philox block keyed by ``(seed, replicate)`` at counter
+    ``(k, a, 0, 0)``: a pure function of those four numbers. Tracks therefore do not depend on agent
+    order, shard or process boundaries, chunk sizes or which engine runs them, and resuming only needs the
+    step index.
+    """
+
+    seed: int
+    replicate: int = 0
+
+    @classmethod
+    def fresh(cls, replicate: int = 0) -> "RandomStreams":
+        """Streams under a seed from OS entropy, for runs given none."""
+        return cls(seed=int(np.random.SeedSequence().generate_state(1, np.uint64)[0]), replicate=replicate)
+
+    def blocks(self, step: int, agent_ids: np.ndarray) -> np.ndarray:
+        """Raw ``(4, n)`` Philox blocks of ``agent_ids`` at ``step``."""
+        ids = np.asarray(agent_ids, dtype=np.int64).astype(np.uint64)
+        counter = np.zeros((4, len(ids)), dtype=np.uint64)
+        counter[0] = np.uint64(step)
+        counter[1] = ids
+        return philox4x64(counter, (self.seed, self.replicate))
+
+    def draws(self, step: int, agent_ids: np.ndarray) -> np.ndarray:
+        """``(len(PURPOSES), n)`` draws of ``agent_ids`` at ``step``: the transition uniform, speed normal,
+        heading uniform and altitude normal. The uniforms use words 0 and 1 of each block, the normals one
+        Box-Muller pair from words 2 and 3."""
+        agent_ids = np.asarray(agent_ids)
+        out = np.empty((len(PURPOSES), len(agent_ids)))
+        for i in range(0, len(agent_ids), _CHUNK):
+            bits = self.blocks(step, agent_ids[i:i + _CHUNK])
+            out[0, i:i + _CHUNK], out[2, i:i + _CHUNK] = to_uniform(bits[0]), to_uniform(bits[1])
+            out[1, i:i + _CHUNK], out[3, i:i + _CHUNK] = box_muller(bits[2], bits[3])
+        return out
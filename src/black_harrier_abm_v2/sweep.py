@@ -0,0 +1,197 @@
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from itertools import product
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+import yaml
+
+from .config import ModelConfig, SimulationConfig, load_config
+from .exposure import ExposureAccumulator
+from .build import build_env, build_samplers, build_simulation
+from .environment import Environment
+
+SECTIONS = ("simulation", "weights", "altitude_priors")
+COMPARE_GROUPS = ("total", "state")
+SWEEP_GROUPS = ("total", "turbine", "state")
+
+
+@dataclass
+class Scenario:
+    """Named set of overrides on a base config.
+
+    Keys are ``<section>.<field>`` for ``simulation``, ``weights`` and ``altitude_priors``, or ``turbines``
+    (a full layout: list of turbine dicts).
+    """
+
+    name: str
+    overrides: Dict[str, Any] = field(default_factory=dict)
+
+    def apply(self, sim_cfg: SimulationConfig, model_cfg: ModelConfig) -> Tuple[SimulationConfig, ModelConfig]:
+        per_section: Dict[str, Dict[str, Any]] = {s: {} for s in SECTIONS}
+        turbines = model_cfg.turbines
+        for key, value in self.overrides.items():
+            if key == "turbines":
+                turbines = list(value)
+                continue
+            section, _, name = key.partition(".")
+            if section not in SECTIONS or not name:
+                raise ValueError(f"scenario {self.name!r}: cannot override {key!r}")
+            per_section[section][name] = value
+        sim_cfg = replace(sim_cfg, **per_section["simulation"])
+        model_cfg = replace(
+            model_cfg,
+            weights=replace(model_cfg.weights, **per_section["weights"]),
+            altitude_priors=replace(model_cfg.altitude_priors, **per_section["altitude_priors"]),
+            turbines=turbines,
+        )
+        return sim_cfg, model_cfg
+
+
+def _label(value: Any) -> str:
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def expand_grid(grid: Dict[str, Any]) -> List[Scenario]:
+    """Cartesian product of ``{key: [values]}``; ``turbines`` takes ``{layout name: [turbine dicts]}``."""
+    axes = []
+    for key, values in grid.items():
+        if key == "turbines":
+            axes.append([(key, name, layout) for name, layout in values.items()])
+        else:
+            axes.append([(key, f"{key.rpartition('.')[2]}={_label(v)}", v) for v in values])
+    scenarios = []
+    for combo in product(*axes):
+        scenarios.append(Scenario(name=",".join(label for _, label, _ in combo),
+                                  overrides={key: value for key, _, value in combo}))
+    return scenarios
+
+
+@dataclass
+class SweepSpec:
+    scenarios: List[Scenario]
+    replicates: int = 10
+    seed: int = 0
+    reference: Optional[str] = None  # scenario that paired differences are taken against; default the first
+
+    @classmethod
+    def from_file(cls, path: str) -> "SweepSpec":
+        """YAML with ``scenarios`` (list of ``{name, <overrides>}``) and/or ``grid`` (see ``expand_grid``);
+        ``replicates``, ``seed`` and ``reference`` are optional. A scenario with no overrides is the base config."""
+        with open(path, "r") as f:
+            doc = yaml.safe_load(f) or {}
+        scenarios = [Scenario(name=str(s["name"]), overrides={k: v for k, v in s.items() if k != "name"})
+                     for s in doc.get("scenarios", [])]
+        scenarios += expand_grid(doc.get("grid", {})) if doc.get("grid") else []
+        if not scenarios:
+            scenarios = [Scenario(name="base")]
+        names = [s.name for s in scenarios]
+        if len(set(names)) != len(names):
+            raise ValueError(f"{path}: scenario names must be unique")
+        return cls(scenarios=scenarios, replicates=int(doc.get("replicates", 10)), seed=int(doc.get("seed", 0)),
+                   reference=doc.get("reference"))
+
+
+# Per-worker state: base config and rasters loaded once per process, environments cached per layout
+_WORKER: Dict = {}
+
+
+def _init_worker(config_path: str, scenarios: List[Scenario], engine: str, seed: int, common_random_numbers: bool,
+                 chunk_steps: int) -> None:
+    sim_cfg, model_cfg = load_config(config_path)
+    _WORKER.clear()
+    _WORKER.update(
+        sim_cfg=sim_cfg,
+        model_cfg=model_cfg,
+        samplers=build_samplers(model_cfg),
+        scenarios=scenarios,
+        engine=engine,
+        seed=seed,
+        crn=common_random_numbers,
+        chunk_steps=chunk_steps,
+        envs={},
+    )
+
+
+def _env(model_cfg: ModelConfig) -> Environment:
+    key = repr(model_cfg.turbines)
+    envs = _WORKER["envs"]
+    if key not in envs:
+        envs[key] = build_env(model_cfg, _WORKER["samplers"])
+    return envs[key]
+
+
+def _run_task(task: Tuple[int, int]) -> pd.DataFrame:
+    s, replicate = task
+    w = _WORKER
+    scenario = w["scenarios"][s]
+    sim_cfg, model_cfg = scenario.apply(w["sim_cfg"], w["model_cfg"])
+    env = _env(model_cfg)
+    # Common random numbers: every scenario sees the same per-(replicate, agent) streams
+    seed = w["seed"] if w["crn"] else int(np.random.SeedSequence([w["seed"], s]).generate_state(1)[0])
+    sim = build_simulation(sim_cfg, model_cfg, env, engine=w["engine"], seed=seed, replicate=replicate)
+    summary = ExposureAccumulator.for_simulation(env, sim_cfg)
+    sim.run_to(summary, chunk_steps=w["chunk_steps"])
+    table = summary.table(SWEEP_GROUPS)
+    table.insert(0, "replicate", replicate)
+    table.insert(0, "scenario", scenario.name)
+    return table
+
+
+def run_sweep(
+    config_path: str,
+    spec: SweepSpec,
+    workers: int = 1,
+    engine: str = "agent",
+    common_random_numbers: bool = True,
+    chunk_steps: int = 60,
+) -> pd.DataFrame:
+    """Run every scenario x replicate; one exposure row per (scenario, replicate, group, key).
+
+    Rasters are loaded once per worker process and environments are shared between scenarios with the
+    same turbine layout.
+    """
+    tasks = [(s, r) for r in range(spec.replicates) for s in range(len(spec.scenarios))]
+    initargs = (config_path, spec.scenarios, engine, spec.seed, common_random_numbers, chunk_steps)
+    if workers <= 1:
+        _init_worker(*initargs)
+        results = [_run_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as ex:
+            results = list(ex.map(_run_task, tasks))
+    out = pd.concat(results, ignore_index=True)
+    out["scenario"] = pd.Categorical(out["scenario"], categories=[s.name for s in spec.scenarios])
+    return out.sort_values(["scenario", "replicate"], kind="stable").reset_index(drop=True)
+
+
+def compare_scenarios(
+    per_run: pd.DataFrame,
+    reference: Optional[str] = None,
+    value: str = "bsa_seconds",
+    groups: Sequence[str] = COMPARE_GROUPS,
+) -> pd.DataFrame:
+    """Per scenario and (group, key): mean and sd of ``value`` and the paired difference to ``reference``
+    (mean, sd, standard error and normal 95% interval over replicates)."""
+    df = per_run[per_run["group"].isin(groups)]
+    wide = df.pivot_table(index=["group", "key", "replicate"], columns="scenario", values=value, observed=True)
+    names = [str(c) for c in wide.columns]
+    reference = reference or names[0]
+    if reference not in wide.columns:
+        raise ValueError(f"unknown reference scenario {reference!r}")
+    frames = []
+    for name in names:
+        x = wide[name]
+        diff = (x - wide[reference]).groupby(level=["group", "key"], observed=True)
+        stats = x.groupby(level=["group", "key"], observed=True).agg(["mean", "std", "count"])
+        stats.columns = ["mean", "std", "n_replicates"]
+        stats["diff_mean"] = diff.mean()
+        stats["diff_std"] = diff.std()
+        stats["diff_se"] = stats["diff_std"] / np.sqrt(stats["n_replicates"])
+        stats["diff_ci_low"] = stats["diff_mean"] - 1.96 * stats["diff_se"]
+        stats["diff_ci_high"] = stats["diff_mean"] + 1.96 * stats["diff_se"]
+        stats = stats.reset_index()
+        stats.insert(0, "scenario", name)
+        stats.insert(1, "reference", reference)
+        frames.append(stats)
+    return pd.concat(frames, ignore_index=True)
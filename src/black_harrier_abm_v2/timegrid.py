@@ -0,0 +1,71 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+from .agents import month_to_season
+from .config import SimulationConfig
+from .transitions import SEASONS
+
+# Season code for each calendar month (index 1..12), following agents.month_to_season
+MONTH_SEASON = np.array([0] + [SEASONS.index(month_to_season(pd.Timestamp(2001, m, 1))) for m in range(1, 13)], dtype=np.int8)
+
+
+def solar_hour(times: np.ndarray, lon=None) -> np.ndarray:
+    """Hour of day in [0, 24) for UTC ``times``: local solar time at ``lon`` (scalar or per time), else UTC."""
+    t = np.asarray(times, dtype="datetime64[ns]")
+    hours = (t - t.astype("datetime64[D]")).astype(np.int64) / 3.6e12
+    if lon is None:
+        return hours
+    return (hours + np.asarray(lon, dtype=float) / 15.0) % 24.0
+
+
+def solar_elevation_deg(times: np.ndarray, lat: float, lon: float) -> np.ndarray:
+    """Approximate solar elevation (degrees) at ``lat``/``lon`` for UTC ``times``; ignores the equation of time."""
+    t = np.asarray(times, dtype="datetime64[ns]")
+    doy = (t.astype("datetime64[D]") - t.astype("datetime64[Y]")).astype(int) + 1
+    hours = (t - t.astype("datetime64[D]")).astype(np.int64) / 3.6e12
+    decl = np.radians(23.44) * np.sin(2.0 * np.pi * (284 + doy) / 365.0)
+    hour_angle = np.radians(15.0 * (hours + lon / 15.0 - 12.0))
+    phi = np.radians(lat)
+    sin_elev = np.sin(phi) * np.sin(decl) + np.cos(phi) * np.cos(decl) * np.cos(hour_angle)
+    return np.degrees(np.arcsin(np.clip(sin_elev, -1.0, 1.0)))
+
+
+@dataclass
+class TimeGrid:
+    """Integer time axis for a run: step i is ``start + i * step_seconds`` up to and including ``end``.
+
+    Per-step covariates are computed once as arrays: season codes (into ``transitions.SEASONS``),
+    local solar hour and a day flag. Without a reference ``lat``/``lon`` the hour is UTC and day is 06:00-18:00.
+    """
+
+    start: pd.Timestamp
+    end: pd.Timestamp
+    step_seconds: int = 60
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        start = np.datetime64(pd.Timestamp(self.start), "ns")
+        end = np.datetime64(pd.Timestamp(self.end), "ns")
+        step = np.timedelta64(int(self.step_seconds * 1e9), "ns")
+        self.times = np.arange(start, end + np.timedelta64(1, "ns"), step) if end >= start else np.empty(0, "datetime64[ns]")
+        months = self.times.astype("datetime64[M]").astype(np.int64) % 12 + 1
+        self.season = MONTH_SEASON[months]
+        self.hour = solar_hour(self.times, self.lon).astype(np.float32)
+        if self.lat is not None and self.lon is not None:
+            self.is_day = solar_elevation_deg(self.times, self.lat, self.lon) > 0.0
+        else:
+            self.is_day = (self.hour >= 6.0) & (self.hour < 18.0)
+
+    @classmethod
+    def from_config(cls, sim_cfg: SimulationConfig, lat: Optional[float] = None, lon: Optional[float] = None) -> "TimeGrid":
+        return cls(start=sim_cfg.start_time, end=sim_cfg.end_time, step_seconds=sim_cfg.step_seconds, lat=lat, lon=lon)
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def timestamp(self, i: int) -> pd.Timestamp:
+        return pd.Timestamp(self.times[i])
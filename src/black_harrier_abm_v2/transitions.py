@@ -0,0 +1,88 @@
+from __future__ import annotations
+from bisect import bisect_right
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple
+import json
+import numpy as np
+import yaml
+
+from .movement import STATES, STATE_CODES, State
+
+SEASONS = ("breeding", "nonbreeding", "migration_out", "migration_return")
+FALLBACK_ROW = {State.FORAGING: 0.5, State.COMMUTING: 0.3, State.ROOSTING: 0.2}
+ROW_TOLERANCE = 1e-6
+
+TransitionTable = Mapping[str, Mapping[str, Mapping[str, float]]]  # season -> from state -> to state -> p
+
+
+@dataclass
+class CompiledTransitions:
+    """Dense per-season Markov matrices over ``movement.STATES`` codes with cumulative rows.
+
+    ``probs[s, i, j]`` is P(state j | state i) in season s; every row must sum to 1.
+    Draws bisect the cumulative row with one uniform per agent.
+    """
+
+    probs: np.ndarray  # (n_seasons, n_states, n_states)
+    seasons: Tuple[str, ...] = SEASONS
+
+    def __post_init__(self) -> None:
+        self.probs = np.asarray(self.probs, dtype=float)
+        K = len(STATES)
+        if self.probs.shape != (len(self.seasons), K, K):
+            raise ValueError(f"transition matrices must have shape {(len(self.seasons), K, K)}, got {self.probs.shape}")
+        if np.any(self.probs < 0):
+            raise ValueError("transition probabilities must be non-negative")
+        sums = self.probs.sum(axis=2)
+        bad = np.argwhere(np.abs(sums - 1.0) > ROW_TOLERANCE)
+        if len(bad):
+            s, k = bad[0]
+            raise ValueError(f"transition row {self.seasons[s]}/{STATES[k]} sums to {sums[s, k]:.6f}, expected 1")
+        self.cdf = np.cumsum(self.probs, axis=2)
+        self.cdf[..., -1] = 1.0  # guard against round-off at the top of each row
+        self.season_codes: Dict[str, int] = {s: i for i, s in enumerate(self.seasons)}
+        self._cdf_rows = self.cdf.tolist()
+
+    @classmethod
+    def from_dict(cls, table: TransitionTable, fallback: Optional[Mapping[str, float]] = None) -> "CompiledTransitions":
+        """Compile nested ``{season: {from: {to: p}}}`` dicts; rows missing from ``table`` use ``fallback``."""
+        fallback = FALLBACK_ROW if fallback is None else fallback
+        for season in table:
+            if season not in SEASONS:
+                raise ValueError(f"unknown season {season!r}; expected one of {SEASONS}")
+        probs = np.zeros((len(SEASONS), len(STATES), len(STATES)))
+        for si, season in enumerate(SEASONS):
+            rows = table.get(season) or {}
+            for st in rows:
+                if st not in STATE_CODES:
+                    raise ValueError(f"unknown state {st!r} in season {season!r}")
+            for k, st in enumerate(STATES):
+                row = rows.get(st) or fallback
+                for to, p in row.items():
+                    if to not in STATE_CODES:
+                        raise ValueError(f"unknown state {to!r} in row {season}/{st}")
+                    probs[si, k, STATE_CODES[to]] = float(p)
+        return cls(probs=probs)
+
+    @classmethod
+    def from_file(cls, path: str) -> "CompiledTransitions":
+        """Load a telemetry-derived table from YAML or JSON in the ``TRANSITIONS`` layout.
+
+        An optional top-level ``fallback`` row replaces ``FALLBACK_ROW`` for rows the file leaves out.
+        """
+        with open(path, "r") as f:
+            table = json.load(f) if Path(path).suffix.lower() == ".json" else yaml.safe_load(f)
+        table = dict(table or {})
+        fallback = table.pop("fallback", None)
+        return cls.from_dict(table, fallback=fallback)
+
+    def draw(self, season: int, state: int, u: float) -> int:
+        """Next state code for one agent from a uniform ``u`` in [0, 1)."""
+        return bisect_right(self._cdf_rows[season][state], u)
+
+    def draw_many(self, season: int, states: np.ndarray, uniforms: np.ndarray) -> np.ndarray:
+        """Next state codes (int8) for agents in ``states`` with one uniform each."""
+        cdf = self.cdf[season, states]
+        nxt = (cdf <= np.asarray(uniforms)[:, None]).sum(axis=1)
+        return np.minimum(nxt, len(STATES) - 1).astype(np.int8)
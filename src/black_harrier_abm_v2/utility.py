@@ -0,0 +1,170 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+import hashlib
+import os
+import numpy as np
+from affine import Affine
+from pyproj import CRS, Transformer
+
+from .movement import Weights, static_utility_many
+from .samplers.raster import WGS84, RasterLayer, RasterSamplers
+from .samplers.tiled import TileCache, TiledRaster
+from .spatial import TurbineIndex
+from .utils.geo import haversine_m_many
+
+UTILITY_CACHE_VERSION = 1
+STATIC_WEIGHTS = ("w_habitat", "w_slope_penalty", "w_turbine_avoid")
+
+
+@dataclass
+class UtilitySurface:
+    """Static utility (habitat if time-invariant, slope and turbine penalties) on a grid; NaN off the grid."""
+
+    layer: Union[RasterLayer, TiledRaster]
+    includes_habitat: bool
+
+    def sample_many(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        return self.layer.sample_many(lats, lons)
+
+
+def _file_key(path: str) -> str:
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}"
+
+
+def _turbine_key(index: TurbineIndex) -> str:
+    h = hashlib.sha1()
+    for arr in (index.lats, index.lons, index.rotor_radius_m):
+        h.update(np.ascontiguousarray(arr, dtype=float).tobytes())
+    return h.hexdigest()
+
+
+@dataclass
+class StaticUtility:
+    """Builds the static part of the step-selection utility on one grid, once per (weights, layout).
+
+    Values are evaluated at cell centres of the habitat grid (or the DEM grid when habitat is time-indexed
+    or missing), so each candidate heading needs one lookup. The turbine penalty is zero on every cell
+    clear of all turbines' avoidance reach; cells touching a reach disc are NaN, so candidates there
+    fall back to exact per-point terms (as do candidates off the grid).
+
+    Surfaces are memoized by the static weights and turbine layout, so changing either builds a new one.
+    With ``cache_dir`` whole-grid surfaces are also stored on disk, keyed by input files, grid, weights
+    and layout. With ``tiles`` the surface is derived tile by tile on demand instead.
+    """
+
+    shape: Tuple[int, int]
+    transform: Affine
+    crs: CRS
+    includes_habitat: bool
+    inputs_key: str = ""
+    cache_dir: Optional[str] = None
+    tiles: Optional[TileCache] = None
+    tile_size: int = 512
+    block_cells: int = 1 << 20  # cells evaluated per batch when building a whole grid
+    builds: int = field(default=0, init=False)
+    _surfaces: Dict[tuple, UtilitySurface] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self._last: Optional[tuple] = None  # (turbine index, weights, surface) of the previous call
+        self._to_wgs84: Optional[Transformer] = (
+            None if self.crs == WGS84 else Transformer.from_crs(self.crs, WGS84, always_xy=True)
+        )
+        self._to_raster: Optional[Transformer] = (
+            None if self.crs == WGS84 else Transformer.from_crs(WGS84, self.crs, always_xy=True)
+        )
+
+    @classmethod
+    def from_samplers(cls, samplers: RasterSamplers, cache_dir: Optional[str] = None) -> Optional["StaticUtility"]:
+        """Surface builder on the grid of ``samplers``' habitat (or DEM) raster; None without either."""
+        samplers.open()
+        includes_habitat = bool(samplers.habitat_raster) and "habitat" not in samplers.cubes
+        path = samplers.habitat_raster if includes_habitat else samplers.dem_raster
+        if not path:
+            return None
+        grid = samplers.static_layer(path)
+        inputs = [p for p in (samplers.habitat_raster if includes_habitat else None, samplers.dem_raster) if p]
+        inputs_key = "|".join([_file_key(p) for p in inputs] + [f"slope_full={samplers.slope_full_penalty_deg}"])
+        return cls(shape=grid.shape, transform=grid.transform, crs=grid.crs, includes_habitat=includes_habitat,
+                   inputs_key=inputs_key, cache_dir=cache_dir, tiles=samplers.tiles,
+                   tile_size=samplers.tile_size or 512)
+
+    def surface(self, env, weights: Weights) -> Optional[UtilitySurface]:
+        """Surface for ``weights`` and ``env``'s turbines; None when the weights vary per agent."""
+        values = tuple(getattr(weights, w) for w in STATIC_WEIGHTS)
+        if any(np.ndim(v) for v in values):
+            return None
+        index = env.turbine_index
+        last = self._last
+        if last is not None and last[0] is index and last[1] == values:
+            return last[2]
+        key = tuple(float(v) for v in values) + (_turbine_key(index),)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = self._surfaces[key] = self._build(env, weights, key)
+        self._last = (index, values, surface)
+        return surface
+
+    def _cell_centres(self, row0: int, col0: int, height: int, width: int) -> Tuple[np.ndarray, np.ndarray]:
+        rows, cols = np.mgrid[row0:row0 + height, col0:col0 + width]
+        xs, ys = self.transform * (cols + 0.5, rows + 0.5)
+        if self._to_wgs84 is not None:
+            xs, ys = self._to_wgs84.transform(xs, ys)
+        return np.asarray(ys, dtype=float), np.asarray(xs, dtype=float)
+
+    def _window(self, env, weights: Weights, row0: int, col0: int, height: int, width: int) -> np.ndarray:
+        lats, lons = self._cell_centres(row0, col0, height, width)
+        out = static_utility_many(weights, lats, lons, env, None, self.includes_habitat).astype(np.float32)
+        index = env.turbine_index
+        if len(index):
+            # Cells that touch any turbine's avoidance reach stay NaN: candidates there get the exact penalty
+            reach = float(index.rotor_radius_m.max()) * 1.5 + self._half_diagonal_m(row0, height)
+            pts, _, _ = index.within_many(lats.ravel(), lons.ravel(), reach)
+            out.ravel()[pts] = np.nan
+        return out
+
+    def _half_diagonal_m(self, row0: int, height: int) -> float:
+        corners = []
+        for r in (row0, row0 + height - 1):
+            lat0, lon0 = self._cell_centres(r, 0, 1, 1)
+            xs, ys = self.transform * (np.array([1.0]), np.array([r + 1.0]))
+            if self._to_wgs84 is not None:
+                xs, ys = self._to_wgs84.transform(xs, ys)
+            corners.append(haversine_m_many(lat0.ravel(), lon0.ravel(), np.asarray(ys), np.asarray(xs))[0])
+        return float(max(corners))
+
+    def _build(self, env, weights: Weights, key: tuple) -> UtilitySurface:
+        self.builds += 1
+        if self.tiles is not None:
+            layer = TiledRaster(
+                key=("utility",) + key, shape=self.shape, transform=self.transform, crs=self.crs,
+                read_tile=lambda r0, c0, h, w: self._window(env, weights, r0, c0, h, w),
+                cache=self.tiles, tile_size=self.tile_size, to_raster=self._to_raster,
+            )
+            return UtilitySurface(layer=layer, includes_habitat=self.includes_habitat)
+        cache_file = self._cache_file(key) if self.cache_dir else None
+        if cache_file is not None and cache_file.exists():
+            with np.load(cache_file) as npz:
+                data = npz["utility"]
+        else:
+            nrows, ncols = self.shape
+            data = np.empty(self.shape, dtype=np.float32)
+            step = max(1, self.block_cells // max(1, ncols))
+            for r0 in range(0, nrows, step):
+                h = min(step, nrows - r0)
+                data[r0:r0 + h] = self._window(env, weights, r0, 0, h, ncols)
+            if cache_file is not None:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                tmp = cache_file.with_suffix(".tmp.npz")
+                np.savez(tmp, utility=data)
+                os.replace(tmp, cache_file)
+        layer = RasterLayer(path="utility", data=data, transform=self.transform, crs=self.crs,
+                            to_raster=self._to_raster)
+        return UtilitySurface(layer=layer, includes_habitat=self.includes_habitat)
+
+    def _cache_file(self, key: tuple) -> Path:
+        parts = [self.inputs_key, repr(self.shape), repr(tuple(self.transform)[:6]), self.crs.to_wkt(),
+                 repr(key), str(self.includes_habitat), str(UTILITY_CACHE_VERSION)]
+        return Path(self.cache_dir) / f"utility_{hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]}.npz"
@@ -1,6 +1,7 @@
 from __future__ import annotations
 import math
 from typing import Tuple
+import numpy as np
 
 LatLon = Tuple[float, float]
 
@@ -36,4 +37,36 @@ def destination_point(lat: float, lon: float, bearing_deg_: float, distance_m: f
         math.sin(brng) * math.sin(distance_m / R) * math.cos(phi1),
         math.cos(distance_m / R) - math.sin(phi1) * math.sin(phi2),
     )
-    return math.degrees(phi2), (math.degrees(lam2) + 540) % 360 - 180
\ No newline at end of file
+    return math.degrees(phi2), (math.degrees(lam2) + 540) % 360 - 180
+
+# NumPy versions of the helpers above; arguments broadcast against each other
+
+
+def haversine_m_many(lat1, lon1, lat2, lon2) -> np.ndarray:
+    R = 6371000.0
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dphi = np.radians(np.subtract(lat2, lat1))
+    dlambda = np.radians(np.subtract(lon2, lon1))
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * R * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def bearing_deg_many(lat1, lon1, lat2, lon2) -> np.ndarray:
+    phi1, phi2 = np.radians(lat1), np.radians(lat2)
+    dlambda = np.radians(np.subtract(lon2, lon1))
+    y = np.sin(dlambda) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlambda)
+    return (np.degrees(np.arctan2(y, x)) + 360) % 360
+
+
+def destination_point_many(lat, lon, bearing_deg_, distance_m) -> Tuple[np.ndarray, np.ndarray]:
+    R = 6371000.0
+    brng = np.radians(bearing_deg_)
+    phi1 = np.radians(lat)
+    lam1 = np.radians(lon)
+    delta = np.asarray(distance_m, dtype=float) / R
+    sin_phi1, cos_phi1 = np.sin(phi1), np.cos(phi1)
+    sin_d, cos_d = np.sin(delta), np.cos(delta)
+    phi2 = np.arcsin(sin_phi1 * cos_d + cos_phi1 * sin_d * np.cos(brng))
+    lam2 = lam1 + np.arctan2(np.sin(brng) * sin_d * cos_phi1, cos_d - sin_phi1 * np.sin(phi2))
+    return np.degrees(phi2), (np.degrees(lam2) + 540) % 360 - 180
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+import yaml
+from test_raster import _write_tif
+
+from black_harrier_abm_v2.batch import BatchRunner, expand_jobs, run_batch
+from black_harrier_abm_v2.build import build_env, build_simulation
+from black_harrier_abm_v2.config import load_config
+from black_harrier_abm_v2.sinks import open_sink
+
+
+def _site(tmp_path, name, inputs, turbines):
+    cfg = {
+        "simulation": {"start_time": "2020-09-01 06:00:00", "end_time": "2020-09-01 06:20:00", "step_seconds": 60},
+        "model": {
+            "inputs": inputs,
+            "turbines": turbines,
+            "agents": [{"id": i, "start_lat": -33.05, "start_lon": 18.05, "state": "foraging"} for i in range(3)],
+        },
+    }
+    path = tmp_path / "sites" / f"{name}.yaml"
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(yaml.safe_dump(cfg))
+    return str(path)
+
+
+def test_batch_shares_inputs_and_matches_single_runs(tmp_path):
+    rng = np.random.default_rng(0)
+    inputs = {
+        "habitat_raster": _write_tif(tmp_path / "h.tif", rng.random((10, 10)).astype("float32")),
+        "dem_raster": _write_tif(tmp_path / "d.tif", (rng.random((10, 10)) * 100).astype("float32")),
+    }
+    layout = [{"lat": -33.05, "lon": 18.051}]
+    _site(tmp_path, "a", inputs, layout)
+    _site(tmp_path, "b", inputs, layout)
+    _site(tmp_path, "c", inputs, [])
+    manifest = tmp_path / "manifest.yaml"
+    manifest.write_text(yaml.safe_dump({"configs": ["sites/a.yaml", {"config": "sites/c.yaml", "out": "c_tracks.csv"}]}))
+
+    jobs = expand_jobs([str(manifest), str(tmp_path / "sites" / "b.yaml")], str(tmp_path / "out"))
+    assert [j.out.rsplit("/", 1)[1] for j in jobs] == ["a.csv", "c_tracks.csv", "b.csv"]
+    runner = BatchRunner(seed=7)
+    records = run_batch(jobs, runner)
+    assert [r["rows"] for r in records] == [63, 63, 63]  # 21 steps, end inclusive
+    assert runner.samplers_built == 1 and runner.envs_built == 2
+    assert runner._caches[4326].misses == 3  # habitat, DEM and derived terrain, once for the whole batch
+
+    sim_cfg, model_cfg = load_config(jobs[0].config)
+    single = str(tmp_path / "single.csv")
+    with open_sink(single) as sink:
+        build_simulation(sim_cfg, model_cfg, build_env(model_cfg), seed=7).run_to(sink)
+    assert pd.read_csv(jobs[0].out).equals(pd.read_csv(single))
+
+
+def test_expand_jobs_rejects_clashing_outputs(tmp_path):
+    (tmp_path / "x").mkdir()
+    (tmp_path / "y").mkdir()
+    for d in ("x", "y"):
+        (tmp_path / d / "site.yaml").write_text("simulation: {}\n")
+    with pytest.raises(ValueError, match="same output"):
+        expand_jobs([str(tmp_path / "*" / "site.yaml")], str(tmp_path / "out"))
+
+
+def test_shared_cache_honours_raster_cache_mb(tmp_path):
+    rng = np.random.default_rng(1)
+    band = 10 * 10 * 4
+    budget_mb = 2.5 * band / 2**20  # room for two of the four bands below
+    dem = _write_tif(tmp_path / "d.tif", (rng.random((10, 10)) * 100).astype("float32"))
+    for name in ("a", "b", "c"):
+        hab = _write_tif(tmp_path / f"h_{name}.tif", rng.random((10, 10)).astype("float32"))
+        _site(tmp_path, name, {"habitat_raster": hab, "dem_raster": dem, "raster_cache_mb": budget_mb}, [])
+    runner = BatchRunner(seed=7)
+    records = run_batch(expand_jobs([str(tmp_path / "sites" / "*.yaml")], str(tmp_path / "out")), runner)
+    assert [r["rows"] for r in records] == [63, 63, 63]
+    cache = runner._caches[4326]
+    assert cache.max_resident_bytes == int(budget_mb * 2**20) and cache.evictions > 0
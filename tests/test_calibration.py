@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from black_harrier_abm_v2.agents import DEFAULT_TRANSITIONS, HarrierAgent
+from black_harrier_abm_v2.calibration import CalibrationSimulation, ParameterBatch, SummaryBins, telemetry_stats
+from black_harrier_abm_v2.config import SimulationConfig
+from black_harrier_abm_v2.environment import Environment, Turbine
+from black_harrier_abm_v2.inference import CalibrationSpec, UniformPrior, abc_rejection, abc_smc, posterior_summary
+from black_harrier_abm_v2.movement import AltitudeModel, AltitudePriors, STATE_CODES, StepSelectionPolicy, Weights
+from black_harrier_abm_v2.population import Population, PopulationSimulation
+
+SIM_CFG = SimulationConfig(
+    start_time=pd.Timestamp("2020-09-01 06:00:00"), end_time=pd.Timestamp("2020-09-01 06:30:00"), step_seconds=60
+)
+ENV = Environment(turbines=[Turbine(lat=-33.2, lon=18.1)])
+PRIORS = AltitudePriors(means={"commuting": 80.0, "foraging": 15.0}, sds={"commuting": 20.0, "foraging": 5.0})
+
+
+def _agents(n):
+    return [HarrierAgent(agent_id=i, lat=-33.195 + 0.001 * i, lon=18.096, state="foraging", nest=(-33.195, 18.096))
+            for i in range(n)]
+
+
+def _calibration(n_agents=10, seed=7):
+    return CalibrationSimulation(env=ENV, population=Population.from_agents(_agents(n_agents)),
+                                 policy=StepSelectionPolicy(Weights()), priors=PRIORS, sim_cfg=SIM_CFG,
+                                 transitions=DEFAULT_TRANSITIONS, seed=seed)
+
+
+def test_single_set_matches_population_engine_tracks():
+    agents = _agents(10)
+    sim = PopulationSimulation.from_agents(ENV, agents, StepSelectionPolicy(Weights()), AltitudeModel(PRIORS), SIM_CFG,
+                                           seed=7)
+    tracks = pd.concat([pd.DataFrame(b) for b in sim.iter_steps(10)], ignore_index=True)
+    start = pd.DataFrame({"t": tracks["t"].min() - pd.Timedelta(seconds=60), "agent_id": range(10),
+                          "lat": [a.lat for a in agents], "lon": [a.lon for a in agents], "alt_m": np.nan, "state": -1})
+    observed = telemetry_stats(pd.concat([start, tracks], ignore_index=True), step_seconds=60)
+
+    calib = _calibration()
+    stats = calib.simulator([])(np.empty((1, 0)))[0]
+    blocks = calib.bins.blocks()
+    for name in blocks:
+        assert np.allclose(stats[blocks[name]], observed[blocks[name]], atol=1e-12), name
+
+
+def test_parameter_sets_are_an_array_axis():
+    calib = _calibration()
+    names = ["speed.foraging_mean", "speed.commuting_mean", "speed.breeding_mean"]
+    stats = calib.simulator(names)(np.array([[3.0] * 3, [12.0] * 3]))
+    cols = calib.bins.blocks()["step_length"]
+    centres = (calib.bins.step_length_m[:-1] + calib.bins.step_length_m[1:]) / 2
+    slow, fast = stats[:, cols] @ centres
+    assert slow < 300 < fast
+
+    batch = ParameterBatch.from_values(["transitions.breeding.foraging.roosting", "weights.w_wind"],
+                                       np.array([[0.5, 0.1], [0.0, 0.2]]), Weights(), PRIORS, DEFAULT_TRANSITIONS)
+    probs = np.diff(np.concatenate([np.zeros(batch.cdf.shape[:3] + (1,)), batch.cdf], axis=3), axis=3)
+    row = probs[:, 0, STATE_CODES["foraging"]]
+    assert np.allclose(row.sum(axis=1), 1.0) and row[1, STATE_CODES["roosting"]] == 0
+    assert np.isclose(row[0, STATE_CODES["roosting"]], 0.5 / (1.5 - DEFAULT_TRANSITIONS.probs[0, 1, 5]))
+    assert batch.row_weights(np.array([1, 1, 0])).w_wind.ravel().tolist() == [0.2, 0.2, 0.1]
+
+
+def test_abc_recovers_speed():
+    calib = _calibration(seed=1)
+    names = ["speed.foraging_mean", "speed.commuting_mean", "speed.breeding_mean"]
+    simulate_one = calib.simulator(names)
+    observed = simulate_one(np.array([[9.0, 9.0, 9.0]]))[0]
+    # One free parameter: every state flies at the same mean speed
+    simulate = lambda theta: simulate_one(np.repeat(theta, 3, axis=1))
+    spec = CalibrationSpec(prior=UniformPrior(["speed"], [2.0], [20.0]), samples=200, batch=100, accept=0.1,
+                           bins=SummaryBins())
+    draws = abc_rejection(simulate, observed, spec)
+    post = posterior_summary(draws, ["speed"]).iloc[0]
+    assert abs(post["mean"] - 9.0) < 2.0 and post["sd"] < 3.0
+
+    spec.generations = 2
+    particles = abc_smc(simulate, observed, spec)
+    last = particles[particles["generation"] == 1]
+    assert len(last) and np.isclose(last["weight"].sum(), 1.0)
+    assert last["distance"].max() <= particles.loc[particles["generation"] == 0, "distance"].median()
@@ -0,0 +1,87 @@
+import numpy as np
+
+from black_harrier_abm_v2.environment import Turbine
+from black_harrier_abm_v2.exposure import ExposureAccumulator
+from black_harrier_abm_v2.movement import STATE_CODES
+from black_harrier_abm_v2.spatial import TurbineIndex
+
+T0 = np.datetime64("2020-09-01T06:45:36", "ns")  # 07:58 local solar time at 18.1 E
+MIN = np.timedelta64(60, "s")
+
+
+def _batch(steps, agent_id, lats, alts, state="commuting"):
+    n = len(steps)
+    return {
+        "t": T0 + MIN * np.asarray(steps),
+        "agent_id": np.full(n, agent_id),
+        "lat": np.asarray(lats, dtype=float),
+        "lon": np.full(n, 18.1),
+        "alt_m": np.asarray(alts, dtype=float),
+        "state": np.full(n, STATE_CODES[state]),
+    }
+
+
+def test_exposure_uses_rotor_bands_entries_and_min_distance():
+    # Turbine 0 spins 30-130 m, turbine 1 (about 1.1 km north) 100-200 m
+    index = TurbineIndex.from_turbines([
+        Turbine(lat=-33.2, lon=18.1, rotor_min_m=30, rotor_max_m=130),
+        Turbine(lat=-33.19, lon=18.1, rotor_min_m=100, rotor_max_m=200),
+    ])
+    acc = ExposureAccumulator(index=index, step_seconds=60, influence_m=200)
+    near0 = -33.2 + 0.0009  # ~100 m from turbine 0
+    near1 = -33.19 + 0.0005  # ~56 m from turbine 1
+    # Agent 7: in, in, out | in (next batch continues the run), then too low for turbine 1, then in turbine 1
+    acc.write(_batch([0, 1, 2], 7, [near0, -33.2, near0], [50, 50, 10]))
+    acc.write(_batch([3, 4, 5], 7, [near0, near1, near1], [50, 50, 150]))
+    t = acc.table()
+
+    def row(group, key):
+        return t[(t["group"] == group) & (t["key"] == key)].iloc[0]
+
+    assert row("total", "all")["bsa_seconds"] == 5 * 60 - 60
+    assert row("turbine", "0")["bsa_seconds"] == 180 and row("turbine", "0")["entries"] == 2
+    assert row("turbine", "1")["bsa_seconds"] == 60 and row("turbine", "1")["entries"] == 1
+    assert row("turbine", "0")["min_approach_m"] < 1.0
+    assert abs(row("turbine", "1")["min_approach_m"] - 55.6) < 1.0
+    assert row("agent", "7")["entries"] == 3
+    assert row("hour", "07")["bsa_seconds"] == 120 and row("hour", "08")["bsa_seconds"] == 120
+    assert row("state", "commuting")["bsa_seconds"] == 240
+
+
+def test_segment_mode_counts_crossings_between_samples():
+    index = TurbineIndex.from_turbines([Turbine(lat=-33.2, lon=18.1, rotor_min_m=30, rotor_max_m=130)])
+    m = 1.0 / 111195.0  # degrees of latitude per metre
+    # One 60 s step from 600 m south to 600 m north of the turbine: the point check never sees it
+    crossing = _batch([0, 1], 3, [-33.2 - 600 * m, -33.2 + 600 * m], [80, 80])
+    point = ExposureAccumulator(index=index, step_seconds=60, influence_m=200)
+    point.write(crossing)
+    assert point.table()["bsa_seconds"].sum() == 0
+
+    seg = ExposureAccumulator(index=index, step_seconds=60, influence_m=200, mode="segment")
+    seg.write(crossing)
+    seg.write(_batch([2, 3], 3, [-33.2 - 600 * m, -33.2 + 600 * m], [100, 160]))
+    t = seg.table().set_index(["group", "key"])
+    # Legs north (80 m), back south (80 -> 100 m) and north again: a 400 m chord of 1200 m (20 s) each,
+    # except the last climbs 100 -> 160 m and leaves the rotor band half-way, 1/6 of the leg after entering
+    assert np.isclose(t.loc[("turbine", "0"), "bsa_seconds"], 20 + 20 + 10, atol=0.1)
+    assert np.isclose(t.loc[("turbine", "0"), "bsa_path_m"], 400 + 400 + 200, atol=1.0)
+    assert t.loc[("turbine", "0"), "entries"] == 3
+    assert t.loc[("turbine", "0"), "min_approach_m"] < 1.0
+    assert np.isclose(t.loc[("total", "all"), "bsa_seconds"], 50, atol=0.1)
+
+
+def test_segment_mode_matches_fine_point_sampling_and_unions_overlaps():
+    # Two turbines 150 m apart: their 200 m discs overlap
+    index = TurbineIndex.from_turbines([
+        Turbine(lat=-33.2, lon=18.1), Turbine(lat=-33.2 + 150 / 111195.0, lon=18.1),
+    ])
+    lats = np.linspace(-33.21, -33.19, 2001)  # ~1.1 m apart, one "second" each
+    fine = ExposureAccumulator(index=index, step_seconds=1, influence_m=200)
+    fine.write(_batch(np.arange(len(lats)) / 60, 1, lats, np.full(len(lats), 80.0)))
+    coarse = ExposureAccumulator(index=index, step_seconds=1000, influence_m=200, mode="segment")
+    coarse.write(_batch([0, 1000 / 60, 2000 / 60], 1, lats[::1000], [80.0, 80.0, 80.0]))
+    total = lambda acc: acc.table().set_index(["group", "key"]).loc[("total", "all"), "bsa_seconds"]
+    assert abs(total(coarse) - total(fine)) <= 2.0
+    per_turbine = coarse.table().query("group == 'turbine'")["bsa_seconds"]
+    assert np.allclose(per_turbine, 400 * 2000 / (lats[-1] - lats[0]) / 111195.0, rtol=0.01)
+    assert per_turbine.sum() > total(coarse)
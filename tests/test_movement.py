@@ -0,0 +1,64 @@
+import math
+import random
+
+import numpy as np
+
+from black_harrier_abm_v2.environment import Environment, Turbine
+from black_harrier_abm_v2.movement import StepSelectionPolicy, Weights
+from black_harrier_abm_v2.utils.geo import destination_point, haversine_m
+
+
+def _reference_utilities(w, lat, lon, speed, env, target):
+    # The original per-heading loop, kept as an oracle for the vectorized kernel
+    dist = max(0.1, speed) * 60.0
+    u, v = env.wind(lat, lon, None)
+    wind_dir = (math.degrees(math.atan2(u, v)) + 360) % 360 if math.hypot(u, v) > 0 else None
+    out = []
+    for hdg in range(0, 360, 15):
+        lat2, lon2 = destination_point(lat, lon, hdg, dist)
+        wind_util = 0.0 if wind_dir is None else math.cos(math.radians(abs(((hdg - wind_dir) + 180) % 360 - 180)))
+        target_util = 0.0
+        if target is not None:
+            d0 = haversine_m(lat, lon, *target)
+            target_util = (d0 - haversine_m(lat2, lon2, *target)) / max(1.0, d0)
+        turbine_pen = 0.0
+        for tb in env.turbines:
+            d = haversine_m(lat2, lon2, tb.lat, tb.lon)
+            if d < tb.rotor_radius_m * 1.5:
+                turbine_pen -= 1.5 - d / (tb.rotor_radius_m * 1.5)
+        out.append(
+            w.w_habitat * env.habitat(lat2, lon2, None) + w.w_wind * wind_util + w.w_target * target_util
+            - w.w_slope_penalty * abs(env.slope(lat2, lon2)) + w.w_turbine_avoid * turbine_pen
+        )
+    return out
+
+
+def test_choose_heading_matches_reference_loop():
+    env = Environment(
+        habitat_sampler=lambda lat, lon, t: (lon - 18.0) * 10,
+        wind_sampler=lambda lat, lon, t: (3.0, -1.0),
+        slope_sampler=lambda lat, lon: (lat + 33.2) * 20,
+        turbines=[Turbine(lat=-33.2, lon=18.1005), Turbine(lat=-33.2005, lon=18.1)],
+    )
+    w = Weights()
+    policy = StepSelectionPolicy(weights=w)
+    target = (-33.23, 18.12)
+    for seed in range(50):
+        ref = _reference_utilities(w, -33.2, 18.1, 1.5, env, target)
+        probs = np.exp(w.softmax_beta * (np.array(ref) - max(ref)))
+        expected = random.Random(seed).choices(list(range(0, 360, 15)), weights=list(probs / probs.sum()), k=1)[0]
+        got = policy.choose_heading(-33.2, 18.1, 1.5, None, env, "breeding", target, random.Random(seed))
+        assert got == expected
+
+
+def test_choose_headings_respects_heading_count_and_step():
+    env = Environment(turbines=[Turbine(lat=0.0, lon=0.0)])
+    policy = StepSelectionPolicy(weights=Weights(w_habitat=0, w_wind=0, w_slope_penalty=0, softmax_beta=50.0), n_headings=8)
+    n = 1000
+    hdg = policy.choose_headings(
+        np.zeros(n), np.full(n, -0.01), np.full(n, 10.0), None, env,
+        np.full(n, 0.01), np.full(n, -0.01), np.random.default_rng(1).random(n), step_seconds=120,
+    )
+    assert set(np.unique(hdg)) <= set(np.arange(8) * 45.0)
+    # Strong pull north towards the target
+    assert np.mean(hdg == 0.0) > 0.5
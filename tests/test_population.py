@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from black_harrier_abm_v2.agents import HarrierAgent
+from black_harrier_abm_v2.config import SimulationConfig
+from black_harrier_abm_v2.environment import Environment, Turbine
+from black_harrier_abm_v2.movement import AltitudeModel, AltitudePriors, StepSelectionPolicy, Weights
+from black_harrier_abm_v2.population import Population, PopulationSimulation
+
+
+def _agents(n):
+    return [
+        HarrierAgent(agent_id=i, lat=-33.195 + 0.001 * i, lon=18.096, state="breeding",
+                     nest=(-33.195, 18.096), roost=(-33.23, 18.12) if i % 2 else None)
+        for i in range(n)
+    ]
+
+
+def test_population_round_trip():
+    agents = _agents(5)
+    back = Population.from_agents(agents).to_agents()
+    assert [(a.agent_id, a.lat, a.state, a.nest, a.roost) for a in back] == [
+        (a.agent_id, a.lat, a.state, a.nest, a.roost) for a in agents
+    ]
+
+
+def test_population_engine_runs_all_agents():
+    sim_cfg = SimulationConfig(
+        start_time=pd.Timestamp("2020-09-01 06:00:00"), end_time=pd.Timestamp("2020-09-01 07:00:00"), step_seconds=60
+    )
+    env = Environment(turbines=[Turbine(lat=-33.2, lon=18.1)])
+    alt = AltitudeModel(priors=AltitudePriors(means={"commuting": 80.0}, sds={"commuting": 20.0}))
+
+    def run(seed):
+        sim = PopulationSimulation.from_agents(env, _agents(50), StepSelectionPolicy(Weights()), alt, sim_cfg, seed=seed)
+        return sim.run()
+
+    df = run(7)
+    assert len(df) == 61 * 50
+    assert df.groupby("t")["agent_id"].nunique().eq(50).all()
+    assert df["in_bsa"].eq(df["nearest_turbine_id"].notna()).all()
+    assert (df.loc[df["in_bsa"], "nearest_turbine_d_m"] <= 200.0).all()
+    pd.testing.assert_frame_equal(df, run(7))
+    assert not np.allclose(df["lat"], run(8)["lat"])
@@ -0,0 +1,50 @@
+import random
+
+import pandas as pd
+
+from black_harrier_abm_v2.agents import HarrierAgent
+from black_harrier_abm_v2.config import SimulationConfig
+from black_harrier_abm_v2.environment import Environment, Turbine
+from black_harrier_abm_v2.movement import AltitudeModel, AltitudePriors, StepSelectionPolicy, Weights
+from black_harrier_abm_v2.profiling import NULL_PROFILER, Profiler
+from black_harrier_abm_v2.risk import ABMSimulation
+from black_harrier_abm_v2.sinks import MemorySink
+
+SIM_CFG = SimulationConfig(
+    start_time=pd.Timestamp("2020-09-01 06:00:00"), end_time=pd.Timestamp("2020-09-01 06:19:00"), step_seconds=60
+)
+
+
+def _run(profiler):
+    env = Environment(
+        habitat_many_sampler=lambda lats, lons, t: lats * 0 + 0.7,
+        turbines=[Turbine(lat=-33.2, lon=18.1)],
+        profiler=profiler,
+    )
+    agents = [HarrierAgent(agent_id=i, lat=-33.195, lon=18.096, state="breeding", rng=random.Random(i)) for i in range(3)]
+    alt = AltitudeModel(priors=AltitudePriors(means={"commuting": 80.0}, sds={"commuting": 20.0}))
+    sim = ABMSimulation(env=env, agents=agents, policy=StepSelectionPolicy(Weights()), alt_model=alt, sim_cfg=SIM_CFG,
+                        profiler=profiler)
+    sink = MemorySink()
+    sim.run_to(sink, chunk_steps=5)
+    return sink.frame()
+
+
+def test_profiler_records_phases_and_progress():
+    seen = []
+    prof = Profiler(progress=lambda done, total: seen.append((done, total)), progress_every=5)
+    df = _run(prof)
+    s = prof.summary()
+    assert s["steps"] == s["total_steps"] == 20 and s["agent_steps"] == 60
+    assert seen == [(5, 20), (10, 20), (15, 20), (20, 20)]
+    for phase in ("transition", "speed", "heading", "movement", "risk", "record"):
+        assert s["phases"][phase]["calls"] == 60 or phase == "record"
+    assert s["phases"]["env.habitat_many"]["items"] == 60 * 24
+    assert s["phases"]["output"]["calls"] == 4
+    # Instrumentation does not touch the random streams
+    assert df.equals(_run(NULL_PROFILER))
+
+
+def test_disabled_profiler_stays_empty():
+    _run(NULL_PROFILER)
+    assert NULL_PROFILER.phases == {} and NULL_PROFILER.steps == 0
@@ -0,0 +1,182 @@
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import rasterio
+from pyproj import Transformer
+from rasterio.transform import from_origin
+
+from black_harrier_abm_v2.environment import Environment
+from black_harrier_abm_v2.samplers.raster import RasterCache, RasterSamplers
+from black_harrier_abm_v2.samplers.tiled import TileCache, TiledRaster
+
+
+def _write_tif(path, data, west=18.0, north=-33.0, res=0.01, nodata=None, crs="EPSG:4326"):
+    with rasterio.open(
+        path, "w", driver="GTiff", height=data.shape[0], width=data.shape[1], count=1,
+        dtype=data.dtype, crs=crs, transform=from_origin(west, north, res, res), nodata=nodata,
+    ) as ds:
+        ds.write(data, 1)
+    return str(path)
+
+
+def test_cache_opens_each_raster_once(tmp_path):
+    data = np.arange(100, dtype="float32").reshape(10, 10) / 100.0
+    path = _write_tif(tmp_path / "habitat.tif", data)
+    samplers = RasterSamplers(habitat_raster=path)
+    with samplers:
+        # Cell (row 2, col 3) covers lat -33.02..-33.03, lon 18.03..18.04
+        assert abs(samplers.habitat(-33.025, 18.035, None) - data[2, 3]) < 1e-6
+        for _ in range(50):
+            samplers.habitat(-33.055, 18.015, None)
+        assert samplers.cache.misses == 1
+        assert samplers.cache.hits >= 50
+        # Out of bounds falls back to the neutral default
+        assert samplers.habitat(-40.0, 18.0, None) == 0.5
+    assert samplers.cache.resident_bytes == 0
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    a = _write_tif(tmp_path / "a.tif", np.ones((10, 10), dtype="float32"))
+    b = _write_tif(tmp_path / "b.tif", np.zeros((10, 10), dtype="float32"))
+    cache = RasterCache(max_resident_bytes=500)
+    cache.get(a)
+    cache.get(b)
+    assert a not in cache and b in cache
+    assert cache.evictions == 1
+
+
+def test_batched_sampling_matches_scalar(tmp_path):
+    rng = np.random.default_rng(0)
+    hab = rng.random((20, 20)).astype("float32")
+    hab[5, 5] = -9999.0
+    dem = (rng.random((20, 20)) * 300).astype("float32")
+    samplers = RasterSamplers(
+        habitat_raster=_write_tif(tmp_path / "h.tif", hab, nodata=-9999.0),
+        dem_raster=_write_tif(tmp_path / "d.tif", dem),
+        wind_u_raster=_write_tif(tmp_path / "u.tif", hab),
+        wind_v_raster=_write_tif(tmp_path / "v.tif", -hab),
+    )
+    env = Environment.from_samplers(samplers)
+    lats = np.concatenate([rng.uniform(-33.21, -32.99, 200), [-33.055, -34.0]])
+    lons = np.concatenate([rng.uniform(17.99, 18.21, 200), [18.055, 18.1]])
+
+    h = env.habitat_many(lats, lons, None)
+    s = env.slope_many(lats, lons)
+    u, v = env.wind_many(lats, lons, None)
+    for i, (la, lo) in enumerate(zip(lats, lons)):
+        assert h[i] == env.habitat(la, lo, None)
+        assert (u[i], v[i]) == env.wind(la, lo, None)
+        assert s[i] == env.slope(la, lo)
+
+
+def test_environment_shim_for_plain_callables():
+    env = Environment(habitat_sampler=lambda lat, lon, t: lat + 2.0, slope_sampler=lambda lat, lon: 1 / 0)
+    lats = np.array([[-1.75, -2.5]])
+    lons = np.zeros((1, 2))
+    assert env.habitat_many(lats, lons, None).tolist() == [[0.25, 0.0]]
+    assert env.slope_many(lats, lons).tolist() == [[0.0, 0.0]]
+    u, v = env.wind_many(lats, lons, None)
+    assert u.shape == (1, 2) and not u.any() and not v.any()
+
+
+def test_slope_raster_in_metric_units_with_disk_cache(tmp_path):
+    # UTM 34S plane rising 1 m per 10 m eastwards: 5.71 deg slope, facing (downslope) west
+    cols = np.arange(30, dtype="float32")
+    dem = np.tile(cols * 3.0, (25, 1))  # 30 m pixels
+    path = _write_tif(tmp_path / "dem.tif", dem, west=260000.0, north=6330000.0, res=30.0, crs="EPSG:32734")
+    cache_dir = str(tmp_path / "terrain")
+
+    samplers = RasterSamplers(dem_raster=path, terrain_cache_dir=cache_dir).open()
+    slope, aspect = (layer.data for layer in samplers.terrain())
+    assert np.allclose(slope, np.degrees(np.arctan(0.1)), atol=1e-4)  # edges included
+    assert np.allclose(aspect, 270.0, atol=1e-3)
+    assert path not in samplers.cache
+
+    lon, lat = Transformer.from_crs("EPSG:32734", "EPSG:4326", always_xy=True).transform(260400.0, 6329600.0)
+    assert abs(samplers.slope(lat, lon) + np.degrees(np.arctan(0.1)) / 45.0) < 1e-5
+
+    again = RasterSamplers(dem_raster=path, terrain_cache_dir=cache_dir).open()
+    assert again.cache.misses == 1  # slope/aspect came from disk; DEM never read
+    assert again.slope(lat, lon) == samplers.slope(lat, lon)
+
+
+def test_slope_stays_resident_under_tight_budget(tmp_path):
+    dem = np.tile(np.arange(30, dtype="float32") * 3.0, (25, 1))
+    path = _write_tif(tmp_path / "dem.tif", dem)
+    samplers = RasterSamplers(dem_raster=path, max_resident_bytes=dem.nbytes).open()
+    lats, lons = np.full(5, -33.1), np.linspace(18.01, 18.2, 5)
+    misses = samplers.cache.misses
+    for _ in range(3):
+        samplers.slope_many(lats, lons)
+    # Slope alone is derived and kept; aspect is not built, so nothing evicts slope between calls
+    assert samplers.cache.misses == misses and samplers.cache.hits == 3
+    assert f"{path}#aspect" not in samplers.cache
+
+
+def test_tiled_mode_matches_whole_band_within_budget(tmp_path):
+    rng = np.random.default_rng(1)
+    hab = rng.random((50, 70)).astype("float32")
+    hab[7, 9] = -9999.0
+    dem = (rng.random((50, 70)) * 300).astype("float32")
+    paths = dict(habitat_raster=_write_tif(tmp_path / "h.tif", hab, nodata=-9999.0),
+                 dem_raster=_write_tif(tmp_path / "d.tif", dem))
+    lats = np.concatenate([rng.uniform(-33.51, -32.99, 400), [-33.075, -34.0]])
+    lons = np.concatenate([rng.uniform(17.99, 18.71, 400), [18.095, 18.1]])
+
+    full = RasterSamplers(**paths).open()
+    tiled = RasterSamplers(**paths, tile_size=16, max_resident_bytes=6 * 16 * 16 * 4).open()
+    assert np.array_equal(tiled.habitat_many(lats, lons, None), full.habitat_many(lats, lons, None))
+    # Slope/aspect per tile (with a one-cell halo) equal the full-grid derivatives, edges included
+    assert np.allclose(tiled.slope_many(lats, lons), full.slope_many(lats, lons), atol=1e-6)
+    assert np.allclose(tiled.aspect_many(lats, lons), full.aspect_many(lats, lons), atol=1e-4, equal_nan=True)
+    assert tiled.slope(-33.2, 18.3) == full.slope(-33.2, 18.3)
+    assert tiled.tiles.resident_bytes <= 6 * 16 * 16 * 4 and tiled.tiles.evictions > 0
+
+    # Prefetch along a heading: the tiles ahead are read in the background before they are sampled
+    tiled.tiles.close()
+    tiled.prefetch_along(np.array([-33.05]), np.array([18.05]), np.array([90.0]), np.array([20000.0]))
+    tiled.habitat(-33.05, 18.23, None)
+    assert tiled.tiles.prefetches >= 2 and tiled.tiles.tile_reads > 0
+    assert tiled.cache.resident_bytes == 0  # whole-band cache unused in tiled mode
+    tiled.close()
+
+
+def test_mispredicted_tile_prefetches_stay_within_budget(tmp_path):
+    path = _write_tif(tmp_path / "h.tif", np.ones((160, 160), dtype="float32"))
+    budget = 4 * 16 * 16 * 4
+    cache = TileCache(max_resident_bytes=budget, max_pending=3)
+    layer = TiledRaster.open(path, cache, tile_size=16)
+    lats = -33.0 - 0.01 * (np.arange(160) + 0.5)
+    for lat in lats:  # predict every tile of a row, sample none of them
+        layer.prefetch(np.full(10, lat), 18.0 + 0.16 * (np.arange(10) + 0.5) / 10)
+        assert len(cache._pending) <= 3
+    deadline = time.monotonic() + 10.0
+    while cache._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Finished prefetches entered the LRU and were evicted there; nothing is held outside the budget
+    assert not cache._pending and cache.evictions > 0
+    assert cache.resident_bytes == sum(t.nbytes for t in cache._tiles.values()) <= budget
+    cache.close()
+    layer.close()
+
+
+def test_tiled_samplers_close_their_file_handles(tmp_path):
+    dem = np.tile(np.arange(40, dtype="float32"), (40, 1))
+    paths = dict(habitat_raster=_write_tif(tmp_path / "h.tif", dem), dem_raster=_write_tif(tmp_path / "d.tif", dem))
+    samplers = RasterSamplers(**paths, tile_size=16, max_resident_bytes=1 << 20).open()
+    lats, lons = np.full(8, -33.2), np.linspace(18.01, 18.39, 8)
+    samplers.prefetch_along(lats, lons, np.full(8, 180.0), np.full(8, 1000.0))
+    # Tiles read by both the sampling thread and the prefetch thread
+    samplers.habitat_many(np.concatenate([lats, lats + 0.15]), np.concatenate([lons, lons]), None)
+    samplers.slope_many(np.concatenate([lats, lats + 0.15]), np.concatenate([lons, lons]))
+
+    def open_handles(path):
+        fds = Path("/proc/self/fd")
+        return sum(1 for fd in fds.iterdir() if os.path.realpath(fd) == os.path.realpath(path)) if fds.exists() else 0
+
+    layers = list(samplers._tiled.values())  # still referenced: handles must close explicitly, not on collection
+    assert open_handles(paths["habitat_raster"]) > 0
+    samplers.close()
+    assert open_handles(paths["habitat_raster"]) == 0 and open_handles(paths["dem_raster"]) == 0
@@ -0,0 +1,34 @@
+import yaml
+
+from black_harrier_abm_v2.replicates import aggregate_replicates, run_replicates
+
+
+def _config(tmp_path):
+    cfg = {
+        "simulation": {"start_time": "2020-09-01 06:00:00", "end_time": "2020-09-01 06:30:00", "step_seconds": 60},
+        "model": {
+            "inputs": {},
+            "turbines": [{"lat": -33.195, "lon": 18.097}],
+            "agents": [
+                {"id": i, "start_lat": -33.195, "start_lon": 18.096, "state": "commuting",
+                 "nest_lat": -33.195, "nest_lon": 18.096}
+                for i in range(3)
+            ],
+        },
+    }
+    path = tmp_path / "cfg.yaml"
+    path.write_text(yaml.safe_dump(cfg))
+    return str(path)
+
+
+def test_replicates_are_reproducible_across_worker_counts(tmp_path):
+    path = _config(tmp_path)
+    serial = run_replicates(path, 4, workers=1, seed=11)
+    parallel = run_replicates(path, 4, workers=2, seed=11)
+    assert serial.equals(parallel)
+    assert not serial.equals(run_replicates(path, 4, workers=1, seed=12))
+
+    stats = aggregate_replicates(serial)
+    total = stats[stats["group"] == "total"].iloc[0]
+    assert total["n_replicates"] == 4
+    assert total["q05"] <= total["q50"] <= total["q95"]
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from black_harrier_abm_v2.agents import HarrierAgent
+from black_harrier_abm_v2.config import SimulationConfig
+from black_harrier_abm_v2.environment import Environment, Turbine
+from black_harrier_abm_v2.exposure import ExposureAccumulator
+from black_harrier_abm_v2.movement import AltitudeModel, AltitudePriors, StepSelectionPolicy, Weights
+from black_harrier_abm_v2.population import PopulationSimulation
+from black_harrier_abm_v2.risk import ABMSimulation
+from black_harrier_abm_v2.scheduling import AdaptiveStepping
+from black_harrier_abm_v2.streams import RandomStreams
+
+TURBINE = (-33.2, 18.1)
+ENV = Environment(turbines=[Turbine(lat=TURBINE[0], lon=TURBINE[1])])
+ALT = AltitudeModel(priors=AltitudePriors(means={"commuting": 80.0, "breeding": 60.0}, sds={"commuting": 20.0}))
+CFG = SimulationConfig(start_time=pd.Timestamp("2020-09-01 06:00:00"), end_time=pd.Timestamp("2020-09-01 06:40:00"),
+                       step_seconds=60)
+
+
+def _agents():
+    # Commuters starting about 4 km north of the turbine, nesting beside it
+    return [HarrierAgent(agent_id=i, lat=TURBINE[0] + 0.036, lon=TURBINE[1] + 0.002 * (i - 10), state="commuting",
+                         nest=(TURBINE[0] + 0.001, TURBINE[1])) for i in range(20)]
+
+
+def test_plan_checks_again_only_once_clearance_is_spent():
+    sched = AdaptiveStepping(index=ENV.turbine_index, influence_m=200.0, buffer_m=50.0)
+    sched.reset(2)
+    rows = np.arange(2)
+    # About 556 m and 3336 m from the turbine; 600 m steps
+    lats, lons = np.array([TURBINE[0] + 0.005, TURBINE[0] + 0.03]), np.full(2, TURBINE[1])
+    far = [sched.plan(rows, lats, lons, np.full(2, 600.0)).tolist() for _ in range(6)]
+    assert far == [[False, True]] * 6
+    # The near agent is checked every step, the far one at the start and after five steps of 600 m
+    assert sched.checks == 6 + 2 and sched.skips == 6
+
+
+@pytest.mark.parametrize("engine", ["agent", "population"])
+def test_adaptive_run_matches_fixed_steps_across_replicates(engine):
+    def run(adaptive, replicate):
+        cfg = SimulationConfig(**{**CFG.__dict__, "adaptive_stepping": adaptive})
+        sched = AdaptiveStepping.from_config(ENV.turbine_index, cfg)
+        streams = RandomStreams(3, replicate)
+        if engine == "agent":
+            sim = ABMSimulation(env=ENV, agents=_agents(), policy=StepSelectionPolicy(Weights()), alt_model=ALT,
+                                sim_cfg=cfg, scheduler=sched, streams=streams)
+        else:
+            sim = PopulationSimulation.from_agents(ENV, _agents(), StepSelectionPolicy(Weights()), ALT, cfg)
+            sim.scheduler, sim.streams = sched, streams
+        acc = ExposureAccumulator.for_simulation(ENV, cfg)
+        rows = []
+        for batch in sim.iter_steps(10):
+            acc.write(batch)
+            rows.append(pd.DataFrame(batch))
+        return pd.concat(rows, ignore_index=True), acc.table(), sched
+
+    bsa_seconds = []
+    for replicate in range(4):
+        fixed, fixed_exposure, _ = run(False, replicate)
+        adaptive, adaptive_exposure, sched = run(True, replicate)
+        # Every agent starts out of reach, and skipping there changes no draw, track or exposure row
+        assert sched.skips > sched.checks
+        pd.testing.assert_frame_equal(fixed, adaptive)
+        pd.testing.assert_frame_equal(fixed_exposure, adaptive_exposure)
+        bsa_seconds.append(fixed_exposure.query("group == 'total'")["bsa_seconds"].sum())
+    assert min(bsa_seconds) > 0 and len(set(bsa_seconds)) > 1
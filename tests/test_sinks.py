@@ -0,0 +1,44 @@
+import pandas as pd
+import pyarrow.parquet as pq
+
+from black_harrier_abm_v2.agents import HarrierAgent
+from black_harrier_abm_v2.config import SimulationConfig
+from black_harrier_abm_v2.environment import Environment, Turbine
+from black_harrier_abm_v2.movement import AltitudeModel, AltitudePriors, StepSelectionPolicy, Weights
+from black_harrier_abm_v2.population import PopulationSimulation
+from black_harrier_abm_v2.sinks import CSVSink, MemorySink, ParquetSink
+
+
+def _sim():
+    sim_cfg = SimulationConfig(
+        start_time=pd.Timestamp("2020-09-01 06:00:00"), end_time=pd.Timestamp("2020-09-01 06:24:00"), step_seconds=60
+    )
+    agents = [HarrierAgent(agent_id=i, lat=-33.2, lon=18.1, state="commuting") for i in range(4)]
+    alt = AltitudeModel(priors=AltitudePriors(means={"commuting": 80.0}, sds={"commuting": 20.0}))
+    env = Environment(turbines=[Turbine(lat=-33.2, lon=18.1)])
+    return PopulationSimulation.from_agents(env, agents, StepSelectionPolicy(Weights()), alt, sim_cfg, seed=3)
+
+
+def test_iter_steps_chunks_timesteps():
+    sizes = [len(b["t"]) for b in _sim().iter_steps(chunk_steps=10)]
+    assert sizes == [40, 40, 20]
+
+
+def test_sinks_write_identical_rows(tmp_path):
+    mem = MemorySink()
+    _sim().run_to(mem, chunk_steps=10)
+    expected = mem.frame()
+    assert expected["agent_id"].dtype == "int32" and expected["lat"].dtype == "float32"
+    assert isinstance(expected["state"].dtype, pd.CategoricalDtype)
+    assert expected["nearest_turbine_id"].dtype == "Int32"
+
+    with ParquetSink(str(tmp_path / "tracks.parquet")) as sink:
+        _sim().run_to(sink, chunk_steps=10)
+    assert pq.ParquetFile(tmp_path / "tracks.parquet").num_row_groups == 3
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "tracks.parquet"), expected)
+
+    with CSVSink(str(tmp_path / "tracks.csv")) as sink:
+        _sim().run_to(sink, chunk_steps=7)
+    got = pd.read_csv(tmp_path / "tracks.csv")
+    assert len(got) == len(expected)
+    assert (got["in_bsa"] == expected["in_bsa"]).all()
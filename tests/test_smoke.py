@@ -27,4 +27,5 @@ def test_simulation_runs():
     sim = ABMSimulation(env=env, agents=agents, policy=policy, alt_model=alt_model, sim_cfg=sim_cfg)
     df = sim.run()
     assert not df.empty
-    assert set(["t", "agent_id", "lat", "lon", "alt_m", "state", "in_bsa"]).issubset(df.columns)
\ No newline at end of file
+    assert set(["t", "agent_id", "lat", "lon", "alt_m", "state", "in_bsa"]).issubset(df.columns)
+    assert df["t"].tolist() == list(pd.date_range(sim_cfg.start_time, sim_cfg.end_time, freq="60s"))
@@ -0,0 +1,41 @@
+import numpy as np
+
+from black_harrier_abm_v2.environment import Turbine
+from black_harrier_abm_v2.spatial import TurbineIndex
+from black_harrier_abm_v2.utils.geo import haversine_m
+
+
+def _layout(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        Turbine(lat=float(a), lon=float(b), rotor_radius_m=float(r))
+        for a, b, r in zip(rng.uniform(-33.3, -33.1, n), rng.uniform(18.0, 18.2, n), rng.uniform(40, 80, n))
+    ]
+
+
+def test_index_matches_brute_force():
+    turbines = _layout(300)
+    index = TurbineIndex.from_turbines(turbines)
+    rng = np.random.default_rng(1)
+    lats, lons = rng.uniform(-33.35, -33.05, 500), rng.uniform(17.95, 18.25, 500)
+
+    pts, tids, d = index.within_many(lats, lons, 500.0)
+    got = {(int(p), int(t)) for p, t in zip(pts, tids)}
+    want = set()
+    nearest_ids, nearest_d = index.nearest_many(lats, lons, max_distance_m=800.0)
+    for i, (la, lo) in enumerate(zip(lats, lons)):
+        dists = [haversine_m(la, lo, tb.lat, tb.lon) for tb in turbines]
+        want |= {(i, j) for j, dj in enumerate(dists) if dj <= 500.0}
+        j = int(np.argmin(dists))
+        if dists[j] <= 800.0:
+            assert nearest_ids[i] == j and abs(nearest_d[i] - dists[j]) < 1e-6
+        else:
+            assert nearest_ids[i] == -1 and np.isnan(nearest_d[i])
+    assert got == want
+    assert np.allclose(d, [haversine_m(lats[p], lons[p], turbines[t].lat, turbines[t].lon) for p, t in zip(pts, tids)])
+
+
+def test_empty_index():
+    index = TurbineIndex.from_turbines([])
+    assert index.nearest(-33.0, 18.0) == (None, None)
+    assert all(len(a) == 0 for a in index.within_many(np.zeros(3), np.zeros(3), 1e6))
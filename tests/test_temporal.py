@@ -0,0 +1,120 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import rasterio
+from rasterio.transform import from_origin
+
+from black_harrier_abm_v2.samplers.raster import RasterSamplers
+from black_harrier_abm_v2.samplers.temporal import TimeCube, open_cube
+
+TIMES = pd.date_range("2024-06-01", periods=6, freq="1h")
+
+
+def _write_stack(path, n_bands=len(TIMES), tagged=True):
+    with rasterio.open(
+        path, "w", driver="GTiff", height=10, width=10, count=n_bands, dtype="float32",
+        crs="EPSG:4326", transform=from_origin(18.0, -33.0, 0.01, 0.01),
+    ) as ds:
+        for b in range(n_bands):
+            ds.write(np.full((10, 10), float(b), dtype="float32"), b + 1)
+            if tagged:
+                ds.update_tags(b + 1, TIME=TIMES[b].isoformat())
+    return str(path)
+
+
+def _open_handles(path):
+    fds = Path("/proc/self/fd")
+    return sum(1 for fd in fds.iterdir() if os.path.realpath(fd) == os.path.realpath(path)) if fds.exists() else 0
+
+
+def test_geotiff_cube_interpolates_between_slices(tmp_path):
+    path = _write_stack(tmp_path / "u.tif")
+    cube = open_cube(path)
+    lat, lon = -33.05, 18.05
+    assert cube.sample(lat, lon, TIMES[2]) == 2.0
+    assert abs(cube.sample(lat, lon, TIMES[2] + pd.Timedelta(minutes=30)) - 2.5) < 1e-6
+    # Clamped outside the time axis; out-of-bounds points are missing
+    assert cube.sample(lat, lon, TIMES[0] - pd.Timedelta(days=1)) == 0.0
+    assert cube.sample(lat, lon, TIMES[-1] + pd.Timedelta(days=1)) == 5.0
+    assert cube.sample(-40.0, lon, TIMES[0]) is None
+    cube.close()
+    assert _open_handles(path) == 0  # per-thread rasterio handles closed with the cube
+
+
+def test_nearest_mode_and_bounded_residency(tmp_path):
+    cube = open_cube(_write_stack(tmp_path / "u.tif", tagged=False),
+                     {"start": TIMES[0], "freq": "1h", "interp": "nearest", "max_resident_slices": 3})
+    for t in pd.date_range(TIMES[0], TIMES[-1], freq="10min"):
+        vals = cube.sample_many(np.full(4, -33.05), np.full(4, 18.05), t)
+        assert np.all(vals == np.round((t - TIMES[0]) / pd.Timedelta(hours=1) + 1e-9))
+        assert len(cube._slices) <= 3
+    cube.close()
+    assert cube.slice_reads <= len(TIMES) + cube.prefetch
+
+
+def test_coarse_steps_over_fine_cube_stay_bounded(tmp_path):
+    cube = open_cube(_write_stack(tmp_path / "u.tif", n_bands=60, tagged=False),
+                     {"start": TIMES[0], "freq": "1h", "prefetch": 1, "max_resident_slices": 3})
+    grid = pd.date_range(TIMES[0], periods=20, freq="3h")
+    cube.prepare(grid.values)
+    slice_bytes = 10 * 10 * 4
+    for t in grid:
+        assert cube.sample(-33.05, 18.05, t) == (t - TIMES[0]) / pd.Timedelta(hours=1)
+        assert len(cube._slices) + len(cube._pending) <= 3
+        assert cube.resident_bytes <= 3 * slice_bytes
+    cube.close()
+    # Only the slices the 3-hour steps land on are read; the hours in between are never prefetched
+    assert cube.slice_reads == len(grid)
+
+
+def test_netcdf_cube(tmp_path):
+    xr = __import__("pytest").importorskip("xarray")
+    lats = -33.005 - 0.01 * np.arange(10)
+    lons = 18.005 + 0.01 * np.arange(10)
+    data = np.broadcast_to(np.arange(len(TIMES), dtype="float32")[:, None, None], (len(TIMES), 10, 10))
+    ds = xr.Dataset({"u10": (("time", "latitude", "longitude"), data.copy())},
+                    coords={"time": TIMES.values, "latitude": lats, "longitude": lons})
+    path = str(tmp_path / "era5.nc")
+    ds.to_netcdf(path)
+    cube = open_cube(path, {"variable": "u10"})
+    assert isinstance(cube, TimeCube)
+    assert abs(cube.sample(-33.045, 18.045, TIMES[1] + pd.Timedelta(minutes=15)) - 1.25) < 1e-6
+    cube.close()
+    assert _open_handles(path) == 0  # dataset closed with the cube
+
+
+def test_samplers_route_multiband_wind_to_cubes(tmp_path):
+    u = _write_stack(tmp_path / "u.tif")
+    samplers = RasterSamplers(wind_u_raster=u, wind_v_raster=u).open()
+    t = TIMES[3] + pd.Timedelta(minutes=30)
+    assert samplers.wind(-33.05, 18.05, t) == (3.5, 3.5)
+    wu, wv = samplers.wind_many(np.array([-33.05]), np.array([18.05]), t)
+    assert wu[0] == 3.5 and wv[0] == 3.5
+    samplers.close()
+
+
+def test_time_grid_covariates():
+    from black_harrier_abm_v2.agents import month_to_season
+    from black_harrier_abm_v2.timegrid import TimeGrid
+    from black_harrier_abm_v2.transitions import SEASONS
+
+    grid = TimeGrid(pd.Timestamp("2021-01-01"), pd.Timestamp("2021-12-31 23:00"), step_seconds=3600, lat=-33.2, lon=18.1)
+    assert len(grid) == 365 * 24
+    ts = pd.DatetimeIndex(grid.times)
+    assert [SEASONS[c] for c in grid.season[::24]] == [month_to_season(t) for t in ts[::24]]
+    # Cape Town in midsummer: daylight from roughly 04 to 18 UTC
+    jan1 = grid.is_day[:24]
+    assert not jan1[0] and jan1[10] and not jan1[20]
+    assert 13 <= jan1.sum() <= 16
+
+
+def test_prepared_brackets_match_search(tmp_path):
+    cube = open_cube(_write_stack(tmp_path / "u.tif"))
+    times = pd.date_range(TIMES[0] - pd.Timedelta(hours=1), TIMES[-1] + pd.Timedelta(hours=1), freq="7min")
+    expected = [cube.bracket(t) for t in times]
+    cube.prepare(times.values)
+    assert [cube.bracket(t) for t in times] == expected
+    assert [cube.bracket(np.datetime64(t)) for t in times] == expected
+    cube.close()
@@ -0,0 +1,51 @@
+import random
+
+import numpy as np
+import pytest
+import yaml
+
+from black_harrier_abm_v2.agents import DEFAULT_TRANSITIONS, TRANSITIONS, HarrierAgent
+from black_harrier_abm_v2.movement import STATES, STATE_CODES, State
+from black_harrier_abm_v2.transitions import FALLBACK_ROW, CompiledTransitions
+
+
+def test_compiled_rows_match_table_and_fallback():
+    tr = DEFAULT_TRANSITIONS
+    s = tr.season_codes["breeding"]
+    row = TRANSITIONS["breeding"][State.FORAGING]
+    for to, p in row.items():
+        assert tr.probs[s, STATE_CODES[State.FORAGING], STATE_CODES[to]] == p
+    assert np.allclose(tr.cdf[..., -1], 1.0)
+    custom = CompiledTransitions.from_dict({"breeding": {State.FORAGING: {State.ROOSTING: 1.0}}})
+    fb = custom.probs[custom.season_codes["nonbreeding"], STATE_CODES[State.MIGRATING]]
+    assert all(fb[STATE_CODES[st]] == p for st, p in FALLBACK_ROW.items())
+
+
+def test_rows_must_sum_to_one():
+    with pytest.raises(ValueError, match="sums to"):
+        CompiledTransitions.from_dict({"breeding": {State.FORAGING: {State.ROOSTING: 0.7}}})
+    with pytest.raises(ValueError, match="unknown state"):
+        CompiledTransitions.from_dict({"breeding": {"gliding": {State.ROOSTING: 1.0}}})
+
+
+def test_scalar_and_batched_draws_agree():
+    tr = DEFAULT_TRANSITIONS
+    rng = np.random.default_rng(3)
+    states = rng.integers(0, len(STATES), 5000).astype(np.int8)
+    u = rng.random(5000)
+    for season in range(len(tr.seasons)):
+        many = tr.draw_many(season, states, u)
+        assert [tr.draw(season, int(k), float(x)) for k, x in zip(states, u)] == many.tolist()
+        # Empirical frequencies follow the matrix
+        k = STATE_CODES[State.FORAGING]
+        big = tr.draw_many(season, np.full(200_000, k), rng.random(200_000))
+        freq = np.bincount(big, minlength=len(STATES)) / len(big)
+        assert np.allclose(freq, tr.probs[season, k], atol=0.01)
+
+
+def test_agent_loads_transitions_from_file(tmp_path):
+    path = tmp_path / "telemetry.yaml"
+    path.write_text(yaml.safe_dump({"fallback": {"roosting": 1.0}}))
+    tr = CompiledTransitions.from_file(str(path))
+    ag = HarrierAgent(agent_id=1, lat=0.0, lon=0.0, state=State.MIGRATING, rng=random.Random(0), transitions=tr)
+    assert {ag.next_state(s) for s in tr.seasons for _ in range(20)} == {State.ROOSTING}
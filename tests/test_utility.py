@@ -0,0 +1,74 @@
+import numpy as np
+import rasterio
+from rasterio.transform import from_origin
+
+from black_harrier_abm_v2.environment import Environment, Turbine
+from black_harrier_abm_v2.movement import StepSelectionPolicy, Weights, heading_utilities
+from black_harrier_abm_v2.samplers.raster import RasterSamplers
+from black_harrier_abm_v2.utility import StaticUtility
+
+
+def _write_tif(path, data, res=0.001):
+    with rasterio.open(path, "w", driver="GTiff", height=data.shape[0], width=data.shape[1], count=1,
+                       dtype=data.dtype, crs="EPSG:4326", transform=from_origin(18.0, -33.0, res, res)) as ds:
+        ds.write(data, 1)
+    return str(path)
+
+
+def _env(tmp_path, **kwargs):
+    rng = np.random.default_rng(3)
+    samplers = RasterSamplers(
+        habitat_raster=_write_tif(tmp_path / "h.tif", rng.random((60, 60)).astype("float32")),
+        dem_raster=_write_tif(tmp_path / "d.tif", (rng.random((60, 60)) * 50).astype("float32")),
+        wind_u_raster=_write_tif(tmp_path / "u.tif", np.full((60, 60), 2.0, dtype="float32")),
+        wind_v_raster=_write_tif(tmp_path / "v.tif", np.full((60, 60), -1.0, dtype="float32")),
+        **kwargs,
+    )
+    env = Environment.from_samplers(samplers, turbines=[Turbine(lat=-33.03, lon=18.03)])
+    return env, samplers
+
+
+def _utilities(env, weights, n=200):
+    rng = np.random.default_rng(0)
+    lats, lons = rng.uniform(-33.065, -32.995, n), rng.uniform(17.995, 18.065, n)  # some candidates off the grid
+    policy = StepSelectionPolicy(weights)
+    return heading_utilities(weights, policy.headings, lats, lons, np.full(n, 8.0), None, env,
+                             np.full(n, -33.03), np.full(n, 18.02), 60.0)
+
+
+def test_surface_matches_per_candidate_terms(tmp_path):
+    env, samplers = _env(tmp_path)
+    expected = _utilities(env, Weights(w_turbine_avoid=0.0))
+    env.static_utility = StaticUtility.from_samplers(samplers)
+    got = _utilities(env, Weights(w_turbine_avoid=0.0))
+    # Habitat and slope share the surface's grid, so only float32 rounding differs
+    assert np.allclose(got, expected, atol=1e-5)
+    # Near turbines the surface defers to the exact penalty
+    w = Weights(w_turbine_avoid=5.0)
+    ref = _utilities(Environment.from_samplers(samplers, turbines=env.turbines), w)
+    assert np.allclose(_utilities(env, w), ref, atol=1e-5)
+    assert np.isnan(env.static_surface(w).sample_many(np.array([-33.03]), np.array([18.0305]))).all()
+
+
+def test_surfaces_rebuild_per_weights_and_layout_and_cache_on_disk(tmp_path):
+    env, samplers = _env(tmp_path)
+    builder = env.static_utility = StaticUtility.from_samplers(samplers, cache_dir=str(tmp_path / "utility"))
+    a = env.static_surface(Weights())
+    assert env.static_surface(Weights(w_wind=0.0, w_target=2.0)) is a  # dynamic weights do not matter
+    b = env.static_surface(Weights(w_habitat=2.0))
+    assert b is not a and builder.builds == 2
+    env.turbines.append(Turbine(lat=-33.01, lon=18.05))
+    env.rebuild_turbine_index()
+    assert env.static_surface(Weights()) is not a and builder.builds == 3
+    assert len(list((tmp_path / "utility").glob("utility_*.npz"))) == 3
+
+    again = StaticUtility.from_samplers(samplers, cache_dir=str(tmp_path / "utility"))
+    assert np.array_equal(again.surface(env, Weights()).layer.data, env.static_surface(Weights()).layer.data, equal_nan=True)
+
+
+def test_tiled_surface_equals_whole_grid(tmp_path):
+    env, samplers = _env(tmp_path)
+    env.static_utility = StaticUtility.from_samplers(samplers)
+    tiled_env, tiled = _env(tmp_path, tile_size=16)
+    tiled_env.static_utility = StaticUtility.from_samplers(tiled)
+    assert np.array_equal(_utilities(tiled_env, Weights()), _utilities(env, Weights()))